@@ -45,20 +45,27 @@ else:
     CORS(app)
 
 # Import the simple clean routes
-from routes.market_routes import market_bp, cache
+from routes.market_routes import market_bp
 from routes.portfolio_routes import portfolio_bp
 from reports.api import reports_v2_bp
 from routes.learning_routes import learning_bp
 
-# Initialize the simple cache
-cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
-
 # Register the endpoints
 app.register_blueprint(market_bp)
 app.register_blueprint(portfolio_bp)
 app.register_blueprint(reports_v2_bp)
 app.register_blueprint(learning_bp)
 
+# Keep the market dashboard snapshots warm (one leader process per host refreshes them)
+if os.environ.get("FLASK_ENV") != "testing":
+    from routes.market_routes import market_data_service
+    from services.market_refresher import start_market_refresher
+    start_market_refresher(market_data_service)
+
+# Per-route latency histograms and the Prometheus scrape endpoint (/metrics)
+from utils import metrics
+metrics.init_app(app)
+
 # Serving the Frontend SPA
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,173 @@
+"""
+Timing harness for the portfolio analytics engine.
+
+Runs PortfolioService / PortfolioIntelligence hot paths against synthetic,
+offline portfolios and writes a JSON baseline that later runs can be compared
+against:
+
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Run from the backend/ directory. `--compare` exits non-zero when any
+benchmark's median is slower than the baseline by more than `--tolerance`.
+"""
+import argparse
+import copy
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from services.portfolio_intelligence import PortfolioIntelligence
+from services.portfolio_service import PortfolioService
+
+# name -> (trades, symbols, days)
+SCENARIOS = {
+    "tiny": (10, 5, 30),
+    "small": (1_000, 50, 365),
+    "medium": (10_000, 200, 1825),
+    "large": (100_000, 500, 3650),
+}
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up: imports, caches, first-call allocations
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "runs": repeat,
+    }
+
+
+def _cash_flows(transactions):
+    return [
+        {"date": tx["transaction_date"], "amount": float(tx["quantity"]) * float(tx["price"]), "type": tx["transaction_type"]}
+        for tx in transactions
+    ]
+
+
+def run_scenario(trades: int, n_symbols: int, days: int, repeat: int, seed: int) -> Dict[str, Any]:
+    symbols = synthetic.make_symbols(n_symbols)
+    prices = synthetic.make_price_frame(symbols, days, seed=seed)
+    transactions = synthetic.make_transactions(symbols, trades, days, prices, seed=seed + 1)
+    quotes = synthetic.make_quotes(symbols, prices)
+
+    service = PortfolioService()
+    service.market_data = synthetic.OfflineMarketData(prices)
+    intel = PortfolioIntelligence(service)
+
+    holdings = service.get_holdings("bench", transactions)
+    report = service.calculate_unrealized_pnl(copy.deepcopy(holdings), quotes)
+    rng = np.random.default_rng(seed)
+    enriched = [
+        {**h, "beta": float(rng.uniform(0.5, 1.6)), "trailingPE": float(rng.uniform(8, 80)),
+         "dividendYield": float(rng.uniform(0, 0.04)), "marketCap": ["Large", "Mid", "Small"][i % 3]}
+        for i, h in enumerate(report["holdings"])
+    ]
+
+    portfolio_flows = _cash_flows(transactions)
+    flows_by_symbol: Dict[str, list] = {}
+    for tx in transactions:
+        flows_by_symbol.setdefault(tx["symbol"], []).extend(_cash_flows([tx]))
+    values_by_symbol = {h["ticker"]: h["current_value"] for h in report["holdings"]}
+    held_flows = {sym: flows_by_symbol[sym] for sym in values_by_symbol}
+
+    benches = {
+        "get_holdings": lambda: service.get_holdings("bench", transactions),
+        "calculate_unrealized_pnl": lambda: service.calculate_unrealized_pnl(copy.deepcopy(holdings), quotes),
+        "get_performance_history": lambda: service.get_performance_history("bench", transactions, days=days),
+        "calculate_xirr": lambda: intel.calculate_xirr(portfolio_flows, report["total_current_value"]),
+        "calculate_xirr_batch": lambda: intel.calculate_xirr_batch(held_flows, values_by_symbol),
+        "get_tax_friction_estimate": lambda: intel.get_tax_friction_estimate(enriched),
+        "calculate_fundamental_radar": lambda: intel.calculate_fundamental_radar(enriched),
+    }
+    return {
+        "params": {"trades": trades, "symbols": n_symbols, "days": days, "holdings": len(holdings)},
+        "results": {name: _time(fn, repeat) for name, fn in benches.items()},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float = 0.5) -> bool:
+    """Prints median ratios vs the baseline; returns False on any regression."""
+    ok = True
+    for scenario, data in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            print(f"[{scenario}] not in baseline, skipped")
+            continue
+        for name, res in data["results"].items():
+            old = base["results"].get(name)
+            if not old:
+                continue
+            ratio = res["median_ms"] / old["median_ms"] if old["median_ms"] > 0 else 1.0
+            flag = ""
+            # Sub-millisecond timings are mostly noise; require an absolute slowdown too.
+            if ratio > 1.0 + tolerance and res["median_ms"] - old["median_ms"] > min_delta_ms:
+                flag = "  REGRESSION"
+                ok = False
+            print(f"[{scenario}] {name:<28} {old['median_ms']:>10.3f} -> {res['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio analytics engine on synthetic portfolios")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario(s) to run (default: tiny, small, medium)")
+    parser.add_argument("--trades", type=int, help="Custom scenario: number of trades")
+    parser.add_argument("--symbols", type=int, default=50, help="Custom scenario: number of symbols")
+    parser.add_argument("--days", type=int, default=365, help="Custom scenario: history length in days")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this many ms")
+    args = parser.parse_args(argv)
+
+    scenarios = {name: SCENARIOS[name] for name in (args.scenario or ["tiny", "small", "medium"])}
+    if args.trades:
+        scenarios["custom"] = (args.trades, args.symbols, args.days)
+
+    output = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "scenarios": {},
+    }
+    for name, (trades, n_symbols, days) in scenarios.items():
+        print(f"Running {name}: {trades} trades, {n_symbols} symbols, {days} days ...", flush=True)
+        output["scenarios"][name] = run_scenario(trades, n_symbols, days, args.repeat, args.seed)
+        for bench, res in output["scenarios"][name]["results"].items():
+            print(f"  {bench:<28} min {res['min_ms']:>10.3f} ms  median {res['median_ms']:>10.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(output, baseline, args.tolerance, args.min_delta_ms):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
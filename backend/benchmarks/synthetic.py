@@ -0,0 +1,112 @@
+"""
+Deterministic synthetic portfolios for the analytics benchmarks.
+
+Everything here is offline: transaction logs are generated from a seeded RNG
+and prices come from a per-symbol random walk laid out exactly like the
+`yf.download(..., group_by="ticker")` frame MarketDataService.get_history
+returns, so the analytics code runs unmodified without touching the network.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import MarketDataService
+
+_normalize_symbol = MarketDataService.normalize_symbol
+
+
+def make_symbols(n_symbols: int) -> List[str]:
+    return [f"SYN{i:04d}" for i in range(n_symbols)]
+
+
+def make_price_frame(symbols: List[str], days: int, seed: int = 7, end: datetime = None) -> pd.DataFrame:
+    """Business-day OHLCV random walk per symbol, MultiIndex columns (ticker, field)."""
+    rng = np.random.default_rng(seed)
+    end = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = pd.bdate_range(end=end, periods=max(2, int(days * 5 / 7) + 1))
+
+    start_prices = rng.uniform(50, 5000, len(symbols))
+    returns = rng.normal(0.0004, 0.018, (len(dates), len(symbols)))
+    closes = start_prices * np.exp(np.cumsum(returns, axis=0))
+
+    frames = {}
+    for j, symbol in enumerate(symbols):
+        close = closes[:, j]
+        spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+        frames[_normalize_symbol(symbol)] = pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.003, len(dates))),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(10_000, 5_000_000, len(dates)),
+        }, index=dates)
+    return pd.concat(frames, axis=1)
+
+
+def make_transactions(symbols: List[str], n_trades: int, days: int, prices: pd.DataFrame,
+                      seed: int = 11) -> List[Dict[str, Any]]:
+    """
+    Trade log in store row shape, oldest first. The first trade of each symbol
+    is a buy and sells never exceed the quantity held, so every position stays
+    long. Trade prices are the synthetic close on the trade date.
+    """
+    rng = np.random.default_rng(seed)
+    end = prices.index[-1].to_pydatetime()
+    offsets = np.sort(rng.integers(0, max(1, days), n_trades))[::-1]
+    picks = rng.integers(0, len(symbols), n_trades)
+    quantities = rng.integers(1, 200, n_trades)
+
+    # As-of close for every trade in one lookup: last bar on or before the trade date.
+    closes = prices.xs("Close", axis=1, level=1)[[_normalize_symbol(s) for s in symbols]].to_numpy()
+    trade_days = (np.datetime64(end.date()) - offsets.astype("timedelta64[D]")).astype("datetime64[ns]")
+    rows = np.clip(prices.index.values.searchsorted(trade_days, side="right") - 1, 0, None)
+    trade_prices = closes[rows, picks]
+
+    held: Dict[str, int] = {}
+    transactions = []
+    for i, (offset, pick, qty, price) in enumerate(zip(offsets, picks, quantities, trade_prices)):
+        symbol = symbols[pick]
+        trade_date = end - timedelta(days=int(offset))
+        tx_type = "sell" if held.get(symbol, 0) > qty and rng.random() < 0.3 else "buy"
+        held[symbol] = held.get(symbol, 0) + (qty if tx_type == "buy" else -qty)
+        transactions.append({
+            "id": f"tx-{i}",
+            "symbol": symbol,
+            "asset_segment": "equity",
+            "transaction_type": tx_type,
+            "quantity": float(qty),
+            "price": round(float(price), 2),
+            "transaction_date": trade_date.strftime("%Y-%m-%d"),
+            "created_at": f"{trade_date:%Y-%m-%d}T00:00:{i % 60:02d}",
+        })
+    return transactions
+
+
+def make_quotes(symbols: List[str], prices: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Live-quote dicts (get_batch_quotes shape) from the last synthetic bar."""
+    quotes = {}
+    for symbol in symbols:
+        bars = prices[_normalize_symbol(symbol)]
+        last = bars.iloc[-1]
+        quotes[symbol] = {
+            "price": round(float(last["Close"]), 2),
+            "high": round(float(last["High"]), 2),
+            "low": round(float(last["Low"]), 2),
+            "sparkline": bars["Close"].iloc[-20:].round(2).tolist(),
+        }
+    return quotes
+
+
+class OfflineMarketData:
+    """Stands in for MarketDataService.get_history with a prebuilt price frame."""
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices
+
+    def normalize_symbol(self, symbol: str) -> str:
+        return _normalize_symbol(symbol)
+
+    def get_history(self, symbols: list, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        return self.prices
@@ -55,15 +55,29 @@ class DatabaseAdminCLI:
         except Exception as e:
             logger.error(f"Metrics generation failed: {str(e)}")
 
+    @staticmethod
+    def rebuild_holdings():
+        """Recomputes the materialized holdings table from the transaction log (repair/backfill)."""
+        from db.store import get_store
+        logger.info("Rebuilding holdings projection from transactions...")
+        try:
+            rows = get_store().rebuild_holdings()
+            logger.info(f"Holdings rebuild complete. {rows} positions recomputed.")
+        except Exception as e:
+            logger.error(f"Holdings rebuild failed: {str(e)}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="InvestIQ Database Admin Tools")
     parser.add_argument("--cleanup", type=int, help="Cleanup stale jobs older than X hours")
     parser.add_argument("--metrics", action="store_true", help="Generate db metrics report")
+    parser.add_argument("--rebuild-holdings", action="store_true", help="Recompute the holdings projection from transactions")
     args = parser.parse_args()
     
     if args.cleanup:
         DatabaseAdminCLI.cleanup_stale_jobs(hours_old=args.cleanup)
     elif args.metrics:
         DatabaseAdminCLI.generate_metrics()
+    elif args.rebuild_holdings:
+        DatabaseAdminCLI.rebuild_holdings()
     else:
         parser.print_help()
@@ -28,6 +28,7 @@ class AppSettings:
     openai_api_key: Optional[str]
     redis_url: str
     max_workers: int
+    max_queue_depth: int
 
     @classmethod
     def load_from_env(cls) -> "AppSettings":
@@ -47,7 +48,8 @@ class AppSettings:
             xai_api_key=os.getenv("XAI_API_KEY") or (os.getenv("GROQ_API_KEY") if os.getenv("GROQ_API_KEY", "").startswith("xai-") else None),
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
-            max_workers=int(os.getenv("WORKER_THREADS", "5"))
+            max_workers=int(os.getenv("WORKER_THREADS", "5")),
+            max_queue_depth=int(os.getenv("WORKER_QUEUE_DEPTH", "50")),
         )
         
         logger.info(f"Loaded AppSettings for environment: {settings.environment}")
@@ -0,0 +1,68 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Optional, Tuple
+
+from db.sqlite_pool import get_pool
+from db.sqlite_store import _default_db_path
+
+
+class MarketSnapshotStore:
+    """
+    Precomputed market datasets (indices, mood, movers, news) shared by every
+    gunicorn worker on the host.
+
+    The background refresher writes one row per dataset key; request handlers
+    read the serialized JSON back verbatim, so serving a snapshot costs one
+    primary-key lookup and no re-encoding.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("INVESTIQ_SQLITE_PATH") or _default_db_path()
+        self._pool = get_pool(self.db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._pool.connection()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS market_snapshots (
+                    dataset TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    refreshed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+
+    def get_raw(self, dataset: str) -> Optional[Tuple[str, float]]:
+        """Returns (json_text, age_seconds) or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, refreshed_at FROM market_snapshots WHERE dataset = ?", (dataset,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], max(0.0, time.time() - row[1])
+
+    def get(self, dataset: str) -> Optional[Tuple[Any, float]]:
+        raw = self.get_raw(dataset)
+        if raw is None:
+            return None
+        return json.loads(raw[0]), raw[1]
+
+    def put(self, dataset: str, payload: Any) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO market_snapshots (dataset, payload, refreshed_at) VALUES (?,?,?)
+                ON CONFLICT(dataset) DO UPDATE SET
+                    payload=excluded.payload, refreshed_at=excluded.refreshed_at
+                """,
+                (dataset, json.dumps(payload, default=str), time.time()),
+            )
+            conn.commit()
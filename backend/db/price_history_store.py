@@ -0,0 +1,201 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from db.sqlite_pool import get_pool
+from db.sqlite_store import _default_db_path, _utcnow_iso
+
+OHLCV_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def unsettled_from() -> str:
+    """
+    First bar date that may still be a live, partial session. Yesterday (UTC)
+    covers exchanges ahead of or behind UTC; coverage only advances to bars
+    before it, so the next delta re-downloads — and overwrites — the newer ones.
+    """
+    return (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+
+
+class PriceHistoryStore:
+    """
+    Local daily OHLCV store used to make price-history loads incremental.
+
+    Bars live in the same SQLite file as the portfolio tables (next to
+    instrument_cache). A per-symbol coverage row records the earliest date the
+    store is known to be complete from, the last *settled* bar (see
+    `unsettled_from`) and when it was refreshed, so callers only need to
+    download the bars from `last_date` on.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("INVESTIQ_SQLITE_PATH") or _default_db_path()
+        self._pool = get_pool(self.db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._pool.connection()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS price_history (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL NOT NULL,
+                    volume REAL,
+                    PRIMARY KEY (symbol, date)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS price_history_coverage (
+                    symbol TEXT PRIMARY KEY,
+                    first_date TEXT NOT NULL,
+                    last_date TEXT NOT NULL,
+                    last_close REAL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.commit()
+
+    def get_coverage(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not symbols:
+            return {}
+        placeholders = ",".join("?" for _ in symbols)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, first_date, last_date, last_close, updated_at "
+                f"FROM price_history_coverage WHERE symbol IN ({placeholders})",
+                list(symbols),
+            ).fetchall()
+            return {r["symbol"]: dict(r) for r in rows}
+
+    def write_bars(self, symbol: str, bars: pd.DataFrame, coverage_start: Optional[str] = None,
+                   settled_before: Optional[str] = None) -> None:
+        """
+        Upserts daily bars for one symbol and advances its coverage record.
+
+        When `coverage_start` is given the symbol's previous rows are replaced
+        (a full reload); otherwise the bars are appended as a delta. Bars dated
+        on or after `settled_before` (default `unsettled_from()`) are stored but
+        never become the coverage's last bar, so a live session's partial close
+        is not later mistaken for a restatement.
+        """
+        settled_before = settled_before or unsettled_from()
+        bars = bars.dropna(subset=["Close"]) if not bars.empty else bars
+        if bars.empty and coverage_start is None:
+            return
+
+        dates = pd.DatetimeIndex(bars.index).strftime("%Y-%m-%d").tolist()
+        rows = list(zip(
+            [symbol] * len(dates),
+            dates,
+            *(bars[f].astype(float).where(bars[f].notna(), None).tolist() if f in bars else [None] * len(dates)
+              for f in OHLCV_FIELDS),
+        ))
+
+        with self._connect() as conn:
+            if coverage_start is not None:
+                conn.execute("DELETE FROM price_history WHERE symbol = ?", (symbol,))
+            conn.executemany(
+                """
+                INSERT INTO price_history (symbol, date, open, high, low, close, volume)
+                VALUES (?,?,?,?,?,?,?)
+                ON CONFLICT(symbol, date) DO UPDATE SET
+                    open=excluded.open, high=excluded.high, low=excluded.low,
+                    close=excluded.close, volume=excluded.volume
+                """,
+                rows,
+            )
+            last = conn.execute(
+                "SELECT date, close FROM price_history WHERE symbol = ? AND date < ? ORDER BY date DESC LIMIT 1",
+                (symbol, settled_before),
+            ).fetchone()
+            if coverage_start is not None:
+                conn.execute(
+                    """
+                    INSERT INTO price_history_coverage (symbol, first_date, last_date, last_close, updated_at)
+                    VALUES (?,?,?,?,?)
+                    ON CONFLICT(symbol) DO UPDATE SET
+                        first_date=excluded.first_date,
+                        last_date=excluded.last_date,
+                        last_close=excluded.last_close,
+                        updated_at=excluded.updated_at
+                    """,
+                    (
+                        symbol,
+                        coverage_start,
+                        last["date"] if last else coverage_start,
+                        last["close"] if last else None,
+                        _utcnow_iso(),
+                    ),
+                )
+            elif last:
+                conn.execute(
+                    "UPDATE price_history_coverage SET last_date = ?, last_close = ?, updated_at = ? WHERE symbol = ?",
+                    (last["date"], last["close"], _utcnow_iso(), symbol),
+                )
+            else:
+                conn.execute(
+                    "UPDATE price_history_coverage SET updated_at = ? WHERE symbol = ?",
+                    (_utcnow_iso(), symbol),
+                )
+            conn.commit()
+
+    def touch(self, symbol: str) -> None:
+        """Marks a symbol as freshly checked when a delta fetch returned no new bars."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE price_history_coverage SET updated_at = ? WHERE symbol = ?",
+                (_utcnow_iso(), symbol),
+            )
+            conn.commit()
+
+    def load_frame(self, symbols: List[str], start: str) -> pd.DataFrame:
+        """
+        Returns stored bars shaped like ``yf.download(..., group_by="ticker")``:
+        a DatetimeIndex with (ticker, field) MultiIndex columns.
+        """
+        if not symbols:
+            return pd.DataFrame()
+        placeholders = ",".join("?" for _ in symbols)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT symbol, date, open, high, low, close, volume
+                FROM price_history
+                WHERE symbol IN ({placeholders}) AND date >= ?
+                ORDER BY date ASC
+                """,
+                [*symbols, start],
+            ).fetchall()
+        if not rows:
+            return pd.DataFrame()
+
+        long = pd.DataFrame([tuple(r) for r in rows], columns=["symbol", "date", *OHLCV_FIELDS])
+        wide = long.pivot(index="date", columns="symbol", values=list(OHLCV_FIELDS))
+        wide = wide.swaplevel(0, 1, axis=1).sort_index(axis=1)
+        wide.index = pd.to_datetime(wide.index)
+        wide.index.name = "Date"
+        return wide.astype(float)
+
+
+def is_stale(coverage: Dict[str, Any], max_age_seconds: int) -> bool:
+    try:
+        updated_at = datetime.fromisoformat(coverage["updated_at"].replace("Z", "+00:00"))
+    except Exception:
+        return True
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - updated_at).total_seconds()
+    return age > max_age_seconds
@@ -4,6 +4,7 @@ CREATE TABLE IF NOT EXISTS reports (
   symbol TEXT NOT NULL,
   status TEXT NOT NULL,
   report_data JSONB,
+  partial_report JSONB,
   error TEXT,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
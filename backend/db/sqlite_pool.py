@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+from typing import Dict
+
+# Tunables (per connection). cache_size is negative → KiB, per SQLite convention.
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+
+class SqliteConnectionPool:
+    """
+    One long-lived connection per thread (and per process) for a database file.
+
+    Reusing the connection keeps sqlite3's prepared-statement cache warm across
+    calls, and WAL mode lets readers proceed while another thread or gunicorn
+    worker writes. Connections are used exactly like before:
+    ``with pool.connection() as conn`` commits on success and rolls back on
+    error, it just no longer closes the handle.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._wal_ready = False
+        self._init_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must never be reused by the child.
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = self._open()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+            cached_statements=SQLITE_STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        if not self._wal_ready:
+            # journal_mode is persistent in the file; switching it needs a brief exclusive lock.
+            with self._init_lock:
+                if not self._wal_ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    self._wal_ready = True
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def close(self) -> None:
+        """Closes the calling thread's connection, if any."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+_pools: Dict[str, SqliteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> SqliteConnectionPool:
+    """Process-wide pool per database file, shared by every store pointing at it."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SqliteConnectionPool(db_path)
+        return pool
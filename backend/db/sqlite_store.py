@@ -2,9 +2,13 @@ import json
 import os
 import sqlite3
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
+
+from db.sqlite_pool import get_pool
+from services import holdings_ledger
  
  
 def _utcnow_iso() -> str:
@@ -30,17 +34,18 @@ class SqliteStore:
     Minimal SQLite persistence for local portfolio management.
  
     - No auth in this repo yet; we store a single default user/portfolio unless specified.
-    - Safe for dev usage; not intended for multi-process production workloads.
+    - Each thread reuses one pooled WAL-mode connection (see db.sqlite_pool), so
+      gthread workers and multiple gunicorn processes on one host can share the
+      file; writers still serialize, readers don't block on them.
     """
  
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or os.getenv("INVESTIQ_SQLITE_PATH") or _default_db_path()
+        self._pool = get_pool(self.db_path)
         self._init_db()
  
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return self._pool.connection()
  
     def _init_db(self) -> None:
         with self._connect() as conn:
@@ -88,6 +93,26 @@ class SqliteStore:
                 )
                 """
             )
+            # Materialized WAC positions; Decimal values are stored as TEXT so the
+            # projection matches a full replay exactly.
+            holdings_missing = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'holdings'"
+            ).fetchone() is None
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS holdings (
+                    portfolio_id TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    qty TEXT NOT NULL,
+                    total_cost TEXT NOT NULL,
+                    avg_price TEXT NOT NULL,
+                    transactions_count INTEGER NOT NULL,
+                    last_trade_key TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (portfolio_id, symbol)
+                )
+                """
+            )
             # --- Learning Model Tables ---
             conn.execute(
                 """
@@ -151,6 +176,9 @@ class SqliteStore:
                 """
             )
             conn.commit()
+        if holdings_missing:
+            # Existing databases predate the projection; backfill it once from the log.
+            self.rebuild_holdings()
  
     def get_or_create_default_portfolio(self) -> PortfolioIdentity:
         user_id = os.getenv("INVESTIQ_DEFAULT_USER_ID", "local-user")
@@ -186,13 +214,10 @@ class SqliteStore:
             ).fetchall()
             return [dict(r) for r in rows]
  
-    def insert_transaction(self, portfolio_id: str, user_id: str, tx: Dict[str, Any]) -> Dict[str, Any]:
-        tx_id = str(uuid4())
-        created_at = _utcnow_iso()
-        transaction_date = tx.get("transaction_date") or datetime.utcnow().date().isoformat()
- 
-        record = {
-            "id": tx_id,
+    @staticmethod
+    def _transaction_record(portfolio_id: str, user_id: str, tx: Dict[str, Any], created_at: str) -> Dict[str, Any]:
+        return {
+            "id": str(uuid4()),
             "portfolio_id": portfolio_id,
             "user_id": user_id,
             "symbol": str(tx["symbol"]).upper(),
@@ -201,38 +226,176 @@ class SqliteStore:
             "quantity": float(tx["quantity"]),
             "price": float(tx["price"]),
             "brokerage": float(tx.get("brokerage", 0) or 0),
-            "transaction_date": transaction_date,
+            "transaction_date": tx.get("transaction_date") or datetime.utcnow().date().isoformat(),
             "notes": str(tx.get("notes", "") or ""),
             "created_at": created_at,
         }
- 
+
+    _INSERT_TRANSACTION_SQL = """
+        INSERT INTO transactions (
+            id, portfolio_id, user_id, symbol, asset_segment, transaction_type,
+            quantity, price, brokerage, transaction_date, notes, created_at
+        )
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+    """
+    _TRANSACTION_COLUMNS = (
+        "id", "portfolio_id", "user_id", "symbol", "asset_segment", "transaction_type",
+        "quantity", "price", "brokerage", "transaction_date", "notes", "created_at",
+    )
+
+    def insert_transaction(self, portfolio_id: str, user_id: str, tx: Dict[str, Any]) -> Dict[str, Any]:
+        record = self._transaction_record(portfolio_id, user_id, tx, _utcnow_iso())
+
         with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO transactions (
-                    id, portfolio_id, user_id, symbol, asset_segment, transaction_type,
-                    quantity, price, brokerage, transaction_date, notes, created_at
+            conn.execute(self._INSERT_TRANSACTION_SQL, tuple(record[c] for c in self._TRANSACTION_COLUMNS))
+            self._apply_to_holdings(conn, record)
+            conn.commit()
+
+        return record
+
+    def insert_transactions_batch(self, portfolio_id: str, user_id: str, txs: List[Dict[str, Any]],
+                                  chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """
+        Bulk insert in multi-row executemany chunks inside one transaction. The
+        holdings projection is then recomputed once per touched symbol rather
+        than folded trade by trade.
+        """
+        if not txs:
+            return []
+        # Distinct, increasing created_at values keep file order among same-day trades.
+        base = datetime.utcnow().replace(microsecond=0)
+        records = [
+            self._transaction_record(
+                portfolio_id, user_id, tx, (base + timedelta(microseconds=i)).isoformat(timespec="microseconds") + "Z"
+            )
+            for i, tx in enumerate(txs)
+        ]
+
+        with self._connect() as conn:
+            for start in range(0, len(records), chunk_size):
+                conn.executemany(
+                    self._INSERT_TRANSACTION_SQL,
+                    [tuple(r[c] for c in self._TRANSACTION_COLUMNS) for r in records[start:start + chunk_size]],
                 )
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
-                (
-                    record["id"],
-                    record["portfolio_id"],
-                    record["user_id"],
-                    record["symbol"],
-                    record["asset_segment"],
-                    record["transaction_type"],
-                    record["quantity"],
-                    record["price"],
-                    record["brokerage"],
-                    record["transaction_date"],
-                    record["notes"],
-                    record["created_at"],
-                ),
+            for symbol in sorted({r["symbol"] for r in records}):
+                self._recompute_holding(conn, portfolio_id, symbol)
+            conn.commit()
+
+        return records
+
+    @staticmethod
+    def _trade_key(tx: Dict[str, Any]) -> str:
+        # Same ordering as list_transactions: (transaction_date, created_at).
+        return f"{tx['transaction_date']}|{tx['created_at']}"
+
+    def _apply_to_holdings(self, conn: sqlite3.Connection, tx: Dict[str, Any]) -> None:
+        """
+        Folds a newly inserted trade into its holdings row inside the caller's
+        transaction. Back-dated trades (earlier than the last one applied) change
+        the WAC path, so that symbol is recomputed from its trades instead.
+        """
+        row = conn.execute(
+            "SELECT qty, total_cost, avg_price, transactions_count, last_trade_key "
+            "FROM holdings WHERE portfolio_id = ? AND symbol = ?",
+            (tx["portfolio_id"], tx["symbol"]),
+        ).fetchone()
+        trade_key = self._trade_key(tx)
+        if row is not None and trade_key < row["last_trade_key"]:
+            self._recompute_holding(conn, tx["portfolio_id"], tx["symbol"])
+            return
+
+        if row is None:
+            position = holdings_ledger.new_position(tx["symbol"])
+        else:
+            position = {
+                "ticker": tx["symbol"],
+                "qty": Decimal(row["qty"]),
+                "total_cost": Decimal(row["total_cost"]),
+                "avg_price": Decimal(row["avg_price"]),
+                "transactions_count": row["transactions_count"],
+            }
+        holdings_ledger.apply_trade(position, tx)
+        self._write_holding(conn, tx["portfolio_id"], position, trade_key)
+
+    def _recompute_holding(self, conn: sqlite3.Connection, portfolio_id: str, symbol: str) -> None:
+        rows = conn.execute(
+            """
+            SELECT symbol, transaction_type, quantity, price, transaction_date, created_at
+            FROM transactions
+            WHERE portfolio_id = ? AND symbol = ?
+            ORDER BY transaction_date ASC, created_at ASC
+            """,
+            (portfolio_id, symbol),
+        ).fetchall()
+        if not rows:
+            conn.execute("DELETE FROM holdings WHERE portfolio_id = ? AND symbol = ?", (portfolio_id, symbol))
+            return
+        trades = [dict(r) for r in rows]
+        position = holdings_ledger.replay(trades)[symbol]
+        self._write_holding(conn, portfolio_id, position, self._trade_key(trades[-1]))
+
+    @staticmethod
+    def _write_holding(conn: sqlite3.Connection, portfolio_id: str, position: Dict[str, Any], trade_key: str) -> None:
+        conn.execute(
+            """
+            INSERT INTO holdings (
+                portfolio_id, symbol, qty, total_cost, avg_price, transactions_count, last_trade_key, updated_at
             )
+            VALUES (?,?,?,?,?,?,?,?)
+            ON CONFLICT(portfolio_id, symbol) DO UPDATE SET
+                qty=excluded.qty,
+                total_cost=excluded.total_cost,
+                avg_price=excluded.avg_price,
+                transactions_count=excluded.transactions_count,
+                last_trade_key=excluded.last_trade_key,
+                updated_at=excluded.updated_at
+            """,
+            (
+                portfolio_id,
+                position["ticker"],
+                str(position["qty"]),
+                str(position["total_cost"]),
+                str(position["avg_price"]),
+                position["transactions_count"],
+                trade_key,
+                _utcnow_iso(),
+            ),
+        )
+
+    def list_holdings(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        """Open positions from the projection, in the same shape as PortfolioService.get_holdings."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT symbol, qty, total_cost, avg_price, transactions_count FROM holdings WHERE portfolio_id = ?",
+                (portfolio_id,),
+            ).fetchall()
+        return holdings_ledger.format_holdings(
+            {
+                "ticker": r["symbol"],
+                "qty": Decimal(r["qty"]),
+                "total_cost": Decimal(r["total_cost"]),
+                "avg_price": Decimal(r["avg_price"]),
+                "transactions_count": r["transactions_count"],
+            }
+            for r in rows
+        )
+
+    def rebuild_holdings(self, portfolio_id: Optional[str] = None) -> int:
+        """Recomputes the holdings projection from the transaction log. Returns rows written."""
+        with self._connect() as conn:
+            if portfolio_id is None:
+                conn.execute("DELETE FROM holdings")
+                pairs = conn.execute("SELECT DISTINCT portfolio_id, symbol FROM transactions").fetchall()
+            else:
+                conn.execute("DELETE FROM holdings WHERE portfolio_id = ?", (portfolio_id,))
+                pairs = conn.execute(
+                    "SELECT DISTINCT portfolio_id, symbol FROM transactions WHERE portfolio_id = ?",
+                    (portfolio_id,),
+                ).fetchall()
+            for pair in pairs:
+                self._recompute_holding(conn, pair["portfolio_id"], pair["symbol"])
             conn.commit()
- 
-        return record
+        return len(pairs)
  
     def get_cached_instrument(self, symbol: str, max_age_seconds: int = 86400) -> Optional[Dict[str, Any]]:
         symbol = symbol.upper()
@@ -272,6 +435,25 @@ class SqliteStore:
                 (symbol, json.dumps(payload), _utcnow_iso()),
             )
             conn.commit()
+
+    def set_cached_instruments_batch(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Upserts many instrument profiles in one transaction."""
+        if not payloads:
+            return
+        now = _utcnow_iso()
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO instrument_cache (symbol, payload_json, updated_at)
+                VALUES (?,?,?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    payload_json=excluded.payload_json,
+                    updated_at=excluded.updated_at
+                """,
+                [(symbol.upper(), json.dumps(payload), now) for symbol, payload in payloads.items()],
+            )
+            conn.commit()
+
     def delete_transactions_by_symbol(self, portfolio_id: str, symbol: str) -> bool:
         symbol = symbol.upper()
         with self._connect() as conn:
@@ -279,6 +461,10 @@ class SqliteStore:
                 "DELETE FROM transactions WHERE portfolio_id = ? AND symbol = ?",
                 (portfolio_id, symbol),
             )
+            conn.execute(
+                "DELETE FROM holdings WHERE portfolio_id = ? AND symbol = ?",
+                (portfolio_id, symbol),
+            )
             conn.commit()
             return cursor.rowcount > 0
 
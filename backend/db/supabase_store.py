@@ -1,13 +1,15 @@
 import json
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 # The python Supabase client requires the "supabase" package.
 from supabase import create_client, Client
 from db.sqlite_store import PortfolioIdentity
+from services import holdings_ledger
 
 def _utcnow_iso() -> str:
     return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
@@ -32,6 +34,7 @@ class SupabaseStore:
         self._transactions_cache: Optional[List[Dict[str, Any]]] = None
         self._transactions_cache_time: float = 0
         self._transactions_cache_portfolio: Optional[str] = None
+        self._holdings_cache: Dict[str, Dict[str, Any]] = {}  # portfolio_id -> {rows, fetched_at}
         self._instrument_mem_cache: Dict[str, Dict[str, Any]] = {}  # symbol -> {payload, fetched_at}
         
         # Cache TTLs (seconds)
@@ -85,13 +88,10 @@ class SupabaseStore:
         self._transactions_cache_portfolio = portfolio_id
         return response.data
 
-    def insert_transaction(self, portfolio_id: str, user_id: str, tx: Dict[str, Any]) -> Dict[str, Any]:
-        tx_id = str(uuid4())
-        created_at = _utcnow_iso()
-        transaction_date = tx.get("transaction_date") or datetime.utcnow().date().isoformat()
-
-        record = {
-            "id": tx_id,
+    @staticmethod
+    def _transaction_record(portfolio_id: str, user_id: str, tx: Dict[str, Any], created_at: str) -> Dict[str, Any]:
+        return {
+            "id": str(uuid4()),
             "portfolio_id": portfolio_id,
             "user_id": user_id,
             "symbol": str(tx["symbol"]).upper(),
@@ -100,16 +100,46 @@ class SupabaseStore:
             "quantity": float(tx["quantity"]),
             "price": float(tx["price"]),
             "brokerage": float(tx.get("brokerage", 0) or 0),
-            "transaction_date": transaction_date,
+            "transaction_date": tx.get("transaction_date") or datetime.utcnow().date().isoformat(),
             "notes": str(tx.get("notes", "") or ""),
             "created_at": created_at,
         }
 
+    def insert_transaction(self, portfolio_id: str, user_id: str, tx: Dict[str, Any]) -> Dict[str, Any]:
+        record = self._transaction_record(portfolio_id, user_id, tx, _utcnow_iso())
+
         self.supabase.table("transactions").insert(record).execute()
         # Invalidate transactions cache so next read fetches fresh data
         self._transactions_cache = None
+        self._holdings_cache.pop(portfolio_id, None)
         return record
 
+    def insert_transactions_batch(self, portfolio_id: str, user_id: str, txs: List[Dict[str, Any]],
+                                  chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """
+        Bulk insert as multi-row INSERTs of `chunk_size`. The statement-level
+        holdings trigger recomputes each touched symbol once per chunk.
+        """
+        if not txs:
+            return []
+        base = datetime.utcnow().replace(microsecond=0)
+        # Distinct, increasing timestamps keep file order among same-day trades.
+        records = [
+            self._transaction_record(
+                portfolio_id, user_id, tx,
+                (base + timedelta(microseconds=i)).isoformat(timespec="microseconds") + "Z",
+            )
+            for i, tx in enumerate(txs)
+        ]
+
+        try:
+            for start in range(0, len(records), chunk_size):
+                self.supabase.table("transactions").insert(records[start:start + chunk_size]).execute()
+        finally:
+            self._transactions_cache = None
+            self._holdings_cache.pop(portfolio_id, None)
+        return records
+
     def delete_transactions_by_symbol(self, portfolio_id: str, symbol: str) -> bool:
         symbol = symbol.upper()
         response = self.supabase.table("transactions") \
@@ -119,8 +149,48 @@ class SupabaseStore:
             .execute()
         # Invalidate transactions cache
         self._transactions_cache = None
+        self._holdings_cache.pop(portfolio_id, None)
         return len(response.data) > 0
 
+    def list_holdings(self, portfolio_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Open positions from the trigger-maintained `holdings` table (see
+        investiq_schema.sql). Returns None if the projection isn't deployed so
+        callers can fall back to replaying transactions.
+        """
+        now = time.time()
+        cached = self._holdings_cache.get(portfolio_id)
+        if cached and (now - cached["fetched_at"]) < self._TX_CACHE_TTL:
+            # Callers decorate these rows with live prices; hand out copies.
+            return [dict(h) for h in cached["rows"]]
+
+        try:
+            response = self.supabase.table("holdings") \
+                .select("symbol, qty, total_cost, avg_price, transactions_count") \
+                .eq("portfolio_id", portfolio_id) \
+                .execute()
+        except Exception:
+            return None
+
+        rows = holdings_ledger.format_holdings(
+            {
+                "ticker": r["symbol"],
+                "qty": Decimal(str(r["qty"])),
+                "total_cost": Decimal(str(r["total_cost"])),
+                "avg_price": Decimal(str(r["avg_price"])),
+                "transactions_count": r["transactions_count"],
+            }
+            for r in response.data
+        )
+        self._holdings_cache[portfolio_id] = {"rows": rows, "fetched_at": now}
+        return [dict(h) for h in rows]
+
+    def rebuild_holdings(self, portfolio_id: Optional[str] = None) -> int:
+        """Recomputes the holdings projection server-side from the transaction log."""
+        response = self.supabase.rpc("rebuild_holdings", {"p_portfolio_id": portfolio_id}).execute()
+        self._holdings_cache.clear()
+        return int(response.data or 0)
+
     def get_cached_instrument(self, symbol: str, max_age_seconds: int = 86400) -> Optional[Dict[str, Any]]:
         symbol = symbol.upper()
         now = time.time()
@@ -170,6 +240,20 @@ class SupabaseStore:
         # Also update memory cache
         self._instrument_mem_cache[symbol] = {"payload": payload, "fetched_at": time.time()}
 
+    def set_cached_instruments_batch(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Upserts many instrument profiles in ONE Supabase request and warms the memory cache."""
+        if not payloads:
+            return
+        now_iso = _utcnow_iso()
+        records = [
+            {"symbol": symbol.upper(), "payload_json": payload, "updated_at": now_iso}
+            for symbol, payload in payloads.items()
+        ]
+        self.supabase.table("instrument_cache").upsert(records).execute()
+        now = time.time()
+        for record in records:
+            self._instrument_mem_cache[record["symbol"]] = {"payload": record["payload_json"], "fetched_at": now}
+
     def preload_instruments_batch(self, symbols: List[str]) -> None:
         """Fetch all instrument cache entries in ONE Supabase query and warm the memory cache."""
         now = time.time()
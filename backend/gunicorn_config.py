@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 
 # Render deployment optimization
 port = int(os.environ.get("PORT", 5001))
@@ -7,6 +9,8 @@ bind = f"0.0.0.0:{port}"
 # To handle concurrent connections from React & LLM API calls appropriately
 workers = int(os.environ.get("GUNICORN_WORKERS", 2))
 threads = int(os.environ.get("GUNICORN_THREADS", 4))
+# Every open request, report SSE streams included, holds one of workers x threads slots.
+# Streams are therefore closed after REPORT_STREAM_WINDOW_SEC and resumed by the browser.
 
 # Use sync worker class by default, wait up to 120s because LLM generation can occasionally spike over 30s
 worker_class = 'gthread'
@@ -19,3 +23,20 @@ limit_request_line = 8190
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+# Prometheus multiprocess mode: every worker writes its samples under this directory
+# and /metrics aggregates them. Must be set before the app (and prometheus_client) loads.
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "investiq_prometheus")
+)
+
+
+def on_starting(server):
+    # Stale files from a previous master would be summed into the new counters.
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
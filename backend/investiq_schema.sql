@@ -106,11 +106,129 @@ CREATE TABLE IF NOT EXISTS public.reports (
     user_id TEXT NOT NULL DEFAULT 'anonymous',
     status TEXT NOT NULL DEFAULT 'pending',
     report_data JSONB,
+    -- Sections streamed so far while status is processing; cleared once the job ends.
+    partial_report JSONB,
     error TEXT,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
 );
 
+ALTER TABLE public.reports ADD COLUMN IF NOT EXISTS partial_report JSONB;
+
 CREATE INDEX IF NOT EXISTS idx_reports_created_at ON public.reports (created_at DESC);
 
 ALTER TABLE public.reports DISABLE ROW LEVEL SECURITY;
+
+-- 6. Holdings projection (weighted-average-cost positions per portfolio/symbol)
+-- Maintained by triggers in the same transaction as every transactions insert/delete,
+-- so reads are O(open positions) instead of replaying the whole trade log.
+CREATE TABLE IF NOT EXISTS public.holdings (
+    portfolio_id UUID NOT NULL REFERENCES public.portfolios(id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    qty NUMERIC NOT NULL,
+    total_cost NUMERIC NOT NULL,
+    avg_price NUMERIC NOT NULL,
+    transactions_count INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (portfolio_id, symbol)
+);
+
+ALTER TABLE public.holdings DISABLE ROW LEVEL SECURITY;
+
+-- Replays one symbol's trades (same WAC rules as services/holdings_ledger.py).
+CREATE OR REPLACE FUNCTION public.recompute_holding(p_portfolio_id UUID, p_symbol TEXT)
+RETURNS void AS $$
+DECLARE
+    r RECORD;
+    v_qty NUMERIC := 0;
+    v_cost NUMERIC := 0;
+    v_avg NUMERIC := 0;
+    v_count INTEGER := 0;
+BEGIN
+    FOR r IN
+        SELECT lower(transaction_type) AS tx_type, quantity, price
+        FROM public.transactions
+        WHERE portfolio_id = p_portfolio_id AND symbol = p_symbol
+        ORDER BY transaction_date ASC, created_at ASC
+    LOOP
+        v_count := v_count + 1;
+        IF r.tx_type = 'buy' THEN
+            v_cost := v_cost + r.quantity * r.price;
+            v_qty := v_qty + r.quantity;
+            IF v_qty > 0 THEN
+                v_avg := v_cost / v_qty;
+            END IF;
+        ELSIF r.tx_type = 'sell' THEN
+            v_qty := v_qty - r.quantity;
+            v_cost := v_qty * v_avg;
+        END IF;
+    END LOOP;
+
+    IF v_count = 0 THEN
+        DELETE FROM public.holdings WHERE portfolio_id = p_portfolio_id AND symbol = p_symbol;
+        RETURN;
+    END IF;
+
+    INSERT INTO public.holdings (portfolio_id, symbol, qty, total_cost, avg_price, transactions_count, updated_at)
+    VALUES (p_portfolio_id, p_symbol, v_qty, v_cost, v_avg, v_count, now())
+    ON CONFLICT (portfolio_id, symbol) DO UPDATE SET
+        qty = EXCLUDED.qty,
+        total_cost = EXCLUDED.total_cost,
+        avg_price = EXCLUDED.avg_price,
+        transactions_count = EXCLUDED.transactions_count,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers recompute each touched (portfolio, symbol) once per statement,
+-- so a bulk insert or a delete-by-symbol costs one replay per symbol, not per row.
+CREATE OR REPLACE FUNCTION public.holdings_after_transactions_change()
+RETURNS trigger AS $$
+DECLARE
+    pair RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        FOR pair IN SELECT DISTINCT portfolio_id, symbol FROM old_rows LOOP
+            PERFORM public.recompute_holding(pair.portfolio_id, pair.symbol);
+        END LOOP;
+    ELSE
+        FOR pair IN SELECT DISTINCT portfolio_id, symbol FROM new_rows LOOP
+            PERFORM public.recompute_holding(pair.portfolio_id, pair.symbol);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_holdings_after_insert ON public.transactions;
+CREATE TRIGGER trg_holdings_after_insert
+    AFTER INSERT ON public.transactions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.holdings_after_transactions_change();
+
+DROP TRIGGER IF EXISTS trg_holdings_after_delete ON public.transactions;
+CREATE TRIGGER trg_holdings_after_delete
+    AFTER DELETE ON public.transactions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.holdings_after_transactions_change();
+
+-- Repair / backfill: SELECT public.rebuild_holdings();  (or pass a portfolio id)
+CREATE OR REPLACE FUNCTION public.rebuild_holdings(p_portfolio_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    pair RECORD;
+    v_rows INTEGER := 0;
+BEGIN
+    DELETE FROM public.holdings WHERE p_portfolio_id IS NULL OR portfolio_id = p_portfolio_id;
+    FOR pair IN
+        SELECT DISTINCT portfolio_id, symbol FROM public.transactions
+        WHERE p_portfolio_id IS NULL OR portfolio_id = p_portfolio_id
+    LOOP
+        PERFORM public.recompute_holding(pair.portfolio_id, pair.symbol);
+        v_rows := v_rows + 1;
+    END LOOP;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT public.rebuild_holdings();
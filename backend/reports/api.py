@@ -1,7 +1,15 @@
+import json
 import logging
-from flask import Blueprint, request, jsonify
+import os
+import queue
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from reports.orchestrator import ReportGenerationOrchestrator
 from reports.dependencies import report_di
+from reports.events import job_events, TERMINAL_STATUSES
+from reports.exceptions import WorkerQueueFullError
+from reports.queue.worker import worker_pool
+from utils.chart_payload import rows_to_columns
 from schemas.report_schemas import validate_json_payload
 from middleware.auth import require_auth
 from utils.rate_limit import rate_limit
@@ -10,7 +18,19 @@ logger = logging.getLogger(__name__)
 
 reports_v2_bp = Blueprint('reports_v2', __name__, url_prefix='/api/v2/reports')
 
+# SSE tuning: DB re-check cadence (jobs running in another worker process), keep-alive
+# comment interval for proxies, and the window after which a stream is closed.
+# Each open stream occupies a gthread slot (GUNICORN_WORKERS x GUNICORN_THREADS, 8 by
+# default), so streams are bounded long-polls: the browser reconnects after
+# REPORT_STREAM_RETRY_MS with Last-Event-ID, and a slot is never held longer than
+# REPORT_STREAM_WINDOW_SEC.
+STREAM_POLL_SEC = float(os.getenv("REPORT_STREAM_POLL_SEC", "3"))
+STREAM_HEARTBEAT_SEC = float(os.getenv("REPORT_STREAM_HEARTBEAT_SEC", "10"))
+STREAM_WINDOW_SEC = float(os.getenv("REPORT_STREAM_WINDOW_SEC", "20"))
+STREAM_RETRY_MS = int(os.getenv("REPORT_STREAM_RETRY_MS", "1000"))
+
 @reports_v2_bp.route('/generate', methods=['POST'])
+@rate_limit(capacity=5, per_seconds=60, scope="reports_generate")
 def generate_report_v2():
     """
     Initiates an asynchronous multi-agent financial report.
@@ -41,6 +61,10 @@ def generate_report_v2():
             "job_id": job_id,
             "message": "Report generation delegated to background worker."
         }), 202
+    except WorkerQueueFullError as e:
+        response = jsonify(e.to_dict())
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, e.status_code
     except Exception as e:
         logger.error(f"Failed to submit generation job: {e}")
         return jsonify({"error": str(e)}), 500
@@ -85,16 +109,170 @@ def get_job_status_v2(job_id):
             return jsonify({"error": "Job ID not found"}), 404
             
         record = res.data[0]
-        return jsonify({
+        report_data = record.get("report_data")
+        if request.args.get("chart_format") == "columnar":
+            report_data = _columnar_charts(report_data)
+        body = {
             "job_id": job_id,
             "status": record["status"],
-            "report_data": record.get("report_data"),
+            "report_data": report_data,
             "error": record.get("error")
-        }), 200
+        }
+        if record["status"] == "pending":
+            position = worker_pool.get_queue_position(job_id)
+            if position is not None:
+                body["queue_position"] = position
+        return jsonify(body), 200
     except Exception as e:
         logger.error(f"Error checking status for {job_id}: {e}")
         return jsonify({"error": "Database retrieval exception"}), 500
 
+@reports_v2_bp.route('/stream/<job_id>', methods=['GET'])
+def stream_job_status(job_id):
+    """
+    Server-Sent Events feed of a job's progress: one `status` event per stage
+    transition, a `section` event per report section as the LLM streams it,
+    then a single `completed` (with report_data) or `failed` event.
+    Events come from the in-process bus; the DB is re-read every
+    REPORT_STREAM_POLL_SEC only in case the job runs in another worker.
+
+    The response ends after REPORT_STREAM_WINDOW_SEC and the browser
+    reconnects on its own. Every frame carries the job status as its id, so a
+    reconnect whose Last-Event-ID matches the current status skips the
+    repeated status frame.
+    """
+    columnar = request.args.get("chart_format") == "columnar"
+    last_event_id = request.headers.get("Last-Event-ID")
+    db = report_di.get_db_client()
+
+    columns = "status, report_data, partial_report, error"
+
+    def read_record():
+        nonlocal columns
+        try:
+            res = db.table("reports").select(columns).eq("id", job_id).execute()
+        except Exception as e:
+            if "partial_report" not in columns:
+                raise
+            # Databases without the partial_report column (streaming off) still stream status.
+            logger.warning(f"Reading reports without partial_report for {job_id}: {e}")
+            columns = "status, report_data, error"
+            res = db.table("reports").select(columns).eq("id", job_id).execute()
+        # Copied: the stream outlives this read and must not see later writes to the row.
+        return dict(res.data[0]) if res.data else None
+
+    def frame(event):
+        status = event.get("status")
+        if "section" in event and status not in TERMINAL_STATUSES:
+            key, data = event["section"], event.get("data")
+            if columnar and key == "priceBehavior":
+                data = _columnar_charts({key: data})[key]
+            body = {"job_id": job_id, "status": status, "section": key, "data": data}
+            name = "section"
+        elif status not in TERMINAL_STATUSES:
+            body = {"job_id": job_id, "status": status}
+            if status == "pending":
+                position = worker_pool.get_queue_position(job_id)
+                if position is not None:
+                    body["queue_position"] = position
+            name = "status"
+        elif status == "completed":
+            # Events retained on the bus are stripped of the payload; the row has it.
+            report_data = event["report_data"] if "report_data" in event else (read_record() or {}).get("report_data")
+            body = {"job_id": job_id, "status": status,
+                    "report_data": _columnar_charts(report_data) if columnar else report_data}
+            name = "completed"
+        else:
+            body = {"job_id": job_id, "status": status, "error": event.get("error")}
+            name = "failed"
+        return f"id: {status}\nevent: {name}\ndata: {json.dumps(body, default=str)}\n\n"
+
+    # Subscribe before reading the row so no transition can fall between the two.
+    events = job_events.subscribe(job_id)
+    try:
+        record = read_record()
+    except Exception as e:
+        job_events.unsubscribe(job_id, events)
+        logger.error(f"Error opening stream for {job_id}: {e}")
+        return jsonify({"error": "Database retrieval exception"}), 500
+    if record is None:
+        job_events.unsubscribe(job_id, events)
+        return jsonify({"error": "Job ID not found"}), 404
+
+    sent_sections = set()
+
+    def section_frames(row):
+        """Frames for streamed sections in a DB row that this client has not been sent yet."""
+        partial = row.get("partial_report")
+        if row.get("status") in TERMINAL_STATUSES or not isinstance(partial, dict):
+            return
+        for key, value in partial.items():
+            if key not in sent_sections:
+                sent_sections.add(key)
+                yield frame({"status": row["status"], "section": key, "data": value})
+
+    def generate():
+        try:
+            last_status = record["status"]
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if last_status != last_event_id or last_status in TERMINAL_STATUSES:
+                yield frame(record)
+            if last_status in TERMINAL_STATUSES:
+                return
+            yield from section_frames(record)
+
+            started = last_poll = last_write = time.monotonic()
+            while time.monotonic() - started < STREAM_WINDOW_SEC:
+                try:
+                    event = events.get(timeout=min(STREAM_POLL_SEC, STREAM_HEARTBEAT_SEC))
+                except queue.Empty:
+                    event = None
+
+                now = time.monotonic()
+                if event is None and now - last_poll >= STREAM_POLL_SEC:
+                    last_poll = now
+                    try:
+                        event = read_record()
+                    except Exception as e:
+                        logger.warning(f"Stream DB fallback failed for {job_id}: {e}")
+                    else:
+                        for chunk in section_frames(event or {}):
+                            last_write = now
+                            yield chunk
+
+                if event is not None and "section" in event:
+                    sent_sections.add(event["section"])
+                    last_write = now
+                    yield frame(event)
+                elif event is not None and (event["status"] != last_status or event["status"] in TERMINAL_STATUSES):
+                    last_status = event["status"]
+                    last_write = now
+                    yield frame(event)
+                    if last_status in TERMINAL_STATUSES:
+                        return
+                elif now - last_write >= STREAM_HEARTBEAT_SEC:
+                    last_write = now
+                    yield ": keep-alive\n\n"
+        finally:
+            job_events.unsubscribe(job_id, events)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _columnar_charts(report_data):
+    """Shallow copy of report_data with priceBehavior chart rows converted to parallel arrays."""
+    behavior = (report_data or {}).get("priceBehavior") if isinstance(report_data, dict) else None
+    if not isinstance(behavior, dict):
+        return report_data
+    behavior = dict(behavior)
+    for key in ("chartData", "intradayData"):
+        if isinstance(behavior.get(key), list):
+            behavior[key] = rows_to_columns(behavior[key])
+    return {**report_data, "priceBehavior": behavior}
+
 def _find_report(job_id):
     """Look up a report from MOCK_REPORTS_DB (fallback) or real Supabase DB."""
     from reports.dependencies import MOCK_REPORTS_DB
@@ -119,6 +297,7 @@ def _find_report(job_id):
     return None
 
 @reports_v2_bp.route('/chat', methods=['POST'])
+@rate_limit(capacity=20, per_seconds=60, scope="reports_chat")
 def chat_with_report():
     payload = request.get_json()
     job_id = payload.get("job_id")
@@ -143,6 +322,7 @@ def chat_with_report():
         return jsonify({"error": str(e)}), 500
 
 @reports_v2_bp.route('/simulate', methods=['POST'])
+@rate_limit(capacity=10, per_seconds=60, scope="reports_simulate")
 def simulate_catalyst():
     payload = request.get_json()
     job_id = payload.get("job_id")
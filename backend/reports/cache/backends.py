@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from db.sqlite_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_path() -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # backend/
+    data_dir = os.path.join(base_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "report_cache.sqlite3")
+
+
+class CacheBackend(ABC):
+    """
+    Minimal key/value contract shared by the report cache tiers.
+
+    `get` returns ``(value, expires_at)`` so a slower tier can promote an entry
+    into a faster one without extending its lifetime.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _count(self, field: str, n: int = 1) -> None:
+        if n:
+            with self._stats_lock:
+                self._stats[field] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"backend": self.name, **self._stats}
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        ...
+
+
+class MemoryLRUBackend(CacheBackend):
+    """Per-process LRU with absolute expiry; bounded by entry count."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 256):
+        super().__init__()
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count("misses")
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                self._count("expirations")
+                self._count("misses")
+                return None
+            self._entries.move_to_end(key)
+        self._count("hits")
+        return entry
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self._count("evictions", evicted)
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    Host-wide tier shared by every gunicorn worker and surviving restarts.
+
+    Payloads are stored as zlib-compressed JSON. The table is capped by total
+    payload bytes; the least recently accessed rows are evicted first.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.db_path = db_path or os.getenv("REPORT_CACHE_SQLITE_PATH") or _default_cache_path()
+        self.max_bytes = max_bytes
+        self._pool = get_pool(self.db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._pool.connection()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS report_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_report_cache_accessed ON report_cache(accessed_at)")
+            conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM report_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM report_cache WHERE cache_key = ?", (key,))
+                conn.commit()
+                self._count("expirations")
+                self._count("misses")
+                return None
+            conn.execute("UPDATE report_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+            conn.commit()
+        self._count("hits")
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        payload = zlib.compress(json.dumps(value, default=str).encode("utf-8"), 6)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO report_cache (cache_key, payload, size, expires_at, accessed_at)
+                VALUES (?,?,?,?,?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    payload=excluded.payload, size=excluded.size,
+                    expires_at=excluded.expires_at, accessed_at=excluded.accessed_at
+                """,
+                (key, payload, len(payload), expires_at, now),
+            )
+            expired = conn.execute("DELETE FROM report_cache WHERE expires_at <= ?", (now,)).rowcount
+            evicted = self._enforce_size(conn)
+            conn.commit()
+        self._count("expirations", max(expired, 0))
+        self._count("evictions", evicted)
+
+    def _enforce_size(self, conn: sqlite3.Connection) -> int:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM report_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for cache_key, size in conn.execute(
+            "SELECT cache_key, size FROM report_cache ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM report_cache WHERE cache_key = ?", (cache_key,))
+            total -= size
+            evicted += 1
+        return evicted
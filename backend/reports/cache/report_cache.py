@@ -1,24 +1,50 @@
 import hashlib
 import json
 import logging
-from typing import Optional, Dict, Any
-# import redis
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+from reports.cache.backends import CacheBackend, MemoryLRUBackend, SqliteCacheBackend
+from utils.metrics import count_cache
 
 logger = logging.getLogger(__name__)
 
 class ReportCacheManager:
     """
     Manages idempotency and request deduplication.
-    If a user requests the exact same symbol and preferences within 24 hours,
+    If a user requests the exact same symbol and preferences within the TTL,
     serve the cached JSON immediately instead of wasting LLM API credits.
+
+    Lookups go through an in-process LRU first, then a SQLite tier shared by
+    all workers on the host (REPORT_CACHE_BACKEND = tiered | memory | sqlite).
     """
-    
-    def __init__(self, ttl_seconds: int = 600):
-        self._local_dev_cache = {}  # Fallback dictionary if Redis is offline
+
+    def __init__(self, ttl_seconds: int = 600, tiers: Optional[List[CacheBackend]] = None):
         self.ttl = ttl_seconds
-        
-        # self.redis_client = redis.Redis.from_url(conf.redis_url)
-        logger.info("ReportCacheManager initialized with 24h TTL idempotency.")
+        self.tiers = tiers if tiers is not None else self._build_tiers(os.getenv("REPORT_CACHE_BACKEND", "tiered"))
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        logger.info(
+            f"ReportCacheManager initialized with {self.ttl}s TTL idempotency "
+            f"({' -> '.join(t.name for t in self.tiers) or 'disabled'})."
+        )
+
+    @staticmethod
+    def _build_tiers(kind: str) -> List[CacheBackend]:
+        kind = (kind or "tiered").strip().lower()
+        tiers: List[CacheBackend] = []
+        if kind in ("memory", "tiered"):
+            tiers.append(MemoryLRUBackend(max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))))
+        if kind in ("sqlite", "tiered"):
+            try:
+                tiers.append(SqliteCacheBackend(max_bytes=int(os.getenv("REPORT_CACHE_MAX_MB", "64")) * 1024 * 1024))
+            except Exception as e:
+                logger.warning(f"Report cache SQLite tier unavailable, continuing memory-only. {e}")
+        return tiers
 
     def _generate_cache_key(self, symbol: str, preferences: Dict[str, bool]) -> str:
         """Deterministically hashes the payload to create a unique fingerprint."""
@@ -28,15 +54,21 @@ class ReportCacheManager:
     def get_cached_report(self, symbol: str, preferences: Dict[str, bool]) -> Optional[Dict[str, Any]]:
         """Retrieves a fully generated report structure if it exists and is fresh."""
         cache_key = self._generate_cache_key(symbol, preferences)
-        
+
         try:
-            # If using redis:
-            # data = self.redis_client.get(cache_key)
-            data = self._local_dev_cache.get(cache_key)
-            if data:
-                logger.info(f"CACHE HIT: Serving historical report for {symbol} bypassing LLM execution.")
+            for depth, tier in enumerate(self.tiers):
+                entry = tier.get(cache_key)
+                if entry is None:
+                    continue
+                data, expires_at = entry
+                # Promote into the faster tiers without extending the entry's lifetime.
+                for faster in self.tiers[:depth]:
+                    faster.set(cache_key, data, expires_at)
+                self._record(hit=True)
+                logger.info(f"CACHE HIT ({tier.name}): Serving historical report for {symbol} bypassing LLM execution.")
                 return dict(data)
-                
+
+            self._record(hit=False)
             logger.debug(f"CACHE MISS: No fresh report found for {symbol}.")
             return None
         except Exception as e:
@@ -46,12 +78,34 @@ class ReportCacheManager:
     def store_report(self, symbol: str, preferences: Dict[str, bool], report_data: Dict[str, Any]):
         """Persists the generation output into the caching layer for future idempotency."""
         cache_key = self._generate_cache_key(symbol, preferences)
-        
-        try:
-            self._local_dev_cache[cache_key] = report_data
-            # self.redis_client.setex(cache_key, self.ttl, json.dumps(report_data))
-            logger.debug(f"Successfully cached report artifact for {symbol} with TTL {self.ttl}s")
-        except Exception as e:
-            logger.error(f"Cache persistence failed. Document omitted from fast-path. {e}")
+        expires_at = time.time() + self.ttl
+
+        for tier in self.tiers:
+            try:
+                tier.set(cache_key, report_data, expires_at)
+            except Exception as e:
+                logger.error(f"Cache persistence failed ({tier.name}). Document omitted from fast-path. {e}")
+        logger.debug(f"Successfully cached report artifact for {symbol} with TTL {self.ttl}s")
+
+    def _record(self, hit: bool) -> None:
+        count_cache("report", hit)
+        with self._stats_lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Overall hit/miss counters plus per-tier hits, misses and evictions."""
+        with self._stats_lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "ttl_seconds": self.ttl,
+            "tiers": [t.stats() for t in self.tiers],
+        }
 
-cache_engine = ReportCacheManager()
+cache_engine = ReportCacheManager(ttl_seconds=int(os.getenv("REPORT_CACHE_TTL_SEC", "600")))
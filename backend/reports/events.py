@@ -0,0 +1,83 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+# Payload fields dropped from the retained last event; subscribers read them from the row.
+_UNRETAINED_FIELDS = ("report_data", "partial_report", "section", "data")
+
+
+class JobEventBus:
+    """
+    In-process pub/sub for report job status transitions.
+
+    The orchestrator publishes every status it records; SSE handlers subscribe
+    per job_id. The last event of each job is retained (bounded LRU) so a
+    subscriber that connects between two transitions still starts from the
+    current state; only its status fields are kept, not the report payload.
+    Events only reach subscribers in the publishing process —
+    the stream endpoint falls back to the database for jobs run elsewhere.
+    """
+
+    def __init__(self, max_jobs: int = 1000, subscriber_queue_size: int = 64):
+        self.max_jobs = max(1, max_jobs)
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        self._last: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._last[job_id] = {k: v for k, v in event.items() if k not in _UNRETAINED_FIELDS}
+            self._last.move_to_end(job_id)
+            while len(self._last) > self.max_jobs:
+                self._last.popitem(last=False)
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # A stalled client only needs the latest state; drop the oldest event.
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    logger.warning(f"Dropping event for slow subscriber of Job <{job_id}>")
+
+    def subscribe(self, job_id: str) -> queue.Queue:
+        """Returns a queue receiving this job's events, primed with its last known event."""
+        q: queue.Queue = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(q)
+            last = self._last.get(job_id)
+        if last is not None:
+            q.put_nowait(last)
+        return q
+
+    def unsubscribe(self, job_id: str, q: queue.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if not subscribers:
+                return
+            try:
+                subscribers.remove(q)
+            except ValueError:
+                pass
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def last_event(self, job_id: str):
+        with self._lock:
+            return self._last.get(job_id)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+job_events = JobEventBus(max_jobs=int(os.getenv("REPORT_EVENTS_MAX_JOBS", "1000")))
@@ -36,3 +36,9 @@ class InvalidAnalysisPreferenceError(ReportDomainException):
     """Raised when user requests an analysis dimension that is disabled or invalid."""
     def __init__(self, message: str = "The requested analysis preference is invalid.", payload=None):
         super().__init__(message, status_code=400, payload=payload)
+
+class WorkerQueueFullError(ReportDomainException):
+    """Raised when the report worker queue is at capacity and cannot accept more jobs."""
+    def __init__(self, message: str = "Report workers are saturated. Please retry shortly.", retry_after: int = 15, payload=None):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=503, payload={**(payload or {}), "retry_after": retry_after})
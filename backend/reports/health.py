@@ -2,6 +2,8 @@ import logging
 import time
 from flask import Blueprint, jsonify
 from reports.dependencies import report_di
+from reports.cache.report_cache import cache_engine
+from reports.queue.worker import worker_pool
 from db.database import supabase
 # import redis
 
@@ -62,6 +64,10 @@ def readiness_probe():
         health_status["dependencies"]["llm_manager"] = "degraded"
         health_status["status"] = "degraded"
         
+    # 3. Report cache effectiveness (informational, never degrades the probe)
+    health_status["report_cache"] = cache_engine.stats()
+    health_status["worker_pool"] = worker_pool.stats()
+
     duration = time.time() - start_time
     health_status["probe_duration_sec"] = round(duration, 4)
     
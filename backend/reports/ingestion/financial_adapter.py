@@ -1,15 +1,77 @@
 import logging
+import os
+import threading
 import time
 import datetime
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
 
+from utils.chart_payload import columns_to_rows, ohlcv_columns
+from services.market_providers import get_market_provider
+from utils.metrics import count_cache
+
 logger = logging.getLogger(__name__)
 
 
+class MarketContextCache:
+    """
+    Raw yfinance payloads per symbol, each component with its own freshness.
+
+    Fundamentals barely move intraday while 5m bars change every few minutes,
+    so `info`, `history`, `intraday` and `news` expire independently and a
+    regeneration only refetches the stale ones. Bounded LRU over symbols.
+    """
+
+    COMPONENTS = ("info", "history", "intraday", "news")
+
+    def __init__(self, ttls: Dict[str, float], max_symbols: int = 128):
+        self.ttls = ttls
+        self.max_symbols = max(1, max_symbols)
+        self._entries: "OrderedDict[str, Dict[str, Tuple[Any, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_fresh(self, symbol: str) -> Dict[str, Tuple[Any, float]]:
+        """Returns {component: (value, fetched_at)} for components still within their TTL."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                return {}
+            self._entries.move_to_end(symbol)
+            return {
+                name: (value, fetched_at)
+                for name, (value, fetched_at) in entry.items()
+                if now - fetched_at < self.ttls.get(name, 0)
+            }
+
+    def put(self, symbol: str, components: Dict[str, Any]) -> None:
+        if not components:
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(symbol, {})
+            for name, value in components.items():
+                entry[name] = (value, now)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_symbols:
+                self._entries.popitem(last=False)
+
+
+market_context_cache = MarketContextCache(
+    ttls={
+        "info": float(os.getenv("MARKET_CTX_INFO_TTL_SEC", "3600")),
+        "history": float(os.getenv("MARKET_CTX_HISTORY_TTL_SEC", "1800")),
+        "intraday": float(os.getenv("MARKET_CTX_INTRADAY_TTL_SEC", "60")),
+        "news": float(os.getenv("MARKET_CTX_NEWS_TTL_SEC", "900")),
+    },
+    max_symbols=int(os.getenv("MARKET_CTX_CACHE_MAX_SYMBOLS", "128")),
+)
+
+
 class FinancialDataAdapter:
     """
     Live financial data ingestion layer using yfinance.
@@ -17,9 +79,10 @@ class FinancialDataAdapter:
     for any globally listed ticker symbol.
     """
 
-    def __init__(self, timeout_sec: int = 10):
+    def __init__(self, timeout_sec: int = 10, provider=None):
         self.timeout = timeout_sec
-        logger.info(f"FinancialDataAdapter initialized (live yfinance mode, timeout={self.timeout}s)")
+        self.provider = provider or get_market_provider()
+        logger.info(f"FinancialDataAdapter initialized ({self.provider.name} mode, timeout={self.timeout}s)")
 
     def fetch_market_context(self, symbol: str) -> Dict[str, Any]:
         """
@@ -35,49 +98,76 @@ class FinancialDataAdapter:
         logger.info(f"Fetching live market data for {ticker_symbol} via yfinance...")
 
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            
+            provider = self.provider
+
             def _get_info():
-                return ticker.info
+                return provider.info(ticker_symbol)
                 
             def _get_history():
-                return ticker.history(period="2y", interval="1d", auto_adjust=True)
+                return provider.history(ticker_symbol, period="2y", interval="1d", auto_adjust=True)
                 
             def _get_intraday():
-                return ticker.history(period="1d", interval="5m", auto_adjust=True)
+                return provider.history(ticker_symbol, period="1d", interval="5m", auto_adjust=True)
                 
             def _get_news():
                 try:
                     # yfinance news can sometimes raise TypeError internally
-                    val = ticker.news
+                    val = provider.news(ticker_symbol)
                     return val if val is not None else []
                 except Exception as e:
                     logger.warning(f"Internal yfinance news fetch error: {e}")
-                    return []
-
-            logger.info(f"Parallelizing data fetching for {ticker_symbol}...")
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                future_info = executor.submit(_get_info)
-                future_hist = executor.submit(_get_history)
-                future_intra = executor.submit(_get_intraday)
-                future_news = executor.submit(_get_news)
-                
-                info = future_info.result()
-                hist_df = future_hist.result()
-                intra_df = future_intra.result()
-                raw_news = future_news.result()
+                    return None  # failed, not empty: kept out of the cache
+
+            fetchers = {
+                "info": _get_info,
+                "history": _get_history,
+                "intraday": _get_intraday,
+                "news": _get_news,
+            }
+            cached = market_context_cache.get_fresh(ticker_symbol)
+            stale = [name for name in fetchers if name not in cached]
+            for name in fetchers:
+                count_cache(f"market_context_{name}", name in cached)
+            fetched: Dict[str, Any] = {}
+            if stale:
+                logger.info(f"Parallelizing data fetching for {ticker_symbol} ({', '.join(stale)})...")
+                with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                    futures = {name: executor.submit(fetchers[name]) for name in stale}
+                    fetched = {name: future.result() for name, future in futures.items()}
+            else:
+                logger.info(f"Serving market context for {ticker_symbol} entirely from cache.")
+
+            def _component(name):
+                return fetched[name] if name in fetched else cached[name][0]
+
+            info = _component("info")
+            hist_df = _component("history")
+            intra_df = _component("intraday")
+            raw_news = _component("news") or []
 
             # Validate ticker returned actual data (not empty dict)
             if not info or (info.get("regularMarketPrice") is None and info.get("currentPrice") is None):
                 logger.warning(f"yfinance returned empty info for {ticker_symbol}. Symbol may be delisted or invalid.")
                 raise ValueError(f"No market data found for symbol: {ticker_symbol}")
 
+            # Empty frames and failed news fetches (None) are usually transient upstream
+            # hiccups — don't pin them for a full TTL.
+            market_context_cache.put(ticker_symbol, {
+                name: value for name, value in fetched.items()
+                if value is not None and not (isinstance(value, pd.DataFrame) and value.empty)
+            })
+
             # ── Core Price Data ──────────────────────────────────────────────
             current_price = (
                 info.get("currentPrice") or
                 info.get("regularMarketPrice") or
                 info.get("previousClose") or 0.0
             )
+            if "info" not in fetched and not intra_df.empty and "Close" in intra_df:
+                # Cached fundamentals can be an hour old; take the price from the fresher 5m bars.
+                last_close = intra_df["Close"].dropna()
+                if not last_close.empty:
+                    current_price = round(float(last_close.iloc[-1]), 2)
             prev_close = info.get("previousClose") or info.get("regularMarketPreviousClose") or current_price
             price_change_pct = ((current_price - prev_close) / prev_close * 100) if prev_close else 0.0
 
@@ -218,17 +308,11 @@ class FinancialDataAdapter:
                 return []
 
             hist = hist.dropna(subset=['Close', 'Open', 'High', 'Low'])
-            chart_data = []
-            for date_idx, row in hist.iterrows():
-                date_str = date_idx.strftime("%b %d, %Y") if hasattr(date_idx, 'strftime') else str(date_idx)[:10]
-                chart_data.append({
-                    "date": date_str,
-                    "price": round(float(row["Close"]), 2),
-                    "open": round(float(row["Open"]), 2),
-                    "high": round(float(row["High"]), 2),
-                    "low": round(float(row["Low"]), 2),
-                    "volume": int(row["Volume"]) if not pd.isna(row["Volume"]) else 0,
-                })
+            columns = ohlcv_columns(hist, "%b %d, %Y")
+            chart_data = columns_to_rows(columns, {
+                "date": "dates", "price": "close", "open": "open",
+                "high": "high", "low": "low", "volume": "volume",
+            })
 
             logger.info(f"Parsed {len(chart_data)} days of real price history for {symbol}")
             return chart_data
@@ -246,13 +330,8 @@ class FinancialDataAdapter:
                 return []
 
             hist = hist.dropna(subset=['Close'])
-            intraday_data = []
-            for date_idx, row in hist.iterrows():
-                time_str = date_idx.strftime("%I:%M %p") if hasattr(date_idx, 'strftime') else str(date_idx)[11:16]
-                intraday_data.append({
-                    "date": time_str,
-                    "price": round(float(row["Close"]), 2)
-                })
+            columns = ohlcv_columns(hist, "%I:%M %p", fields=("close",))
+            intraday_data = columns_to_rows(columns, {"date": "dates", "price": "close"})
 
             logger.info(f"Parsed {len(intraday_data)} intraday ticks for {symbol}")
             return intraday_data
@@ -268,20 +347,13 @@ class FinancialDataAdapter:
         if len(chart_data) < 5:
             return 0.0
         try:
-            prices = [d["price"] for d in chart_data]
-            returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))]
-            if not returns:
-                return 0.0
-            mean = sum(returns) / len(returns)
-            variance = sum((r - mean) ** 2 for r in returns) / len(returns)
-            std_dev = variance ** 0.5
-            annualised = std_dev * (252 ** 0.5)
-            import math
-            if math.isnan(annualised):
+            prices = np.fromiter((d["price"] for d in chart_data), dtype=float, count=len(chart_data))
+            returns = np.diff(prices) / prices[:-1]
+            annualised = float(returns.std()) * (252 ** 0.5)
+            if np.isnan(annualised):
                 return 0.0
             return round(annualised * 100, 2)  # As a percentage
         except Exception:
             return 0.0
 
-
 financial_ingestion_engine = FinancialDataAdapter()
@@ -1,23 +1,47 @@
 import logging
-from typing import Dict, Any, Optional
+import os
+import threading
+from typing import Dict, Any, Optional, List
 import uuid
 import time
 
 from reports.contracts import ReportJobContract, ReportPreferencesContract
 from reports.dependencies import report_di
 from reports.queue.worker import worker_pool
+from reports.exceptions import WorkerQueueFullError
 from reports.ingestion.financial_adapter import financial_ingestion_engine
 from reports.cache.report_cache import cache_engine
+from reports.events import job_events
+from utils.metrics import REPORT_STAGE_SECONDS
 from utils.prompts import PromptRegistry
 
 logger = logging.getLogger(__name__)
 
+# Streamed sections reach SSE subscribers immediately over the bus; the replay copy
+# in the row's partial_report (late subscribers, other workers) is rewritten at
+# most this often, so row writes do not grow with the number of sections.
+PARTIAL_FLUSH_SEC = float(os.getenv("REPORT_PARTIAL_FLUSH_SEC", "3"))
+
 class ReportGenerationOrchestrator:
     """
     The Core Application Service (Use-Case Interactor) for the bounds of Report Generation.
     Coordinates between Caching, DB, Queues, Data ingestion, and the AI providers.
+
+    Identical requests (same cache fingerprint) that arrive while a job is
+    running attach to it as followers: each gets its own job_id, mirrors the
+    leader's status updates and receives the same report on completion.
+    Every status write is also published on `job_events` for the SSE stream.
+    While the report is generated, each completed section is published as a
+    section event for progressive display and kept, throttled, in the row's
+    partial_report column; report_data only ever holds the finished report.
     """
-    
+
+    # fingerprint -> {"leader": job_id, "followers": [job_id, ...], "status": str,
+    #                 "lock": Lock guarding followers/status/done, "done": bool}
+    # _inflight_lock only guards the dict itself; it is never held across a DB call.
+    _inflight: Dict[str, Dict[str, Any]] = {}
+    _inflight_lock = threading.Lock()
+
     @staticmethod
     def initiate_report(symbol: str, user_id: str, prefs: Dict[str, bool]) -> str:
         db = report_di.get_db_client()
@@ -34,41 +58,150 @@ class ReportGenerationOrchestrator:
             }).execute()
             return job_id
 
-        # 2. Persist initial pending state
-        logger.debug(f"Creating new Job Record in DB: {job_id}")
-        db.table("reports").insert({
-            "id": job_id, "user_id": user_id, "symbol": symbol, "status": "pending"
-        }).execute()
-        
-        # 3. Offload to local queue or Celery
-        worker_pool.submit_job(
-            job_id=job_id,
-            target_func=ReportGenerationOrchestrator._background_process,
-            args=(),
-            kwargs={"job_id": job_id, "symbol": symbol, "prefs": prefs}
-        )
+        # 2. Attach to an identical job that is already running, if any
+        fingerprint = cache_engine._generate_cache_key(symbol, prefs)
+        while True:
+            with ReportGenerationOrchestrator._inflight_lock:
+                inflight = ReportGenerationOrchestrator._inflight.get(fingerprint)
+                if inflight is None:
+                    ReportGenerationOrchestrator._inflight[fingerprint] = {
+                        "leader": job_id, "followers": [], "status": "pending",
+                        "lock": threading.Lock(), "done": False,
+                    }
+                    break
+            # The follower insert holds only this job's lock, so a slow DB write
+            # never stalls requests for other reports.
+            with inflight["lock"]:
+                if not inflight["done"]:
+                    # Inserted before joining so the leader's final broadcast can't miss this record.
+                    db.table("reports").insert({
+                        "id": job_id, "user_id": user_id, "symbol": symbol, "status": inflight["status"]
+                    }).execute()
+                    inflight["followers"].append(job_id)
+                    logger.info(f"Job <{job_id}> coalesced onto in-flight Job <{inflight['leader']}> for {symbol}.")
+                    return job_id
+            # The leader finished between the lookup and the join: start over.
+
+        try:
+            # 3. Persist initial pending state
+            logger.debug(f"Creating new Job Record in DB: {job_id}")
+            db.table("reports").insert({
+                "id": job_id, "user_id": user_id, "symbol": symbol, "status": "pending"
+            }).execute()
+
+            # 4. Offload to local queue or Celery
+            worker_pool.submit_job(
+                job_id=job_id,
+                target_func=ReportGenerationOrchestrator._background_process,
+                args=(),
+                kwargs={"job_id": job_id, "symbol": symbol, "prefs": prefs}
+            )
+        except Exception as e:
+            # Don't leave pending records (ours or coalesced followers') that no worker will pick up.
+            error = e.message if isinstance(e, WorkerQueueFullError) else str(e)
+            try:
+                ReportGenerationOrchestrator._set_status(
+                    fingerprint, job_id, {"status": "failed", "error": error}, final=True
+                )
+            except Exception as status_err:
+                logger.error(f"Failed to mark Job <{job_id}> as failed: {status_err}")
+            raise
         return job_id
 
     @staticmethod
-    def _background_process(job_id: str, symbol: str, prefs: Dict[str, bool]):
+    def _targets(fingerprint: str, job_id: str, status: Optional[str] = None, final: bool = False) -> List[str]:
+        """The leader job plus its followers; records `status` and detaches the fingerprint on `final`."""
+        cls = ReportGenerationOrchestrator
+        targets: List[str] = [job_id]
+        with cls._inflight_lock:
+            inflight = cls._inflight.get(fingerprint)
+            if inflight is None or inflight["leader"] != job_id:
+                return targets
+            if final:
+                del cls._inflight[fingerprint]
+        with inflight["lock"]:
+            targets += inflight["followers"]
+            if status is not None:
+                inflight["status"] = status
+            if final:
+                inflight["done"] = True
+        return targets
+
+    @staticmethod
+    def _update_rows(targets: List[str], fields: Dict[str, Any]) -> None:
         db = report_di.get_db_client()
+        for target in targets:
+            try:
+                db.table("reports").update(fields).eq("id", target).execute()
+            except Exception as e:
+                if target == targets[0]:
+                    raise
+                logger.error(f"Failed to mirror status to coalesced Job <{target}>: {e}")
+
+    @staticmethod
+    def _set_status(fingerprint: str, job_id: str, fields: Dict[str, Any], final: bool = False,
+                    clear_partial: bool = False) -> None:
+        """
+        Writes a status update to the leader job and every follower attached to it.
+        A final update also detaches the fingerprint so new requests start fresh;
+        with `clear_partial` (the job flushed a partial_report) it clears that too.
+        Jobs that never flushed one never write the column, so databases without it
+        keep working while streaming is off.
+        """
+        cls = ReportGenerationOrchestrator
+        if final and clear_partial:
+            fields = {**fields, "partial_report": None}
+        targets = cls._targets(fingerprint, job_id, fields.get("status"), final)
+        cls._update_rows(targets, fields)
+        # Push to SSE subscribers only once the rows reflect the same state.
+        for target in targets:
+            job_events.publish(target, {"job_id": target, **fields})
+
+    @staticmethod
+    def _publish_section(fingerprint: str, job_id: str, key: str, value: Any,
+                         partial: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Publishes one streamed section to the leader's and followers' subscribers.
+        With `partial` (all sections so far) the rows' replay copy is rewritten too.
+        """
+        cls = ReportGenerationOrchestrator
+        targets = cls._targets(fingerprint, job_id)
+        if partial is not None:
+            cls._update_rows(targets, {"partial_report": partial})
+        for target in targets:
+            job_events.publish(target, {
+                "job_id": target, "status": "processing:generating_report", "section": key, "data": value,
+            })
+
+    @staticmethod
+    def _observe_failure(stage: str, stage_started: float, pipeline_started: float) -> None:
+        now = time.perf_counter()
+        REPORT_STAGE_SECONDS.labels(stage=stage, outcome="error").observe(now - stage_started)
+        REPORT_STAGE_SECONDS.labels(stage="total", outcome="error").observe(now - pipeline_started)
+
+    @staticmethod
+    def _background_process(job_id: str, symbol: str, prefs: Dict[str, bool]):
         llm = report_di.get_llm_manager()
         pipeline_started = time.perf_counter()
+        fingerprint = cache_engine._generate_cache_key(symbol, prefs)
+        set_status = ReportGenerationOrchestrator._set_status
+        stage, stage_started = "queued", pipeline_started
+        flushed_at = None  # set once a partial_report has been written to the rows
         
         try:
-            db.table("reports").update({"status": "processing:fetching_data"}).eq("id", job_id).execute()
+            set_status(fingerprint, job_id, {"status": "processing:fetching_data"})
             
             # ── Step 1: Fetch real live market data from yfinance ─────────────
-            stage_started = time.perf_counter()
+            stage, stage_started = "fetching_data", time.perf_counter()
             market_data = financial_ingestion_engine.fetch_market_context(symbol)
-            logger.info(
-                f"Job <{job_id}> stage=fetching_data completed in {time.perf_counter() - stage_started:.2f}s"
-            )
+            elapsed = time.perf_counter() - stage_started
+            REPORT_STAGE_SECONDS.labels(stage="fetching_data", outcome="success").observe(elapsed)
+            logger.info(f"Job <{job_id}> stage=fetching_data completed in {elapsed:.2f}s")
             
-            db.table("reports").update({"status": "processing:analyzing_context"}).eq("id", job_id).execute()
+            set_status(fingerprint, job_id, {"status": "processing:analyzing_context"})
             # ── Step 2: Enrich context for the LLM prompt ────────────────────
             # Pass live fundamentals so Gemini's narrative is grounded in reality
-            stage_started = time.perf_counter()
+            stage, stage_started = "analyzing_context", time.perf_counter()
             meta = market_data.get("company_meta", {})
             fund = market_data.get("fundamentals", {})
             prompt_context = {
@@ -98,56 +231,71 @@ class ReportGenerationOrchestrator:
                     "company_description": meta.get("description", ""),
                 },
             }
-            logger.info(
-                f"Job <{job_id}> stage=analyzing_context completed in {time.perf_counter() - stage_started:.2f}s"
-            )
+            elapsed = time.perf_counter() - stage_started
+            REPORT_STAGE_SECONDS.labels(stage="analyzing_context", outcome="success").observe(elapsed)
+            logger.info(f"Job <{job_id}> stage=analyzing_context completed in {elapsed:.2f}s")
             
             # ── Step 3: Build the AI prompt with real grounded context ────────
-            stage_started = time.perf_counter()
+            stage, stage_started = "prompt_build", time.perf_counter()
             prompt = PromptRegistry.construct_analysis_prompt(prompt_context, prefs)
-            logger.info(
-                f"Job <{job_id}> stage=prompt_build completed in {time.perf_counter() - stage_started:.2f}s"
-            )
+            elapsed = time.perf_counter() - stage_started
+            REPORT_STAGE_SECONDS.labels(stage="prompt_build", outcome="success").observe(elapsed)
+            logger.info(f"Job <{job_id}> stage=prompt_build completed in {elapsed:.2f}s")
             
             # ── Step 4: Run Gemini, inject real OHLCV chart data into output ──
-            db.table("reports").update({"status": "processing:generating_report"}).eq("id", job_id).execute()
-            stage_started = time.perf_counter()
-            report_json = llm.generate_json(prompt, market_context=market_data)
+            set_status(fingerprint, job_id, {"status": "processing:generating_report"})
+            stage, stage_started = "generating_report", time.perf_counter()
+            partial_report: Dict[str, Any] = {}
+
+            def publish_section(key: str, value: Any) -> None:
+                nonlocal flushed_at
+                partial_report[key] = value
+                now = time.monotonic()
+                persist = flushed_at is None or now - flushed_at >= PARTIAL_FLUSH_SEC
+                if persist:
+                    flushed_at = now
+                ReportGenerationOrchestrator._publish_section(
+                    fingerprint, job_id, key, value, partial=dict(partial_report) if persist else None
+                )
+
+            report_json = llm.generate_json(prompt, market_context=market_data, on_section=publish_section)
             # Preserve latest fetched headlines for UI sentiment context (no prompt/schema change).
             if isinstance(report_json, dict):
                 report_json["marketNews"] = market_data.get("news", [])[:5]
-            logger.info(
-                f"Job <{job_id}> stage=generating_report completed in {time.perf_counter() - stage_started:.2f}s"
-            )
+            elapsed = time.perf_counter() - stage_started
+            REPORT_STAGE_SECONDS.labels(stage="generating_report", outcome="success").observe(elapsed)
+            logger.info(f"Job <{job_id}> stage=generating_report completed in {elapsed:.2f}s")
             
             # ── Step 5: Cache and persist ────────────────────────────────────
-            db.table("reports").update({"status": "processing:finalizing"}).eq("id", job_id).execute()
-            stage_started = time.perf_counter()
+            set_status(fingerprint, job_id, {"status": "processing:finalizing"})
+            stage, stage_started = "finalizing", time.perf_counter()
             cache_engine.store_report(symbol, prefs, report_json)
             
-            db.table("reports").update({
+            set_status(fingerprint, job_id, {
                 "status": "completed",
                 "report_data": report_json
-            }).eq("id", job_id).execute()
-            logger.info(
-                f"Job <{job_id}> stage=finalizing completed in {time.perf_counter() - stage_started:.2f}s"
-            )
-            logger.info(
-                f"Job <{job_id}> pipeline=completed total_elapsed={time.perf_counter() - pipeline_started:.2f}s"
-            )
+            }, final=True, clear_partial=flushed_at is not None)
+            elapsed = time.perf_counter() - stage_started
+            REPORT_STAGE_SECONDS.labels(stage="finalizing", outcome="success").observe(elapsed)
+            logger.info(f"Job <{job_id}> stage=finalizing completed in {elapsed:.2f}s")
+            total = time.perf_counter() - pipeline_started
+            REPORT_STAGE_SECONDS.labels(stage="total", outcome="success").observe(total)
+            logger.info(f"Job <{job_id}> pipeline=completed total_elapsed={total:.2f}s")
 
         except ConnectionError as ce:
+            ReportGenerationOrchestrator._observe_failure(stage, stage_started, pipeline_started)
             # Symbol not found or yfinance failed
             logger.error(f"Market data fetch failed for {job_id} ({symbol}): {ce}")
-            db.table("reports").update({
+            set_status(fingerprint, job_id, {
                 "status": "failed", "error": str(ce)
-            }).eq("id", job_id).execute()
+            }, final=True, clear_partial=flushed_at is not None)
         except Exception as e:
+            ReportGenerationOrchestrator._observe_failure(stage, stage_started, pipeline_started)
             logger.error(f"Orchestrator pipeline failed for {job_id}: {e}")
             logger.info(
                 f"Job <{job_id}> pipeline=failed total_elapsed={time.perf_counter() - pipeline_started:.2f}s"
             )
-            db.table("reports").update({
+            set_status(fingerprint, job_id, {
                 "status": "failed", "error": str(e)
-            }).eq("id", job_id).execute()
+            }, final=True, clear_partial=flushed_at is not None)
             raise e
@@ -1,59 +1,178 @@
+import os
 import time
+import queue
 import logging
 import threading
-from typing import Callable, Tuple, Dict, Any
+import itertools
+from collections import OrderedDict, deque
+from typing import Callable, Tuple, Dict, Any, Optional
+
+from config.settings import conf
+from reports.exceptions import WorkerQueueFullError
+from utils.metrics import REPORT_QUEUE_DEPTH
 
 logger = logging.getLogger(__name__)
 
+_STOP = object()
+_TERMINAL_STATES = ("completed", "failed")
+
+
 class LightweightWorkerPool:
     """
     A standalone task queue manager replacing ThreadPoolExecutor.
     Implements active job tracking, graceful shutdowns, and dead-letter queues.
     This isolates the Flask application from CPU-bound or blocking I/O bound LLM tasks.
+
+    A fixed set of worker threads drains a bounded priority queue; once the
+    queue holds `max_queue_depth` pending jobs, new submissions are rejected
+    with WorkerQueueFullError instead of spawning more threads.
     """
-    
-    def __init__(self, max_concurrency: int = 5):
-        self.max_concurrency = max_concurrency
+
+    def __init__(
+        self,
+        max_concurrency: int = 5,
+        max_queue_depth: int = 50,
+        registry_max_entries: int = 1000,
+        registry_ttl_seconds: int = 3600,
+        dlq_max_entries: int = 100,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.registry_max_entries = registry_max_entries
+        self.registry_ttl_seconds = registry_ttl_seconds
         self.active_threads = []
-        self.job_registry: Dict[str, str] = {}
-        
+        self.job_registry: "OrderedDict[str, str]" = OrderedDict()
+        self._finished_at: Dict[str, float] = {}
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
         # Dead Letter Queue for failed jobs requiring human inspection
-        self.dlq = []
-        logger.info(f"LightweightWorkerPool initialized with {self.max_concurrency} max workers.")
-
-    def submit_job(self, job_id: str, target_func: Callable, args: Tuple, kwargs: Dict[str, Any]):
-        """Dispatches a job to a background daemon thread immediately."""
-        self.job_registry[job_id] = "queued"
-        
-        def run_wrapped_job():
-            logger.info(f"Worker claimed Job <{job_id}>. Executing pipeline...")
-            self.job_registry[job_id] = "processing"
-            start_time = time.time()
-            
+        self.dlq = deque(maxlen=dlq_max_entries)
+        logger.info(
+            f"LightweightWorkerPool initialized with {self.max_concurrency} max workers "
+            f"and queue depth {self.max_queue_depth}."
+        )
+
+    def _ensure_workers(self) -> None:
+        """Starts (or replaces dead) worker threads up to max_concurrency. Caller holds the lock."""
+        self.active_threads = [t for t in self.active_threads if t.is_alive()]
+        while len(self.active_threads) < self.max_concurrency:
+            t = threading.Thread(
+                target=self._worker_loop, daemon=True, name=f"ReportWorker-{len(self.active_threads)}"
+            )
+            t.start()
+            self.active_threads.append(t)
+
+    def submit_job(self, job_id: str, target_func: Callable, args: Tuple, kwargs: Dict[str, Any], priority: int = 10):
+        """
+        Enqueues a job for the worker threads. Lower `priority` values run first;
+        jobs of equal priority run in submission order.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise WorkerQueueFullError("Report workers are shutting down.")
+            if len(self._pending) >= self.max_queue_depth:
+                logger.warning(f"Worker queue full ({len(self._pending)} pending) — rejecting Job <{job_id}>.")
+                raise WorkerQueueFullError(retry_after=self._retry_after_hint())
+            self._ensure_workers()
+            key = (priority, next(self._sequence))
+            self._pending[job_id] = key
+            self._set_state(job_id, "queued")
+            self._queue.put((key[0], key[1], job_id, target_func, args, kwargs))
+            REPORT_QUEUE_DEPTH.set(len(self._pending))
+
+        logger.info(f"Job <{job_id}> queued at position {self.get_queue_position(job_id)}.")
+
+    def _retry_after_hint(self) -> int:
+        # Roughly one job's worth of wait per concurrent slot ahead of the caller.
+        return max(5, min(120, 15 * len(self._pending) // self.max_concurrency))
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._queue.get()
             try:
-                target_func(*args, **kwargs)
-                self.job_registry[job_id] = "completed"
-            except Exception as e:
-                logger.error(f"Worker experienced critical failure on Job <{job_id}>: {e}")
-                self.job_registry[job_id] = "failed"
-                # Move to Dead Letter Queue for inspection
-                self.dlq.append({"job_id": job_id, "error": str(e), "timestamp": time.time()})
+                if item[2] is _STOP:
+                    return
+                _, _, job_id, target_func, args, kwargs = item
+                with self._lock:
+                    self._pending.pop(job_id, None)
+                    REPORT_QUEUE_DEPTH.set(len(self._pending))
+                self._run_job(job_id, target_func, args, kwargs)
             finally:
-                elapsed = time.time() - start_time
-                logger.debug(f"Worker released Job <{job_id}> after {elapsed:.2f}s")
-        
-        # Clean up dead threads to prevent memory leaks over time
-        self.active_threads = [t for t in self.active_threads if t.is_alive()]
-        
-        if len(self.active_threads) >= self.max_concurrency:
-            logger.warning("Worker pool saturated. Job queued but execution delayed.")
-            # In a real system, the task remains in queue until a thread frees up.
-            # Here we will still force creation but log heavily.
-            
-        t = threading.Thread(target=run_wrapped_job, daemon=True, name=f"Worker-{job_id[:6]}")
-        t.start()
-        self.active_threads.append(t)
-        
-        logger.info(f"Job <{job_id}> successfully dispatched to threaded pool.")
-
-worker_pool = LightweightWorkerPool()
+                self._queue.task_done()
+
+    def _run_job(self, job_id: str, target_func: Callable, args: Tuple, kwargs: Dict[str, Any]) -> None:
+        logger.info(f"Worker claimed Job <{job_id}>. Executing pipeline...")
+        with self._lock:
+            self._set_state(job_id, "processing")
+        start_time = time.time()
+
+        try:
+            target_func(*args, **kwargs)
+            with self._lock:
+                self._set_state(job_id, "completed")
+        except Exception as e:
+            logger.error(f"Worker experienced critical failure on Job <{job_id}>: {e}")
+            with self._lock:
+                self._set_state(job_id, "failed")
+            # Move to Dead Letter Queue for inspection
+            self.dlq.append({"job_id": job_id, "error": str(e), "timestamp": time.time()})
+        finally:
+            elapsed = time.time() - start_time
+            logger.debug(f"Worker released Job <{job_id}> after {elapsed:.2f}s")
+
+    def _set_state(self, job_id: str, state: str) -> None:
+        """Records a job state and prunes finished entries. Caller holds the lock."""
+        self.job_registry[job_id] = state
+        if state in _TERMINAL_STATES:
+            self._finished_at[job_id] = time.time()
+            self.job_registry.move_to_end(job_id)
+            self._prune_registry()
+
+    def _prune_registry(self) -> None:
+        cutoff = time.time() - self.registry_ttl_seconds
+        for job_id in list(self._finished_at):
+            if self._finished_at[job_id] >= cutoff and len(self.job_registry) <= self.registry_max_entries:
+                break
+            # _finished_at is insertion-ordered, so the oldest finished jobs go first.
+            del self._finished_at[job_id]
+            self.job_registry.pop(job_id, None)
+
+    def get_queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among pending jobs, or None if the job is not waiting in this process."""
+        with self._lock:
+            key = self._pending.get(job_id)
+            if key is None:
+                return None
+            return 1 + sum(1 for other in self._pending.values() if other < key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": sum(1 for t in self.active_threads if t.is_alive()),
+                "max_concurrency": self.max_concurrency,
+                "queued": len(self._pending),
+                "max_queue_depth": self.max_queue_depth,
+                "dead_letters": len(self.dlq),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops accepting jobs; workers exit after draining what is already queued."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self.active_threads)
+        for _ in threads:
+            self._queue.put((float("inf"), next(self._sequence), _STOP, None, (), {}))
+        if wait:
+            for t in threads:
+                t.join()
+
+
+worker_pool = LightweightWorkerPool(
+    max_concurrency=conf.max_workers,
+    max_queue_depth=conf.max_queue_depth,
+    registry_ttl_seconds=int(os.getenv("WORKER_REGISTRY_TTL_SEC", "3600")),
+)
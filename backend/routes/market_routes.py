@@ -1,64 +1,129 @@
-from flask import Blueprint, jsonify, request
+import logging
+import threading
+from flask import Blueprint, Response, jsonify, request
 from services.market_data import MarketDataService
 from services.logo_resolver import LogoResolverService
-from flask_caching import Cache
+from services.market_refresher import (
+    MARKET_SNAPSHOT_HARD_TTL_SEC,
+    MOVER_CATEGORIES,
+    looks_failed,
+    snapshot_max_age,
+)
+from db.market_snapshot_store import MarketSnapshotStore
+from utils.metrics import count_cache
+from utils.swr_cache import SWRCache, swr_cached
+
+logger = logging.getLogger(__name__)
 
 market_bp = Blueprint('market', __name__)
 market_data_service = MarketDataService()
 logo_resolver_service = LogoResolverService()
 
-cache = Cache()
+# Single-flight for snapshot recomputes when the refresher has fallen behind.
+snapshot_swr = SWRCache(name="market_snapshot_refresh")
+
+_snapshot_store = None
+_snapshot_store_lock = threading.Lock()
+
+
+def _get_snapshot_store():
+    global _snapshot_store
+    if _snapshot_store is None:
+        with _snapshot_store_lock:
+            if _snapshot_store is None:
+                try:
+                    _snapshot_store = MarketSnapshotStore()
+                except Exception as e:
+                    logger.error(f"Market snapshot store unavailable: {e}")
+                    return None
+    return _snapshot_store
+
+
+def _serve_snapshot(dataset, compute):
+    """
+    Serves the refresher's precomputed snapshot. A snapshot past its refresh
+    window is still served (up to MARKET_SNAPSHOT_HARD_TTL_SEC) while one
+    background recompute replaces it; only a missing or expired snapshot makes
+    the request wait, and concurrent requests share that single recompute.
+    """
+    store = _get_snapshot_store()
+
+    def recompute():
+        data = compute()
+        if store is None:
+            return data
+        # The service swallows upstream errors: serve its fallback, but never publish
+        # it as a snapshot that would then count as fresh for a whole interval.
+        if looks_failed(dataset, data):
+            logger.warning(f"On-demand {dataset} compute returned no data; not publishing a snapshot")
+            return data
+        try:
+            store.put(dataset, data)
+        except Exception as e:
+            logger.warning(f"Snapshot write failed for {dataset}: {e}")
+        return data
+
+    snap = None
+    if store is not None:
+        try:
+            snap = store.get_raw(dataset)
+        except Exception as e:
+            logger.warning(f"Snapshot read failed for {dataset}: {e}")
+    if snap is not None and snap[1] <= MARKET_SNAPSHOT_HARD_TTL_SEC:
+        fresh = snap[1] <= snapshot_max_age(dataset)
+        count_cache("market_snapshot", fresh)
+        if not fresh:
+            snapshot_swr.refresh_async(dataset, recompute, should_cache=lambda value: False)
+        return Response(snap[0], mimetype='application/json')
+
+    count_cache("market_snapshot", False)
+    return jsonify(snapshot_swr.single_flight(dataset, recompute, should_cache=lambda value: False))
 
 @market_bp.route('/api/market/indices')
-@cache.cached(timeout=60)
 def get_indices():
     try:
-        data = market_data_service.get_indices()
-        return jsonify(data)
+        return _serve_snapshot('indices', market_data_service.get_indices)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @market_bp.route('/api/market/mood')
-@cache.cached(timeout=300)
 def get_market_mood():
     try:
-        data = market_data_service.get_market_mood()
-        return jsonify(data)
+        return _serve_snapshot('mood', market_data_service.get_market_mood)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @market_bp.route('/api/market/movers')
-@cache.cached(timeout=300, query_string=True)
 def get_movers():
     try:
         category = request.args.get('category', 'large_cap')
-        data = market_data_service.get_top_movers(category)
-        return jsonify(data)
+        if category not in MOVER_CATEGORIES:
+            category = 'large_cap'  # get_top_movers treats unknown categories as large cap
+        return _serve_snapshot(f'movers:{category}', lambda: market_data_service.get_top_movers(category))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @market_bp.route('/api/market/news')
-@cache.cached(timeout=300)
 def get_news():
     try:
-        data = market_data_service.get_news()
-        return jsonify(data)
+        return _serve_snapshot('news', market_data_service.get_news)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @market_bp.route('/api/market/history')
-@cache.cached(timeout=300, query_string=True)
+@swr_cached(fresh_for=300, hard_ttl=1800, query_string=True)
 def get_history():
     try:
         symbol = request.args.get('symbol', '^NSEI')
         period = request.args.get('period', '1mo')
         interval = request.args.get('interval', '1d')
-        data = market_data_service.get_index_history(symbol, period, interval)
+        columnar = request.args.get('format') == 'columnar'
+        data = market_data_service.get_index_history(symbol, period, interval, columnar=columnar)
         return jsonify(data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 @market_bp.route('/api/market/stock/<symbol>')
-@cache.cached(timeout=3600)
+@swr_cached(fresh_for=3600, hard_ttl=6 * 3600)
 def get_stock_profile(symbol):
     try:
         data = market_data_service.get_instrument_profile(symbol)
@@ -67,7 +132,7 @@ def get_stock_profile(symbol):
         return jsonify({"error": str(e)}), 500
 
 @market_bp.route('/api/market/logo/<ticker>')
-@cache.cached(timeout=86400) # Cache for 1 day
+@swr_cached(fresh_for=86400, hard_ttl=7 * 86400) # Fresh for 1 day
 def resolve_logo(ticker):
     try:
         domain = logo_resolver_service.resolve_ticker_to_domain(ticker)
@@ -1,15 +1,96 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request
 from services.portfolio_service import PortfolioService
 from services.portfolio_intelligence import PortfolioIntelligence
 from services.ai_doctor_service import PortfolioDoctorService
+from services import transaction_import
 from datetime import datetime
 from db.store import get_store
+from utils.rate_limit import rate_limit
+
+logger = logging.getLogger(__name__)
 portfolio_bp = Blueprint('portfolio', __name__, url_prefix='/api/portfolio')
 portfolio_service = PortfolioService()
 portfolio_intel = PortfolioIntelligence(portfolio_service)
 portfolio_doctor = PortfolioDoctorService(portfolio_intel)
 store = get_store()
 
+# Bounded pool for instrument-profile fetches on cache miss (each is a blocking yfinance .info).
+_profile_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PROFILE_FETCH_WORKERS", "8")), thread_name_prefix="profile-fetch"
+)
+
+
+def _load_holdings(portfolio_id, transactions=None):
+    """
+    Open positions from the store's holdings projection when it has one;
+    otherwise (or if the projection is unavailable) replay the trade log.
+    """
+    holdings = None
+    if hasattr(store, 'list_holdings'):
+        try:
+            holdings = store.list_holdings(portfolio_id)
+        except Exception as e:
+            logger.warning(f"Holdings projection read failed for {portfolio_id}, replaying trades: {e}")
+    if holdings is None:
+        if transactions is None:
+            transactions = store.list_transactions(portfolio_id)
+        holdings = portfolio_service.get_holdings(portfolio_id, transactions)
+    return holdings
+
+def _enrich_instruments(symbols):
+    """
+    {symbol: instrument profile} for the given holdings. Cached profiles come
+    from one batched store read; missing or stale ones (no beta) are fetched
+    concurrently and written back in a single bulk upsert.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if hasattr(store, 'preload_instruments_batch'):
+        store.preload_instruments_batch(symbols)
+
+    metas, missing = {}, []
+    for sym in symbols:
+        meta = store.get_cached_instrument(sym)
+        if meta and 'beta' in meta:
+            metas[sym] = meta
+        else:
+            missing.append(sym)
+
+    if missing:
+        fetched = dict(zip(missing, _profile_executor.map(portfolio_service.market_data.get_instrument_profile, missing)))
+        if hasattr(store, 'set_cached_instruments_batch'):
+            store.set_cached_instruments_batch(fetched)
+        else:
+            for sym, meta in fetched.items():
+                store.set_cached_instrument(sym, meta)
+        metas.update(fetched)
+    return metas
+
+
+def _holding_row(h, meta):
+    """Holdings-table row: PnL-merged holding plus display metadata."""
+    sym = h.get("ticker")
+    return {
+        "id": sym,
+        "ticker": sym,
+        "name": meta.get("name") or sym,
+        "sector": meta.get("sector") or "Unknown",
+        "marketCap": meta.get("marketCap") or "Large",
+        "qty": h.get("qty"),
+        "avgPrice": h.get("avg_price"),
+        "ltp": h.get("ltp"),
+        "day_high": h.get("day_high"),
+        "day_low": h.get("day_low"),
+        "sparkline": h.get("sparkline", []),
+        "weight": h.get("weight"),
+        "pnl": h.get("pnl"),
+        "pnl_percent": h.get("pnl_percent"),
+        "current_value": h.get("current_value"),
+        "total_invested": h.get("total_invested"),
+    }
+
 @portfolio_bp.route('/summary', methods=['GET'])
 def get_portfolio_summary():
     """
@@ -17,11 +98,7 @@ def get_portfolio_summary():
     """
     try:
         ident = store.get_or_create_default_portfolio()
-        transactions = store.list_transactions(ident.portfolio_id)
-        holdings = portfolio_service.get_holdings(
-            ident.portfolio_id,
-            transactions
-        )
+        holdings = _load_holdings(ident.portfolio_id)
         
         # 1. Get all unique symbols
         symbols = [h["ticker"] for h in holdings]
@@ -50,11 +127,7 @@ def get_portfolio_holdings():
     """
     try:
         ident = store.get_or_create_default_portfolio()
-        transactions = store.list_transactions(ident.portfolio_id)
-        holdings = portfolio_service.get_holdings(
-            ident.portfolio_id,
-            transactions
-        )
+        holdings = _load_holdings(ident.portfolio_id)
         # 1. Get all unique symbols
         symbols = [h["ticker"] for h in holdings]
         
@@ -64,37 +137,25 @@ def get_portfolio_holdings():
         # 3. Calculate Unrealized PnL
         report = portfolio_service.calculate_unrealized_pnl(holdings, current_prices)
         
-        # Batch-preload all instruments in ONE query (10 HTTP calls → 1)
-        all_syms = [h.get("ticker") for h in report["holdings"]]
-        if hasattr(store, 'preload_instruments_batch'):
-            store.preload_instruments_batch(all_syms)
-        
-        # Enrich with cached instrument metadata (name/sector/marketCap bucket)
-        enriched = []
-        for h in report["holdings"]:
-            sym = h.get("ticker")
-            meta = store.get_cached_instrument(sym)
-            if not meta or 'beta' not in meta:
-                meta = portfolio_service.market_data.get_instrument_profile(sym)
-                store.set_cached_instrument(sym, meta)
-            enriched.append({
-                "id": sym,
-                "ticker": sym,
-                "name": meta.get("name") or sym,
-                "sector": meta.get("sector") or "Unknown",
-                "marketCap": meta.get("marketCap") or "Large",
-                "qty": h.get("qty"),
-                "avgPrice": h.get("avg_price"),
-                "ltp": h.get("ltp"),
-                "day_high": h.get("day_high"),
-                "day_low": h.get("day_low"),
-                "sparkline": h.get("sparkline", []),
-                "weight": h.get("weight"),
-                "pnl": h.get("pnl"),
-                "pnl_percent": h.get("pnl_percent"),
-                "current_value": h.get("current_value"),
-                "total_invested": h.get("total_invested"),
-            })
+        metas = _enrich_instruments([h.get("ticker") for h in report["holdings"]])
+        enriched = [_holding_row(h, metas[h.get("ticker")]) for h in report["holdings"]]
+
+        # Optional per-holding XIRR, solved for every holding in one batch.
+        if request.args.get("include_xirr") in ("1", "true"):
+            cash_flows_by_symbol = {}
+            for tx in store.list_transactions(ident.portfolio_id):
+                cash_flows_by_symbol.setdefault(tx["symbol"], []).append({
+                    "date": tx["transaction_date"],
+                    "amount": float(tx["quantity"]) * float(tx["price"]),
+                    "type": tx["transaction_type"],
+                })
+            held = {row["ticker"]: cash_flows_by_symbol.get(row["ticker"], []) for row in enriched}
+            values = {row["ticker"]: row.get("current_value") or 0.0 for row in enriched}
+            xirr_by_symbol = portfolio_intel.calculate_xirr_batch(held, values)
+            for row in enriched:
+                xirr_data = xirr_by_symbol[row["ticker"]]
+                row["xirr"] = xirr_data["value"]
+                row["xirr_type"] = xirr_data.get("type", "annualized")
         return jsonify(enriched)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -109,7 +170,7 @@ def get_portfolio_bootstrap():
     try:
         ident = store.get_or_create_default_portfolio()
         transactions = store.list_transactions(ident.portfolio_id)
-        holdings = portfolio_service.get_holdings(ident.portfolio_id, transactions)
+        holdings = _load_holdings(ident.portfolio_id, transactions)
         symbols = [h["ticker"] for h in holdings]
         current_prices = portfolio_service.get_live_prices(symbols)
         report = portfolio_service.calculate_unrealized_pnl(holdings, current_prices)
@@ -123,36 +184,8 @@ def get_portfolio_bootstrap():
             "last_updated": datetime.now().isoformat(),
         }
 
-        # Batch-preload all instruments in ONE query
-        all_boot_syms = [h.get("ticker") for h in report["holdings"]]
-        if hasattr(store, 'preload_instruments_batch'):
-            store.preload_instruments_batch(all_boot_syms)
-
-        enriched = []
-        for h in report["holdings"]:
-            sym = h.get("ticker")
-            meta = store.get_cached_instrument(sym)
-            if not meta or 'beta' not in meta:
-                meta = portfolio_service.market_data.get_instrument_profile(sym)
-                store.set_cached_instrument(sym, meta)
-            enriched.append({
-                "id": sym,
-                "ticker": sym,
-                "name": meta.get("name") or sym,
-                "sector": meta.get("sector") or "Unknown",
-                "marketCap": meta.get("marketCap") or "Large",
-                "qty": h.get("qty"),
-                "avgPrice": h.get("avg_price"),
-                "ltp": h.get("ltp"),
-                "day_high": h.get("day_high"),
-                "day_low": h.get("day_low"),
-                "sparkline": h.get("sparkline", []),
-                "weight": h.get("weight"),
-                "pnl": h.get("pnl"),
-                "pnl_percent": h.get("pnl_percent"),
-                "current_value": h.get("current_value"),
-                "total_invested": h.get("total_invested"),
-            })
+        metas = _enrich_instruments([h.get("ticker") for h in report["holdings"]])
+        enriched = [_holding_row(h, metas[h.get("ticker")]) for h in report["holdings"]]
 
         # 4. Calculate XIRR & Alpha
         cash_flows = []
@@ -208,6 +241,34 @@ def add_transaction():
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
+@portfolio_bp.route('/transactions/import', methods=['POST'])
+def import_transactions():
+    """
+    Bulk import of a broker tradebook CSV, uploaded as multipart field `file`
+    or as a raw text/csv body. `?dry_run=1` validates without writing.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+    elif request.mimetype in ('text/csv', 'application/csv', 'text/plain'):
+        stream = request.stream
+    else:
+        return jsonify({"error": "Upload a CSV file as multipart field 'file' or a text/csv body"}), 400
+
+    try:
+        ident = store.get_or_create_default_portfolio()
+        summary = transaction_import.import_transactions(
+            stream, portfolio_service, store, ident.portfolio_id, ident.user_id,
+            dry_run=request.args.get('dry_run') in ('1', 'true'),
+        )
+        return jsonify(summary), 200
+    except transaction_import.ImportFormatError as fe:
+        return jsonify({"error": str(fe)}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "CSV must be UTF-8 encoded"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @portfolio_bp.route('/transactions/<symbol>', methods=['DELETE'])
 def delete_portfolio_stock(symbol):
     """
@@ -231,29 +292,17 @@ def get_portfolio_intelligence():
     """
     try:
         ident = store.get_or_create_default_portfolio()
-        transactions = store.list_transactions(ident.portfolio_id)
-        holdings = portfolio_service.get_holdings(
-            ident.portfolio_id,
-            transactions
-        )
+        holdings = _load_holdings(ident.portfolio_id)
         symbols = [h["ticker"] for h in holdings]
         current_prices = portfolio_service.get_live_prices(symbols)
         report = portfolio_service.calculate_unrealized_pnl(holdings, current_prices)
         
-        # Batch-preload all instruments in ONE query
-        all_intel_syms = [h.get("ticker") for h in report["holdings"]]
-        if hasattr(store, 'preload_instruments_batch'):
-            store.preload_instruments_batch(all_intel_syms)
+        metas = _enrich_instruments([h.get("ticker") for h in report["holdings"]])
 
         # Enrich Holdings with Fundamental Data
         enriched_holdings = []
         for h in report["holdings"]:
-            sym = h.get("ticker")
-            meta = store.get_cached_instrument(sym)
-            if not meta or 'beta' not in meta:
-                meta = portfolio_service.market_data.get_instrument_profile(sym)
-                store.set_cached_instrument(sym, meta)
-            
+            meta = metas[h.get("ticker")]
             enrich_h = dict(h)
             enrich_h["sector"] = meta.get("sector") or "Unknown"
             enrich_h["marketCap"] = meta.get("marketCap") or "Large"
@@ -311,7 +360,7 @@ def get_portfolio_xirr():
             })
 
         # Current value computed from live prices + holdings
-        holdings = portfolio_service.get_holdings(ident.portfolio_id, transactions)
+        holdings = _load_holdings(ident.portfolio_id, transactions)
         symbols = [h["ticker"] for h in holdings]
         current_prices = portfolio_service.get_live_prices(symbols)
         report = portfolio_service.calculate_unrealized_pnl(holdings, current_prices)
@@ -375,6 +424,7 @@ def get_portfolio_history():
         return jsonify({"error": str(e)}), 500
 
 @portfolio_bp.route('/chat', methods=['POST'])
+@rate_limit(capacity=20, per_seconds=60, scope="portfolio_chat")
 def portfolio_chat():
     """
     Handle chat interaction with Portfolio Doctor context.
@@ -396,6 +446,7 @@ def portfolio_chat():
         return jsonify({"error": str(e)}), 500
 
 @portfolio_bp.route('/simulate', methods=['POST'])
+@rate_limit(capacity=10, per_seconds=60, scope="portfolio_simulate")
 def portfolio_simulate():
     """
     Handle macro catalyst simulation against the portfolio holdings.
@@ -0,0 +1,81 @@
+"""
+Weighted-average-cost (WAC) position arithmetic shared by the transaction
+replay in PortfolioService and the materialized `holdings` projection in the
+stores, so both paths produce identical numbers.
+"""
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+def new_position(symbol: str) -> Dict[str, Any]:
+    return {
+        "ticker": symbol,
+        "qty": Decimal("0"),
+        "total_cost": Decimal("0"),
+        "avg_price": Decimal("0"),
+        "transactions_count": 0,
+    }
+
+
+def apply_trade(position: Dict[str, Any], tx: Dict[str, Any]) -> Dict[str, Any]:
+    """Folds one buy/sell into a position in place and returns it."""
+    qty = Decimal(str(tx["quantity"]))
+    price = Decimal(str(tx["price"]))
+    tx_type = tx["transaction_type"].lower()
+
+    position["transactions_count"] += 1
+
+    if tx_type == "buy":
+        # Average Cost = (Old Total Cost + New Cost) / New Total Qty
+        position["total_cost"] += (qty * price)
+        position["qty"] += qty
+        if position["qty"] > 0:
+            position["avg_price"] = position["total_cost"] / position["qty"]
+    elif tx_type == "sell":
+        # Selling reduces quantity but preserves the average cost of the remaining
+        # shares (WAC); total cost is re-derived from it to stay consistent.
+        position["qty"] -= qty
+        position["total_cost"] = position["qty"] * position["avg_price"]
+
+        # Check for short positions (not usually recommended for retail long-term)
+        if position["qty"] < 0:
+            logger.warning(f"Negative inventory for {position['ticker']}. Short selling detected.")
+    return position
+
+
+def replay(transactions: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Replays trades (already in trade order) into {symbol: position}."""
+    positions: Dict[str, Dict[str, Any]] = {}
+    for tx in transactions:
+        symbol = tx["symbol"]
+        if symbol not in positions:
+            positions[symbol] = new_position(symbol)
+        apply_trade(positions[symbol], tx)
+    return positions
+
+
+def format_holdings(positions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Open positions (qty > 0) in the frontend holdings shape, with cost-basis
+    weights, heaviest first.
+    """
+    active_holdings = [h for h in positions if h["qty"] > 0]
+
+    # Calculate Total Portfolio Value (Cost Basis) for weights
+    total_p_cost = sum((h["total_cost"] for h in active_holdings), Decimal("0"))
+
+    final_holdings = []
+    for h in active_holdings:
+        weight = (h["total_cost"] / total_p_cost * Decimal("100")) if total_p_cost > 0 else Decimal("0")
+        final_holdings.append({
+            "ticker": h["ticker"],
+            "qty": float(h["qty"]),
+            "avg_price": float(h["avg_price"]),
+            "weight": round(float(weight), 2),
+            "total_invested": float(h["total_cost"])
+        })
+
+    return sorted(final_holdings, key=lambda x: x["weight"], reverse=True)
@@ -1,7 +1,8 @@
 import os
 import json
 import logging
-import yfinance as yf
+
+from services.market_providers import get_market_provider
 
 logger = logging.getLogger(__name__)
 
@@ -107,7 +108,7 @@ class LogoResolverService:
         try:
             # We must append .NS suffix here for Indian companies if it's missing for yfinance to work. 
             yf_symbol = clean_ticker if '.' in clean_ticker else f"{clean_ticker}.NS"
-            info = yf.Ticker(yf_symbol).info
+            info = get_market_provider().info(yf_symbol)
             website = info.get('website')
             if website:
                 # 'http://www.example.com' -> 'example.com'
@@ -1,14 +1,101 @@
-import yfinance as yf
 import pandas as pd
 import logging
+import os
+import re
+import threading
+import time
 from datetime import datetime, timedelta
 import concurrent.futures
 from services.logo_resolver import LogoResolverService
+from db.price_history_store import PriceHistoryStore, is_stale
+from utils.chart_payload import columns_to_rows, ohlcv_columns
+from services.market_providers import get_market_provider
+from utils.metrics import count_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class QuoteCache:
+    """
+    Process-wide per-symbol quote cache with single-flight coalescing.
+
+    Every MarketDataService instance shares one cache, so the portfolio routes
+    (summary, holdings, bootstrap, intelligence, xirr) firing in parallel for the
+    same symbols trigger at most one upstream download. A symbol that is already
+    being fetched by another request is waited on instead of re-downloaded.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, wait_timeout_seconds: float = 30.0):
+        self.ttl = ttl_seconds
+        self.wait_timeout = wait_timeout_seconds
+        self._entries = {}   # yf_symbol -> (fetched_at, quote)
+        self._inflight = {}  # yf_symbol -> threading.Event set when the fetch finishes
+        self._lock = threading.Lock()
+
+    def claim(self, yf_symbols: list):
+        """
+        Splits the requested symbols into (fresh hits, symbols this caller must fetch,
+        events to wait on for symbols another caller is already fetching).
+        """
+        now = time.monotonic()
+        hits, to_fetch, waits = {}, [], {}
+        with self._lock:
+            for sym in yf_symbols:
+                entry = self._entries.get(sym)
+                if entry and (now - entry[0]) < self.ttl:
+                    hits[sym] = entry[1]
+                elif sym in self._inflight:
+                    waits[sym] = self._inflight[sym]
+                else:
+                    self._inflight[sym] = threading.Event()
+                    to_fetch.append(sym)
+        for sym in yf_symbols:
+            count_cache("quote", sym in hits)
+        return hits, to_fetch, waits
+
+    def publish(self, quotes: dict, claimed: list):
+        """Stores fetched quotes and releases every waiter on the claimed symbols."""
+        now = time.monotonic()
+        with self._lock:
+            for sym, quote in quotes.items():
+                self._entries[sym] = (now, quote)
+            for sym in claimed:
+                event = self._inflight.pop(sym, None)
+                if event is not None:
+                    event.set()
+
+    def collect(self, waits: dict) -> dict:
+        """Blocks until the in-flight fetches finish and returns whatever they cached."""
+        deadline = time.monotonic() + self.wait_timeout
+        for event in waits.values():
+            event.wait(max(0.0, deadline - time.monotonic()))
+        out = {}
+        with self._lock:
+            for sym in waits:
+                entry = self._entries.get(sym)
+                if entry:
+                    out[sym] = entry[1]
+        return out
+
+
+# Shared across all MarketDataService instances in this process.
+quote_cache = QuoteCache(
+    ttl_seconds=float(os.getenv("QUOTE_CACHE_TTL_SEC", "30")),
+    wait_timeout_seconds=float(os.getenv("QUOTE_CACHE_WAIT_SEC", "30")),
+)
+
+_EMPTY_QUOTE = {"price": 0.0, "high": 0.0, "low": 0.0, "sparkline": []}
+
+# Daily bars older than this are re-checked with a delta download.
+HISTORY_REFRESH_SEC = int(os.getenv("HISTORY_REFRESH_SEC", "900"))
+# A re-fetched overlap bar that moved more than this fraction means the series was back-adjusted.
+HISTORY_RESTATEMENT_TOLERANCE = 0.005
+_history_store = None
+_history_store_lock = threading.Lock()
+
+
 class MarketDataService:
     """
     Service to fetch real-time market data using yfinance.
@@ -16,6 +103,7 @@ class MarketDataService:
     """
     
     def __init__(self):
+        self.provider = get_market_provider()
         self.logo_resolver = LogoResolverService()
         # Using Yahoo Finance Tickers for Indian Markets
         self.indices_tickers = {
@@ -122,14 +210,12 @@ class MarketDataService:
         Helper to fetch a single ticker's info and price.
         """
         try:
-            ticker = yf.Ticker(symbol)
             # Try fast_info first (available in newer yfinance versions)
             try:
-                price = ticker.fast_info.last_price
-                prev_close = ticker.fast_info.previous_close
+                price, prev_close = self.provider.fast_quote(symbol)
             except:
                 # Fallback to history
-                hist = ticker.history(period="2d")
+                hist = self.provider.history(symbol, period="2d")
                 if hist.empty:
                     return None
                 price = hist['Close'].iloc[-1]
@@ -152,7 +238,8 @@ class MarketDataService:
             logger.error(f"Error fetching {symbol}: {e}")
             return None
 
-    def normalize_symbol(self, symbol: str) -> str:
+    @staticmethod
+    def normalize_symbol(symbol: str) -> str:
         """
         Normalizes a user-facing symbol to a Yahoo Finance ticker.
 
@@ -176,16 +263,40 @@ class MarketDataService:
         """
         Unified Batch Quotes with Day High/Low and 7-Day Sparkline Data.
         Returns: { symbol: { price, high, low, sparkline, change, percentChange } }
+
+        Served through the shared quote cache: only symbols that are stale or
+        missing are downloaded, and concurrent callers share in-flight downloads.
         """
         if not symbols:
             return {}
         uniq = list(set(s for s in symbols if s))
         if not uniq: return {}
 
-        tickers = [self.normalize_symbol(s) for s in uniq]
+        yf_map = {orig: self.normalize_symbol(orig) for orig in uniq}
+        hits, to_fetch, waits = quote_cache.claim(list(set(yf_map.values())))
+
+        fetched = {}
+        if to_fetch:
+            try:
+                fetched = self._download_quotes(to_fetch)
+            finally:
+                # Always release waiters, even if the download blew up.
+                quote_cache.publish(fetched, to_fetch)
+        if waits:
+            hits.update(quote_cache.collect(waits))
+        hits.update(fetched)
+
+        return {orig: dict(hits.get(yf_s) or _EMPTY_QUOTE) for orig, yf_s in yf_map.items()}
+
+    def _download_quotes(self, tickers: list) -> dict:
+        """
+        Downloads 7 days of daily bars for the given Yahoo tickers in one call.
+        Returns { yf_symbol: quote } for the symbols that produced data; failures are
+        omitted so they are not cached.
+        """
         try:
             # We fetch 7 days to provide a sparkline and reliable Day-High/Low
-            df = yf.download(
+            df = self.provider.download(
                 tickers,
                 period="7d",
                 interval="1d",
@@ -196,49 +307,47 @@ class MarketDataService:
             )
         except Exception as e:
             logger.error(f"Error batch download: {e}")
-            return {s: {"price": 0.0, "high": 0.0, "low": 0.0, "sparkline": []} for s in uniq}
+            return {}
 
         if df is None or getattr(df, "empty", True):
-            return {s: {"price": 0.0, "high": 0.0, "low": 0.0, "sparkline": []} for s in uniq}
+            return {}
 
         out = {}
-        for orig in uniq:
-            yf_s = self.normalize_symbol(orig)
+        for yf_s in tickers:
             try:
                 # Handle both Single and Multi-ticker DataFrames
                 if hasattr(df.columns, "levels") and yf_s in df.columns.levels[0]:
                     s_df = df[yf_s].dropna()
                 elif yf_s in df.columns or "Close" in df.columns:
-                    s_df = df.dropna() if len(uniq) == 1 else df[yf_s].dropna()
+                    s_df = df.dropna() if len(tickers) == 1 else df[yf_s].dropna()
                 else:
                     s_df = pd.DataFrame()
 
-                if not s_df.empty:
-                    # Latest Stats
-                    price = float(s_df["Close"].iloc[-1])
-                    high = float(s_df["High"].iloc[-1])
-                    low = float(s_df["Low"].iloc[-1])
-                    prev_close = float(s_df["Close"].iloc[-2]) if len(s_df) > 1 else price
-                    
-                    # 7-Day Sparkline (Closing Prices)
-                    sparkline = [round(float(p), 2) for p in s_df["Close"].tolist()]
-                    
-                    change = price - prev_close
-                    pct_change = (change / prev_close) * 100 if prev_close else 0.0
-
-                    out[orig] = {
-                        "price": round(price, 2),
-                        "high": round(high, 2),
-                        "low": round(low, 2),
-                        "sparkline": sparkline,
-                        "change": round(change, 2),
-                        "percentChange": round(pct_change, 2)
-                    }
-                else:
-                    out[orig] = {"price": 0.0, "high": 0.0, "low": 0.0, "sparkline": []}
+                if s_df.empty:
+                    continue
+
+                # Latest Stats
+                price = float(s_df["Close"].iloc[-1])
+                high = float(s_df["High"].iloc[-1])
+                low = float(s_df["Low"].iloc[-1])
+                prev_close = float(s_df["Close"].iloc[-2]) if len(s_df) > 1 else price
+
+                # 7-Day Sparkline (Closing Prices)
+                sparkline = [round(float(p), 2) for p in s_df["Close"].tolist()]
+
+                change = price - prev_close
+                pct_change = (change / prev_close) * 100 if prev_close else 0.0
+
+                out[yf_s] = {
+                    "price": round(price, 2),
+                    "high": round(high, 2),
+                    "low": round(low, 2),
+                    "sparkline": sparkline,
+                    "change": round(change, 2),
+                    "percentChange": round(pct_change, 2)
+                }
             except Exception as e:
-                logger.error(f"Error processing {orig}: {e}")
-                out[orig] = {"price": 0.0, "high": 0.0, "low": 0.0, "sparkline": []}
+                logger.error(f"Error processing {yf_s}: {e}")
         return out
 
     def get_quote(self, symbol: str) -> dict:
@@ -248,16 +357,14 @@ class MarketDataService:
         """
         yf_symbol = self.normalize_symbol(symbol)
         try:
-            ticker = yf.Ticker(yf_symbol)
             price = None
             prev_close = None
 
             # Prefer fast_info when available.
             try:
-                price = ticker.fast_info.last_price
-                prev_close = ticker.fast_info.previous_close
+                price, prev_close = self.provider.fast_quote(yf_symbol)
             except Exception:
-                hist = ticker.history(period="2d")
+                hist = self.provider.history(yf_symbol, period="2d")
                 if not hist.empty:
                     price = float(hist["Close"].iloc[-1])
                     if len(hist) > 1:
@@ -286,25 +393,119 @@ class MarketDataService:
     def get_history(self, symbols: list, period: str = "1y", interval: str = "1d") -> "pd.DataFrame":
         """
         Batch price history fetch (used for portfolio performance chart).
+
+        Daily bars are served from the local PriceHistoryStore: symbols whose stored
+        coverage already spans the requested period only download the bars after
+        their last stored date. Other intervals/periods go straight to yfinance.
         """
         tickers = [self.normalize_symbol(s) for s in symbols if s]
         if not tickers:
             return pd.DataFrame()
 
+        start = self._period_start(period)
+        store = self._get_history_store() if interval == "1d" else None
+        if store is None or start is None:
+            return self._download_history(tickers, period=period, interval=interval)
+
+        try:
+            tickers = list(dict.fromkeys(tickers))
+            start_str = start.strftime("%Y-%m-%d")
+            coverage = store.get_coverage(tickers)
+
+            full = [t for t in tickers if t not in coverage or coverage[t]["first_date"] > start_str]
+            delta = [t for t in tickers if t not in full and is_stale(coverage[t], HISTORY_REFRESH_SEC)]
+
+            if delta:
+                # One small download from the oldest last-stored bar covers every stale symbol.
+                since = min(coverage[t]["last_date"] for t in delta)
+                df = self._download_history(delta, start=since, interval=interval)
+                for t in delta:
+                    bars = self._ticker_bars(df, t, len(delta) == 1)
+                    if bars.empty:
+                        store.touch(t)
+                        continue
+                    if self._history_was_restated(bars, coverage[t]):
+                        # Split/dividend adjustment changed old bars: reload the whole window.
+                        full.append(t)
+                        continue
+                    store.write_bars(t, bars)
+
+            if full:
+                df = self._download_history(full, period=period, interval=interval)
+                for t in full:
+                    bars = self._ticker_bars(df, t, len(full) == 1)
+                    if not bars.empty:
+                        store.write_bars(t, bars, coverage_start=start_str)
+
+            return store.load_frame(tickers, start_str)
+        except Exception as e:
+            logger.error(f"History store failed for {tickers}, falling back to direct download: {e}")
+            return self._download_history(tickers, period=period, interval=interval)
+
+    def _download_history(self, tickers: list, **kwargs) -> "pd.DataFrame":
         try:
-            return yf.download(
+            return self.provider.download(
                 tickers,
-                period=period,
-                interval=interval,
                 group_by="ticker",
                 progress=False,
                 threads=True,
-                auto_adjust=True
+                auto_adjust=True,
+                **kwargs
             )
         except Exception as e:
             logger.error(f"Error fetching history for {tickers}: {e}")
             return pd.DataFrame()
 
+    def _get_history_store(self):
+        global _history_store
+        if _history_store is None:
+            with _history_store_lock:
+                if _history_store is None:
+                    try:
+                        _history_store = PriceHistoryStore()
+                    except Exception as e:
+                        logger.error(f"Price history store unavailable: {e}")
+                        return None
+        return _history_store
+
+    @staticmethod
+    def _period_start(period: str):
+        """Translates a yfinance period string ('6mo', '1y', '30d') into a start date."""
+        match = re.fullmatch(r"(\d+)(d|wk|mo|y)", str(period or "").strip())
+        if not match:
+            return None
+        n, unit = int(match.group(1)), match.group(2)
+        days = {"d": 1, "wk": 7, "mo": 31, "y": 366}[unit] * n
+        return datetime.now() - timedelta(days=days)
+
+    @staticmethod
+    def _ticker_bars(df: "pd.DataFrame", ticker: str, single: bool) -> "pd.DataFrame":
+        if df is None or df.empty:
+            return pd.DataFrame()
+        if isinstance(df.columns, pd.MultiIndex):
+            if ticker not in df.columns.get_level_values(0):
+                return pd.DataFrame()
+            bars = df[ticker]
+        elif single:
+            bars = df
+        else:
+            return pd.DataFrame()
+        return bars.dropna(subset=["Close"])
+
+    @staticmethod
+    def _history_was_restated(bars: "pd.DataFrame", coverage: dict) -> bool:
+        """
+        Compares the overlapping bar with the stored close to detect back-adjustment.
+        The stored bar is always a settled session (see PriceHistoryStore.write_bars),
+        so an intraday move on today's live bar can never trigger a reload.
+        """
+        stored_close = coverage.get("last_close")
+        overlap = bars[bars.index.strftime("%Y-%m-%d") == coverage["last_date"]]
+        if stored_close is None or overlap.empty:
+            return False
+        fresh_close = float(overlap["Close"].iloc[-1])
+        return abs(fresh_close - stored_close) > HISTORY_RESTATEMENT_TOLERANCE * abs(stored_close)
+
     def get_index_performance(self, symbol: str = "^NSEI", days: int = 365) -> float:
         """
         Calculates the point-to-point percentage return for a benchmark index.
@@ -315,8 +516,7 @@ class MarketDataService:
             # We match to a "d" string or the preset strings.
             lookback = f"{days}d" if days < 365 else "1y"
             
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=lookback)
+            hist = self.provider.history(symbol, period=lookback)
             if hist.empty or len(hist) < 2:
                 # Institutional fallback (approximate 15-year India CAGR if API fails)
                 return 12.5 
@@ -337,10 +537,9 @@ class MarketDataService:
         """
         yf_symbol = self.normalize_symbol(symbol)
         try:
-            t = yf.Ticker(yf_symbol)
             info = {}
             try:
-                info = t.info or {}
+                info = self.provider.info(yf_symbol) or {}
             except Exception:
                 info = {}
 
@@ -379,40 +578,98 @@ class MarketDataService:
 
     def get_indices(self):
         """
-        Fetches data for all configured indices in parallel.
-        Returns a list of dictionaries with index data.
+        Fetches every configured index with one batched daily download and
+        computes price / change / % change column-wise. Indices missing from
+        the batch fall back to individual fast_info/history fetches.
+        Returns a list of dictionaries with index data, in configured order.
         """
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.indices_tickers)) as executor:
-            future_to_name = {executor.submit(self._get_ticker_data, symbol): name for name, symbol in self.indices_tickers.items()}
-            for future in concurrent.futures.as_completed(future_to_name):
-                name = future_to_name[future]
-                symbol = self.indices_tickers[name]
-                try:
-                    data = future.result()
+        symbols = list(self.indices_tickers.values())
+        quotes = self._batch_index_quotes(symbols)
+
+        missing = [s for s in symbols if s not in quotes]
+        if missing:
+            logger.warning(f"Batched index download missed {missing}; fetching individually")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(missing), 4)) as executor:
+                for symbol, data in zip(missing, executor.map(self._get_ticker_data, missing)):
                     if data:
-                        results.append({
-                            'name': name,
-                            'symbol': symbol,
-                            'price': data['price'],
-                            'change': data['change'],
-                            'percentChange': data['percentChange']
-                        })
-                    else:
-                        results.append({
-                            'name': name, 'symbol': symbol, 'price': 0, 'change': 0, 'percentChange': 0, 'error': True
-                        })
-                except Exception as e:
-                    logger.error(f"Error fetching index {name}: {e}")
-                    results.append({
-                        'name': name, 'symbol': symbol, 'price': 0, 'change': 0, 'percentChange': 0, 'error': True
-                    })
+                        quotes[symbol] = data
+
+        results = []
+        for name, symbol in self.indices_tickers.items():
+            data = quotes.get(symbol)
+            if data:
+                results.append({
+                    'name': name,
+                    'symbol': symbol,
+                    'price': data['price'],
+                    'change': data['change'],
+                    'percentChange': data['percentChange']
+                })
+            else:
+                logger.error(f"Error fetching index {name}: no data")
+                results.append({
+                    'name': name, 'symbol': symbol, 'price': 0, 'change': 0, 'percentChange': 0, 'error': True
+                })
         return results
 
+    def _batch_index_quotes(self, symbols: list) -> dict:
+        """{symbol: {price, change, percentChange}} for the symbols the single download covered."""
+        try:
+            batch_data = self.provider.download(
+                symbols, period="5d", interval="1d", group_by='ticker', progress=False, threads=True, auto_adjust=True
+            )
+        except Exception as e:
+            logger.error(f"Batched index download failed: {e}")
+            return {}
+        if batch_data is None or batch_data.empty or not isinstance(batch_data.columns, pd.MultiIndex):
+            return {}
+
+        try:
+            close = self._field_frame(batch_data, 'Close')
+        except KeyError:
+            return {}
+        price, prev_close, bars = self._last_two_valid(close, close.notna())
+        prev_close = prev_close.where(bars > 1, price)
+        change = price - prev_close
+        percent_change = (change / prev_close.where(prev_close != 0)) * 100
+
+        stats = pd.DataFrame({
+            'price': price,
+            'change': change,
+            'percentChange': percent_change.fillna(0.0),
+        })
+        stats = stats[bars > 0].replace([float('inf'), float('-inf')], float('nan')).dropna().round(2)
+        return {
+            r.Index: {'price': float(r.price), 'change': float(r.change), 'percentChange': float(r.percentChange)}
+            for r in stats.itertuples() if r.Index in symbols
+        }
+
+    @staticmethod
+    def _field_frame(batch_data: pd.DataFrame, field: str) -> pd.DataFrame:
+        """
+        Slices one OHLCV field out of a group_by='ticker' download into a
+        (dates x tickers) frame.
+        """
+        return batch_data.xs(field, axis=1, level=1)
+
+    @staticmethod
+    def _last_two_valid(frame: pd.DataFrame, valid: pd.DataFrame):
+        """
+        Vectorized equivalent of ``series.dropna().iloc[-1]`` / ``.iloc[-2]`` for every
+        column at once. Returns (last, previous, valid_count) Series keyed by ticker;
+        `previous` is NaN where a ticker has fewer than two valid rows.
+        """
+        seen = valid.cumsum()
+        count = valid.sum()
+        last = frame.where(valid & seen.eq(count)).max()
+        prev = frame.where(valid & seen.eq(count - 1)).max()
+        return last, prev, count
 
     def get_top_movers(self, category='large_cap'):
         """
         Batch fetches data to find Top Gainers, Losers, and 52W High/Low.
+        All per-ticker stats are computed column-wise over the downloaded frame and
+        the top-10 lists use partial selection instead of full sorts.
         Args:
             category (str): 'large_cap', 'mid_cap', 'small_cap'
         """
@@ -427,84 +684,86 @@ class MarketDataService:
 
             # Batch download for 1 year period (needed for 52W High/Low)
             # Fetching 1y data for ~50 tickers is reasonably fast (1-2s).
-            batch_data = yf.download(tickers, period="1y", group_by='ticker', progress=False, threads=True)
-            
-            processed_data = []
+            batch_data = self.provider.download(tickers, period="1y", group_by='ticker', progress=False, threads=True)
+            if batch_data is None or batch_data.empty or not isinstance(batch_data.columns, pd.MultiIndex):
+                return {'gainers': [], 'losers': [], 'fiftyTwoWeekHigh': [], 'fiftyTwoWeekLow': []}
 
-            for symbol in tickers:
-                try:
-                    # Check if symbol is in columns (Top Level)
-                    if symbol not in batch_data.columns.levels[0]:
-                        continue
-                        
-                    stats = batch_data[symbol].dropna()
-                    if stats.empty: 
-                        continue
-                    
-                    # 1. Price Data
-                    current_price = float(stats['Close'].iloc[-1])
-                    if len(stats) > 1:
-                        prev_close = float(stats['Close'].iloc[-2])
-                    else:
-                        prev_close = float(stats['Open'].iloc[-1])
+            close = self._field_frame(batch_data, 'Close')
+            open_ = self._field_frame(batch_data, 'Open')
+            high = self._field_frame(batch_data, 'High')
+            low = self._field_frame(batch_data, 'Low')
 
-                    change = current_price - prev_close
-                    percent_change = (change / prev_close) * 100
+            # A bar only counts when the whole OHLC row is present (per-symbol dropna).
+            valid = close.notna() & open_.notna() & high.notna() & low.notna()
 
-                    # 2. 52-Week Data
-                    # Calculate High/Low over the fetched period (1y)
-                    fifty_two_week_high = float(stats['High'].max())
-                    fifty_two_week_low = float(stats['Low'].min())
+            # 1. Price Data
+            current_price, prev_close, bars = self._last_two_valid(close, valid)
+            last_open = open_.where(valid).ffill().iloc[-1]
+            prev_close = prev_close.where(bars > 1, last_open)
 
-                    # Determine Proximity (within 2% of High/Low)
-                    is_52w_high = current_price >= (fifty_two_week_high * 0.98)
-                    is_52w_low = current_price <= (fifty_two_week_low * 1.02)
+            change = current_price - prev_close
+            percent_change = (change / prev_close) * 100
 
-                    # Logo URL (Prioritize High-Quality Corporate Logos)
-                    domain = self.logo_resolver.resolve_ticker_to_domain(symbol)
-                    logo_url = f"https://cdn.tickerlogos.com/{domain}" if domain else ""
+            # 2. 52-Week Data over the fetched period (1y)
+            fifty_two_week_high = high.where(valid).max()
+            fifty_two_week_low = low.where(valid).min()
 
-                    processed_data.append({
-                        'symbol': symbol,
-                        'name': symbol.replace('.NS', ''), 
-                        'price': round(current_price, 2),
-                        'change': round(change, 2),
-                        'percentChange': round(percent_change, 2),
-                        'fiftyTwoWeekHigh': round(fifty_two_week_high, 2),
-                        'fiftyTwoWeekLow': round(fifty_two_week_low, 2),
-                        'is52WHigh': is_52w_high,
-                        'is52WLow': is_52w_low,
-                        'logoUrl': logo_url
-                    })
-                except Exception as e:
-                    continue
+            stats = pd.DataFrame({
+                'price': current_price,
+                'change': change,
+                'percentChange': percent_change,
+                'fiftyTwoWeekHigh': fifty_two_week_high,
+                'fiftyTwoWeekLow': fifty_two_week_low,
+            })
+            stats = stats[bars > 0].replace([float('inf'), float('-inf')], float('nan')).dropna()
+            if stats.empty:
+                return {'gainers': [], 'losers': [], 'fiftyTwoWeekHigh': [], 'fiftyTwoWeekLow': []}
 
-            # --- Sorters ---
-            
-            # Gainers
-            gainers = [x for x in processed_data if x['percentChange'] > 0]
-            gainers.sort(key=lambda x: x['percentChange'], reverse=True)
-
-            # Losers
-            losers = [x for x in processed_data if x['percentChange'] < 0]
-            losers.sort(key=lambda x: x['percentChange']) # Ascending
-
-            # 52W High (Stocks closest to their 52W High)
-            # We sort by how close they are to the High (Price / High ratio)
-            # Or just return those flagged High. 
-            # Better strategy: Sort by "Percentile" of 52W Range? 
-            # Simple: Sort by % Below 52W High (Ascending)
-            high_52w = sorted(processed_data, key=lambda x: (x['fiftyTwoWeekHigh'] - x['price']) / x['fiftyTwoWeekHigh'])
-            
-            # 52W Low (Stocks closest to their 52W Low)
-            # Sort by % Above 52W Low (Ascending)
-            low_52w = sorted(processed_data, key=lambda x: (x['price'] - x['fiftyTwoWeekLow']) / x['fiftyTwoWeekLow'])
+            # Keep the configured ticker order so ties resolve as before. Flags and
+            # rankings use the exact values; rounding happens only in _row.
+            stats = stats.reindex([t for t in tickers if t in stats.index])
+
+            # Determine Proximity (within 2% of High/Low)
+            stats['is52WHigh'] = stats['price'] >= (stats['fiftyTwoWeekHigh'] * 0.98)
+            stats['is52WLow'] = stats['price'] <= (stats['fiftyTwoWeekLow'] * 1.02)
+
+            # --- Partial selection (top 10 only) ---
+            pct = stats['percentChange']
+            # Sign is judged on the displayed (2dp) change, so a +0.003% move is neither.
+            shown = pct.round(2)
+            gainers = pct[shown > 0].nlargest(10).index
+            losers = pct[shown < 0].nsmallest(10).index
+            # Closest to the 52W High: smallest % below the high
+            high_52w = ((stats['fiftyTwoWeekHigh'] - stats['price']) / stats['fiftyTwoWeekHigh']).nsmallest(10).index
+            # Closest to the 52W Low: smallest % above the low
+            low_52w = ((stats['price'] - stats['fiftyTwoWeekLow']) / stats['fiftyTwoWeekLow']).nsmallest(10).index
+
+            # Logos and row dicts are only built for symbols that made a list.
+            rows = {}
+
+            def _row(symbol):
+                if symbol not in rows:
+                    r = stats.loc[symbol]
+                    domain = self.logo_resolver.resolve_ticker_to_domain(symbol)
+                    rows[symbol] = {
+                        'symbol': symbol,
+                        'name': symbol.replace('.NS', ''),
+                        'price': round(float(r['price']), 2),
+                        'change': round(float(r['change']), 2),
+                        'percentChange': round(float(r['percentChange']), 2),
+                        'fiftyTwoWeekHigh': round(float(r['fiftyTwoWeekHigh']), 2),
+                        'fiftyTwoWeekLow': round(float(r['fiftyTwoWeekLow']), 2),
+                        'is52WHigh': bool(r['is52WHigh']),
+                        'is52WLow': bool(r['is52WLow']),
+                        'logoUrl': f"https://cdn.tickerlogos.com/{domain}" if domain else ""
+                    }
+                return rows[symbol]
 
             return {
-                'gainers': gainers[:10],
-                'losers': losers[:10],
-                'fiftyTwoWeekHigh': high_52w[:10],
-                'fiftyTwoWeekLow': low_52w[:10]
+                'gainers': [_row(s) for s in gainers],
+                'losers': [_row(s) for s in losers],
+                'fiftyTwoWeekHigh': [_row(s) for s in high_52w],
+                'fiftyTwoWeekLow': [_row(s) for s in low_52w]
             }
 
         except Exception as e:
@@ -525,8 +784,7 @@ class MarketDataService:
             def fetch_symbol_news(symbol):
                 items = []
                 try:
-                    ticker = yf.Ticker(symbol)
-                    news = ticker.news
+                    news = self.provider.news(symbol)
                     for item in news:
                         news_item = item.get('content', item)
                         title = news_item.get('title')
@@ -630,34 +888,32 @@ class MarketDataService:
             logger.error(f"Error fetching news: {e}")
             return []
 
-    def get_index_history(self, symbol: str = "^NSEI", period: str = "1mo", interval: str = "1d") -> list:
+    def get_index_history(self, symbol: str = "^NSEI", period: str = "1mo", interval: str = "1d", columnar: bool = False):
         """
         Fetches historical data specifically formatted for frontend charting.
+        With `columnar=True` returns parallel arrays (dates/open/high/low/close/volume)
+        instead of a list of per-bar objects.
         """
         yf_symbol = self.normalize_symbol(symbol)
         try:
-            df = yf.download(yf_symbol, period=period, interval=interval, progress=False, threads=True)
+            df = self.provider.download(yf_symbol, period=period, interval=interval, progress=False, threads=True)
             if df is None or df.empty:
-                return []
+                return ohlcv_columns(None, "%Y-%m-%d") if columnar else []
             
             # Clean columns if multi-index
             if hasattr(df.columns, 'levels') or isinstance(df.columns, pd.MultiIndex):
                  df.columns = df.columns.get_level_values(0)
 
-            history = []
-            for date, row in df.iterrows():
-                history.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "close": round(float(row['Close']), 2),
-                    "open": round(float(row['Open']), 2),
-                    "high": round(float(row['High']), 2),
-                    "low": round(float(row['Low']), 2),
-                    "volume": int(row['Volume'])
-                })
-            return history
+            columns = ohlcv_columns(df, "%Y-%m-%d")
+            if columnar:
+                return columns
+            return columns_to_rows(columns, {
+                "date": "dates", "close": "close", "open": "open",
+                "high": "high", "low": "low", "volume": "volume",
+            })
         except Exception as e:
             logger.error(f"Error fetching history for {symbol}: {e}")
-            return []
+            return ohlcv_columns(None, "%Y-%m-%d") if columnar else []
 
     def get_market_mood(self) -> dict:
         """
@@ -667,8 +923,7 @@ class MarketDataService:
         try:
             # 1. Fetch India VIX (Volatility)
             try:
-                vix_ticker = yf.Ticker("^INDIAVIX")
-                vix_hist = vix_ticker.history(period="1mo")
+                vix_hist = self.provider.history("^INDIAVIX", period="1mo")
                 if not vix_hist.empty:
                     current_vix = float(vix_hist['Close'].iloc[-1])
                 else:
@@ -679,9 +934,8 @@ class MarketDataService:
 
             # 2. Fetch Nifty 50 (Momentum & RSI)
             try:
-                nifty_ticker = yf.Ticker("^NSEI")
                 # 4 months padding ensures we have 50 business days for SMA
-                nifty_hist = nifty_ticker.history(period="4mo") 
+                nifty_hist = self.provider.history("^NSEI", period="4mo")
                 if nifty_hist.empty:
                     raise ValueError("Nifty history empty")
                 
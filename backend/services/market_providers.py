@@ -0,0 +1,282 @@
+"""
+Pluggable market-data providers.
+
+Everything that used to call yfinance directly (MarketDataService,
+FinancialDataAdapter, LogoResolverService) goes through `get_market_provider()`
+instead, selected by MARKET_DATA_PROVIDER:
+
+- ``yfinance`` (default): live Yahoo Finance.
+- ``record``: live yfinance, and every successful response is pickled under
+  MARKET_REPLAY_DIR so it can be replayed later.
+- ``replay``: serves the recorded fixtures only — no network. Synthetic
+  latency (MARKET_REPLAY_LATENCY_MS ± MARKET_REPLAY_JITTER_MS) and error
+  injection (MARKET_REPLAY_ERROR_RATE) make load tests deterministic yet
+  realistic.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from utils.metrics import YFINANCE_CALL_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+
+def _default_replay_dir() -> str:
+    base_dir = os.path.dirname(os.path.dirname(__file__))  # backend/
+    return os.path.join(base_dir, "data", "replay")
+
+
+class MarketDataProvider(ABC):
+    """
+    The subset of yfinance the app uses. Public methods add latency metrics;
+    subclasses implement the underscored ones.
+    """
+
+    name = "base"
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        with timed(YFINANCE_CALL_SECONDS, call="download"):
+            return self._download(tickers, **kwargs)
+
+    def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        with timed(YFINANCE_CALL_SECONDS, call="history"):
+            return self._history(symbol, **kwargs)
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        with timed(YFINANCE_CALL_SECONDS, call="info"):
+            return self._info(symbol)
+
+    def news(self, symbol: str) -> List[Dict[str, Any]]:
+        with timed(YFINANCE_CALL_SECONDS, call="news"):
+            return self._news(symbol)
+
+    def fast_quote(self, symbol: str) -> Tuple[float, float]:
+        """(last_price, previous_close); raises when unavailable so callers fall back to history."""
+        with timed(YFINANCE_CALL_SECONDS, call="fast_info"):
+            return self._fast_quote(symbol)
+
+    @abstractmethod
+    def _download(self, tickers, **kwargs) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def _history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def _info(self, symbol: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def _news(self, symbol: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _fast_quote(self, symbol: str) -> Tuple[float, float]:
+        ...
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def _download(self, tickers, **kwargs) -> pd.DataFrame:
+        return yf.download(tickers, **kwargs)
+
+    def _history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def _info(self, symbol: str) -> Dict[str, Any]:
+        return yf.Ticker(symbol).info
+
+    def _news(self, symbol: str) -> List[Dict[str, Any]]:
+        return yf.Ticker(symbol).news
+
+    def _fast_quote(self, symbol: str) -> Tuple[float, float]:
+        fast_info = yf.Ticker(symbol).fast_info
+        return fast_info.last_price, fast_info.previous_close
+
+
+class _FixtureStore:
+    """
+    Pickled responses keyed by call + arguments. Each response is also saved
+    under a "loose" key (call, symbols, interval, period, start, group_by,
+    auto_adjust) so replays still match when only the remaining arguments
+    differ (end, progress, threads, ...). The window, column layout and price
+    adjustment stay in the key: a 5d fixture must never be served for a 1y
+    request, nor a per-ticker MultiIndex frame for a flat-column call.
+    """
+
+    # Arguments that decide which bars come back and their shape; everything else may differ.
+    _LOOSE_KEEP = ("interval", "period", "start", "group_by", "auto_adjust")
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def _symbols(args) -> List[str]:
+        target = args[0] if args else ""
+        if isinstance(target, str):
+            target = target.replace(",", " ").split()
+        return sorted(str(t).upper() for t in target)
+
+    def _path(self, call: str, kind: str, payload: Any) -> str:
+        digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.root, call, f"{kind}-{digest}.pkl")
+
+    def paths(self, call: str, args: tuple, kwargs: Dict[str, Any]) -> Tuple[str, str]:
+        symbols = self._symbols(args)
+        exact = self._path(call, "exact", [symbols, list(args[1:]), kwargs])
+        loose = self._path(call, "loose", [symbols, {k: kwargs.get(k) for k in self._LOOSE_KEEP}])
+        return exact, loose
+
+    def save(self, call: str, args: tuple, kwargs: Dict[str, Any], value: Any) -> None:
+        for path in self.paths(call, args, kwargs):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def load(self, call: str, args: tuple, kwargs: Dict[str, Any]):
+        """Returns (found, value)."""
+        for path in self.paths(call, args, kwargs):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return True, pickle.load(f)
+        return False, None
+
+
+class RecordingProvider(MarketDataProvider):
+    """Live provider that also writes every successful response to the fixture store."""
+
+    name = "record"
+
+    def __init__(self, inner: MarketDataProvider, fixture_dir: str):
+        self.inner = inner
+        self.fixtures = _FixtureStore(fixture_dir)
+
+    def _record(self, call: str, fn, *args, **kwargs):
+        value = fn(*args, **kwargs)
+        try:
+            self.fixtures.save(call, args, kwargs, value)
+        except Exception as e:
+            logger.warning(f"Failed to record {call} fixture for {args[:1]}: {e}")
+        return value
+
+    def _download(self, tickers, **kwargs):
+        return self._record("download", self.inner._download, tickers, **kwargs)
+
+    def _history(self, symbol, **kwargs):
+        return self._record("history", self.inner._history, symbol, **kwargs)
+
+    def _info(self, symbol):
+        return self._record("info", self.inner._info, symbol)
+
+    def _news(self, symbol):
+        return self._record("news", self.inner._news, symbol)
+
+    def _fast_quote(self, symbol):
+        return self._record("fast_quote", self.inner._fast_quote, symbol)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded fixtures without touching the network. A call with no
+    fixture behaves like an empty yfinance response (empty frame, {} or []).
+    """
+
+    name = "replay"
+
+    _EMPTY = {
+        "download": pd.DataFrame,
+        "history": pd.DataFrame,
+        "info": dict,
+        "news": list,
+    }
+
+    def __init__(self, fixture_dir: str, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.fixtures = _FixtureStore(fixture_dir)
+        self.latency_ms = max(0.0, latency_ms)
+        self.jitter_ms = max(0.0, jitter_ms)
+        self.error_rate = min(max(error_rate, 0.0), 1.0)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _replay(self, call: str, *args, **kwargs):
+        with self._rng_lock:
+            delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise ConnectionError(f"Injected replay failure for {call} {args[:1]}")
+
+        found, value = self.fixtures.load(call, args, kwargs)
+        if found:
+            # Callers may mutate frames/dicts; never hand out the cached object twice.
+            return value.copy() if hasattr(value, "copy") else value
+        logger.debug(f"No replay fixture for {call} {args[:1]}")
+        if call in self._EMPTY:
+            return self._EMPTY[call]()
+        raise LookupError(f"No replay fixture for {call} {args[:1]}")
+
+    def _download(self, tickers, **kwargs):
+        return self._replay("download", tickers, **kwargs)
+
+    def _history(self, symbol, **kwargs):
+        return self._replay("history", symbol, **kwargs)
+
+    def _info(self, symbol):
+        return self._replay("info", symbol)
+
+    def _news(self, symbol):
+        return self._replay("news", symbol)
+
+    def _fast_quote(self, symbol):
+        return self._replay("fast_quote", symbol)
+
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def build_market_provider(kind: Optional[str] = None) -> MarketDataProvider:
+    kind = (kind or os.getenv("MARKET_DATA_PROVIDER", "yfinance")).strip().lower()
+    fixture_dir = os.getenv("MARKET_REPLAY_DIR") or _default_replay_dir()
+    if kind == "replay":
+        seed = os.getenv("MARKET_REPLAY_SEED")
+        return ReplayProvider(
+            fixture_dir,
+            latency_ms=float(os.getenv("MARKET_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("MARKET_REPLAY_JITTER_MS", "0")),
+            error_rate=float(os.getenv("MARKET_REPLAY_ERROR_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+    if kind == "record":
+        return RecordingProvider(YFinanceProvider(), fixture_dir)
+    if kind != "yfinance":
+        logger.warning(f"Unknown MARKET_DATA_PROVIDER '{kind}', using yfinance.")
+    return YFinanceProvider()
+
+
+def get_market_provider() -> MarketDataProvider:
+    """Process-wide provider shared by every market-data consumer."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_market_provider()
+                logger.info(f"Market data provider: {_provider.name}")
+    return _provider
@@ -0,0 +1,208 @@
+"""
+Background refresher for the market dashboard datasets.
+
+Indices, mood, movers and news used to be computed inside the request that
+found the flask_caching entry expired, separately in every gunicorn worker.
+MarketDataRefresher recomputes them on a cadence instead and publishes each
+result to MarketSnapshotStore, which the /api/market routes read.
+
+Only one process per host refreshes: workers race for an exclusive flock on
+MARKET_REFRESH_LOCK_PATH and the losers keep retrying, so when the leader
+exits another worker takes over. Cadence follows NSE hours (09:15-15:30 IST,
+Mon-Fri): fast while the market is open, MARKET_REFRESH_CLOSED_SEC otherwise.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: no flock, every process refreshes.
+    fcntl = None
+
+from db.market_snapshot_store import MarketSnapshotStore
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+
+MARKET_REFRESH_TICK_SEC = float(os.getenv("MARKET_REFRESH_TICK_SEC", "5"))
+MARKET_REFRESH_CLOSED_SEC = float(os.getenv("MARKET_REFRESH_CLOSED_SEC", "1800"))
+MARKET_REFRESH_LEADER_RETRY_SEC = float(os.getenv("MARKET_REFRESH_LEADER_RETRY_SEC", "30"))
+# How far past its refresh interval a snapshot may be before a request triggers a background recompute.
+MARKET_SNAPSHOT_GRACE_SEC = float(os.getenv("MARKET_SNAPSHOT_GRACE_SEC", "120"))
+# Past this age a snapshot is not served even stale; the request waits for a recompute.
+MARKET_SNAPSHOT_HARD_TTL_SEC = float(os.getenv("MARKET_SNAPSHOT_HARD_TTL_SEC", str(6 * 3600)))
+
+MOVER_CATEGORIES = ("large_cap", "mid_cap", "small_cap")
+
+# dataset -> refresh interval (seconds) while the market is open; matches the old cache timeouts.
+OPEN_INTERVALS: Dict[str, float] = {
+    "indices": 60,
+    "mood": 300,
+    "news": 300,
+    **{f"movers:{c}": 300 for c in MOVER_CATEGORIES},
+}
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def refresh_interval(dataset: str, now: Optional[datetime] = None) -> float:
+    base = OPEN_INTERVALS.get(dataset, 300)
+    return base if is_market_open(now) else max(base, MARKET_REFRESH_CLOSED_SEC)
+
+
+def snapshot_max_age(dataset: str, now: Optional[datetime] = None) -> float:
+    """Oldest snapshot a route will still serve instead of computing on demand."""
+    return refresh_interval(dataset, now) + MARKET_SNAPSHOT_GRACE_SEC
+
+
+def _default_lock_path() -> str:
+    base_dir = os.path.dirname(os.path.dirname(__file__))  # backend/
+    data_dir = os.path.join(base_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "market_refresher.lock")
+
+
+def looks_failed(dataset: str, payload: Any) -> bool:
+    """The service methods swallow upstream errors; never replace a good snapshot with their fallbacks."""
+    if dataset == "indices":
+        return not payload or all(row.get("error") for row in payload)
+    if dataset.startswith("movers:"):
+        return not payload or not any(payload.get(k) for k in ("gainers", "losers"))
+    if dataset == "news":
+        return not payload
+    if dataset == "mood":
+        return not payload or not payload.get("metrics")
+    return payload is None
+
+
+class MarketDataRefresher:
+    """Leader-elected daemon thread that keeps every dashboard snapshot warm."""
+
+    def __init__(self, market_data_service, store: Optional[MarketSnapshotStore] = None,
+                 lock_path: Optional[str] = None):
+        self.service = market_data_service
+        self.store = store or MarketSnapshotStore()
+        self.lock_path = lock_path or os.getenv("MARKET_REFRESH_LOCK_PATH") or _default_lock_path()
+        self._lock_fd = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def datasets(self) -> List[Tuple[str, Callable[[], Any]]]:
+        svc = self.service
+        jobs = [
+            ("indices", svc.get_indices),
+            ("mood", svc.get_market_mood),
+            ("news", svc.get_news),
+        ]
+        jobs += [(f"movers:{c}", (lambda c=c: svc.get_top_movers(c))) for c in MOVER_CATEGORIES]
+        return jobs
+
+    # --- leader election ---
+    def try_acquire_leadership(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        if fcntl is None:
+            self._lock_fd = -1
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        logger.info(f"Market refresher leader: pid {os.getpid()}")
+        return True
+
+    def release_leadership(self) -> None:
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is not None and fd >= 0:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    # --- refresh ---
+    def refresh_due(self, now: Optional[datetime] = None) -> List[str]:
+        """Recomputes every dataset whose snapshot is older than its interval. Returns the refreshed keys."""
+        refreshed = []
+        for dataset, compute in self.datasets():
+            if self._stop.is_set():
+                break
+            try:
+                snap = self.store.get_raw(dataset)
+            except Exception as e:
+                logger.warning(f"Snapshot read failed for {dataset}: {e}")
+                snap = None
+            if snap is not None and snap[1] < refresh_interval(dataset, now):
+                continue
+            if self.refresh(dataset, compute):
+                refreshed.append(dataset)
+        return refreshed
+
+    def refresh(self, dataset: str, compute: Callable[[], Any]) -> bool:
+        started = time.perf_counter()
+        try:
+            payload = compute()
+        except Exception as e:
+            logger.error(f"Market refresh failed for {dataset}: {e}")
+            return False
+        if looks_failed(dataset, payload):
+            logger.warning(f"Market refresh for {dataset} returned no data; keeping the previous snapshot")
+            return False
+        self.store.put(dataset, payload)
+        logger.info(f"Refreshed market snapshot {dataset} in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            if not self.try_acquire_leadership():
+                self._stop.wait(MARKET_REFRESH_LEADER_RETRY_SEC)
+                continue
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"Market refresher tick failed: {e}")
+            self._stop.wait(MARKET_REFRESH_TICK_SEC)
+        self.release_leadership()
+
+    def start(self) -> "MarketDataRefresher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="market-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_refresher: Optional[MarketDataRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def start_market_refresher(market_data_service) -> Optional[MarketDataRefresher]:
+    """Starts the per-process refresher thread unless MARKET_REFRESHER_ENABLED=0."""
+    global _refresher
+    if os.getenv("MARKET_REFRESHER_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _refresher_lock:
+        if _refresher is None:
+            try:
+                _refresher = MarketDataRefresher(market_data_service).start()
+            except Exception as e:
+                logger.error(f"Market refresher unavailable, routes will compute on demand: {e}")
+                return None
+    return _refresher
@@ -4,6 +4,8 @@ from typing import List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
 
+import numpy as np
+
 class PortfolioIntelligence:
     """
     PortfolioIntelligence is the AI-driven analytics layer of InvestIQ.
@@ -183,76 +185,51 @@ class PortfolioIntelligence:
         Calculates the internal rate of return (XIRR).
         Returns a dict with 'value', 'type' (annualized/absolute), and 'is_new'.
         """
-        if not cash_flows:
-            return {"value": 0.0, "type": "absolute", "is_new": True}
-
-        # Calculate time window
-        flows = []
-        tx_dates = []
-        for cf in cash_flows:
-            try:
-                dt = datetime.fromisoformat(str(cf["date"])) if isinstance(cf["date"], str) else cf["date"]
-                tx_dates.append(dt)
-                amount = -abs(float(cf["amount"])) if cf["type"] == "buy" else abs(float(cf["amount"]))
-                flows.append((dt, amount))
-            except Exception:
-                continue
-        
+        return self.calculate_xirr_batch({"_": cash_flows}, {"_": current_value})["_"]
+
+    def calculate_xirr_batch(
+        self,
+        cash_flows_by_key: Dict[str, List[Dict[str, Any]]],
+        current_values: Dict[str, float],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        XIRR for many cash-flow series at once (e.g. one per holding).
+        Every series is solved in the same NumPy pass; each result has the
+        same shape as `calculate_xirr`.
+        """
         now = datetime.now()
-        flows.append((now, float(current_value)))
-        
-        if not tx_dates:
-            return {"value": 0.0, "type": "absolute", "is_new": True}
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []  # (key, amounts, years, days_active, absolute_pct)
 
-        # PORTFOLIO AGE CHECK
-        first_tx = min(tx_dates)
-        days_active = (now - first_tx).days
-        
-        # Calculate Absolute Return for base comparison
-        total_invested = sum(abs(f[1]) for f in flows if f[1] < 0)
-        absolute_profit = float(current_value) - total_invested
-        absolute_pct = (absolute_profit / total_invested * 100) if total_invested > 0 else 0.0
-
-        # CRITICAL: If portfolio is < 1 day old, XIRR is mathematically infinite
-        # Return Absolute % instead so the UI shows something real (e.g. 24.1%)
-        if days_active < 1:
-            return {
-                "value": round(absolute_pct, 2),
-                "type": "absolute",
-                "days": days_active,
-                "is_new": True
-            }
+        for key, cash_flows in cash_flows_by_key.items():
+            prepared = _prepare_xirr_flows(cash_flows, float(current_values.get(key) or 0.0), now)
+            if isinstance(prepared, dict):
+                results[key] = prepared
+            else:
+                pending.append((key, *prepared))
 
-        # Newton-Raphson Solver for XIRR
-        def xnpv(rate, flows):
-            d0 = flows[0][0]
-            return sum([f[1] / (1 + rate)**((f[0] - d0).days / 365.0) for f in flows])
-
-        def xnpv_derivative(rate, flows):
-            d0 = flows[0][0]
-            return sum([- (f[1] * (f[0] - d0).days / 365.0) / (1 + rate)**((f[0] - d0).days / 365.0 + 1) for f in flows])
-
-        rate = 0.1
-        for _ in range(50):
-            try:
-                f_val = xnpv(rate, flows)
-                f_prime = xnpv_derivative(rate, flows)
-                if abs(f_prime) < 1e-9: break
-                new_rate = rate - (f_val / f_prime)
-                if abs(new_rate - rate) < 1e-6:
-                    return {"value": round(new_rate * 100, 2), "type": "annualized", "days": days_active}
-                rate = new_rate
-            except Exception:
-                break
-                
-        # If solver fails to converge (extreme high returns), return absolute % 
-        # as a 'least-evil' fallback instead of 10.00 default.
-        return {
-            "value": round(absolute_pct, 2), 
-            "type": "absolute", 
-            "days": days_active,
-            "solver_failed": True
-        }
+        if pending:
+            width = max(len(p[1]) for p in pending)
+            amounts = np.zeros((len(pending), width))
+            years = np.zeros((len(pending), width))
+            for row, (_, flow_amounts, flow_years, _, _) in enumerate(pending):
+                amounts[row, :len(flow_amounts)] = flow_amounts
+                years[row, :len(flow_years)] = flow_years
+
+            rates = _solve_xirr(amounts, years)
+            for (key, _, _, days_active, absolute_pct), rate in zip(pending, rates):
+                if np.isfinite(rate):
+                    results[key] = {"value": round(float(rate) * 100, 2), "type": "annualized", "days": days_active}
+                else:
+                    # No sign change in the flows (or no root in range): return absolute %
+                    # as a 'least-evil' fallback instead of 10.00 default.
+                    results[key] = {
+                        "value": round(absolute_pct, 2),
+                        "type": "absolute",
+                        "days": days_active,
+                        "solver_failed": True
+                    }
+        return results
 
     def get_benchmark_comparison(self, days: int = 365) -> Dict[str, Any]:
         """
@@ -412,3 +389,122 @@ class PortfolioIntelligence:
             "net_capital_gain": float(total_pnl - total_tax - total_brokerage),
             "friction_ratio_percent": float((total_tax + total_brokerage) / total_pnl * 100) if total_pnl > 0 else 0
         }
+
+
+# XIRR solver bounds: rates are searched in (XIRR_MIN_RATE, XIRR_MAX_RATE].
+XIRR_MIN_RATE = -0.9999
+XIRR_MAX_RATE = 1e9
+XIRR_TOLERANCE = 1e-7
+
+
+def _prepare_xirr_flows(cash_flows: List[Dict[str, Any]], current_value: float, now: datetime):
+    """
+    Signs the flows (buys out, sells in, terminal value in) and converts dates
+    to year fractions from the first flow. Returns a final result dict when no
+    solve is needed, else (amounts, years, days_active, absolute_pct).
+    """
+    if not cash_flows:
+        return {"value": 0.0, "type": "absolute", "is_new": True}
+
+    flows = []
+    for cf in cash_flows:
+        try:
+            dt = datetime.fromisoformat(str(cf["date"])) if isinstance(cf["date"], str) else cf["date"]
+            amount = -abs(float(cf["amount"])) if cf["type"] == "buy" else abs(float(cf["amount"]))
+            flows.append((dt, amount))
+        except Exception:
+            continue
+
+    if not flows:
+        return {"value": 0.0, "type": "absolute", "is_new": True}
+
+    # PORTFOLIO AGE CHECK
+    first_tx = min(f[0] for f in flows)
+    days_active = (now - first_tx).days
+    flows.append((now, current_value))
+
+    # Calculate Absolute Return for base comparison
+    total_invested = sum(abs(f[1]) for f in flows if f[1] < 0)
+    absolute_profit = current_value - total_invested
+    absolute_pct = (absolute_profit / total_invested * 100) if total_invested > 0 else 0.0
+
+    # CRITICAL: If portfolio is < 1 day old, XIRR is mathematically infinite
+    # Return Absolute % instead so the UI shows something real (e.g. 24.1%)
+    if days_active < 1:
+        return {
+            "value": round(absolute_pct, 2),
+            "type": "absolute",
+            "days": days_active,
+            "is_new": True
+        }
+
+    d0 = flows[0][0]
+    amounts = [f[1] for f in flows]
+    years = [(f[0] - d0).days / 365.0 for f in flows]
+    return amounts, years, days_active, absolute_pct
+
+
+def _xnpv(rates: np.ndarray, amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Row-wise NPV of zero-padded flow matrices at one rate per row."""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        return (amounts * np.power(1.0 + rates[:, None], -years)).sum(axis=1)
+
+
+def _solve_xirr(amounts: np.ndarray, years: np.ndarray, max_newton: int = 50, max_bisect: int = 200) -> np.ndarray:
+    """
+    Solves NPV(rate) = 0 for every row of `amounts`/`years`.
+
+    Vectorized Newton-Raphson from 10% first; rows that diverge or stall fall
+    back to a bracketed bisection, which always converges once a sign change
+    is bracketed. Rows without a sign change in their flows come back as NaN.
+    """
+    n = amounts.shape[0]
+    rates = np.full(n, np.nan)
+    solvable = (amounts < 0).any(axis=1) & (amounts > 0).any(axis=1)
+
+    rate = np.full(n, 0.1)
+    active = solvable.copy()
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(max_newton):
+            if not active.any():
+                break
+            discount = np.power(1.0 + rate[:, None], -years)
+            f_val = (amounts * discount).sum(axis=1)
+            f_prime = (-years * amounts * discount / (1.0 + rate[:, None])).sum(axis=1)
+            new_rate = rate - f_val / f_prime
+            bad = active & (~np.isfinite(new_rate) | (np.abs(f_prime) < 1e-9) | (new_rate <= XIRR_MIN_RATE))
+            done = active & ~bad & (np.abs(new_rate - rate) < XIRR_TOLERANCE)
+            rates[done] = new_rate[done]
+            active &= ~(bad | done)
+            rate = np.where(active, new_rate, rate)
+
+    # Bracketed bisection for whatever Newton could not settle.
+    left = solvable & ~np.isfinite(rates)
+    if left.any():
+        idx = np.flatnonzero(left)
+        a, y = amounts[idx], years[idx]
+        lo = np.full(idx.size, XIRR_MIN_RATE)
+        hi = np.ones(idx.size)
+        f_lo = _xnpv(lo, a, y)
+        f_hi = _xnpv(hi, a, y)
+        # Widen the upper bound until the sign flips (fast-growing positions).
+        while True:
+            grow = (np.sign(f_lo) == np.sign(f_hi)) & (hi < XIRR_MAX_RATE)
+            if not grow.any():
+                break
+            hi[grow] = np.minimum(hi[grow] * 4.0, XIRR_MAX_RATE)
+            f_hi[grow] = _xnpv(hi[grow], a[grow], y[grow])
+
+        bracketed = np.sign(f_lo) != np.sign(f_hi)
+        for _ in range(max_bisect):
+            mid = (lo + hi) / 2.0
+            f_mid = _xnpv(mid, a, y)
+            same = np.sign(f_mid) == np.sign(f_lo)
+            lo = np.where(same, mid, lo)
+            f_lo = np.where(same, f_mid, f_lo)
+            hi = np.where(same, hi, mid)
+            if np.all((hi - lo) <= XIRR_TOLERANCE * np.maximum(1.0, np.abs(lo))):
+                break
+        rates[idx[bracketed]] = ((lo + hi) / 2.0)[bracketed]
+
+    return rates
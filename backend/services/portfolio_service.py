@@ -4,10 +4,15 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from decimal import Decimal
 
+import numpy as np
+import pandas as pd
+
 try:
     from services.market_data import MarketDataService
+    from services import holdings_ledger
 except ImportError:
     from .market_data import MarketDataService
+    from . import holdings_ledger
 
 class PortfolioService:
     """
@@ -123,138 +128,94 @@ class PortfolioService:
         """
         Reconstructs the historical Net Asset Value (NAV) of the portfolio.
         Instead of simulating, it uses historical price data and your trade dates.
+
+        Runs in O(T + D x S): trades are folded once into cumulative quantity
+        step-series per symbol, forward-filled onto the price calendar, and NAV is
+        a single row-wise dot product of quantities and as-of closing prices.
         """
         if not transactions:
             return []
 
         # 1. Get unique symbols and date range
         symbols = list(set(tx["symbol"] for tx in transactions))
-        
+
         # 2. Fetch Historical Data (Batch)
         period = "1y" if days > 180 else "6mo"
         hist_df = self.market_data.get_history(symbols, period=period)
-        
+
         if hist_df.empty:
             return []
 
-        # 3. Process Trades into a Daily Quantity Map
-        # We need to know exactly how many shares were held on any given Date.
-        sorted_txs = sorted(transactions, key=lambda x: x["transaction_date"])
-        
-        # Normalize Dataframe Format (MultiIndex handling)
-        series_map = {}
+        # 3. Normalize Dataframe Format (MultiIndex handling) into a (dates x symbols) close frame
+        closes = {}
         if hasattr(hist_df.columns, "levels"):
             for s in symbols:
                 yf_s = self.market_data.normalize_symbol(s)
                 if yf_s in hist_df.columns.levels[0]:
-                    series_map[s] = hist_df[yf_s]["Close"].dropna()
+                    closes[s] = hist_df[yf_s]["Close"]
         else:
             if len(symbols) == 1:
-                series_map[symbols[0]] = hist_df["Close"].dropna()
+                closes[symbols[0]] = hist_df["Close"]
 
-        if not series_map:
+        if not closes:
             return []
 
-        # 4. Align by the dates present in the market data
-        timeline = sorted(list(next(iter(series_map.values())).index))
-        # Filter to the requested window
-        timeline = timeline[-days:]
-        
-        history = []
-        for dt in timeline:
-            dt_str = dt.strftime("%Y-%m-%d")
-            total_value = Decimal("0")
-            
-            # Calculate holdings for this specific date
-            for s, ser in series_map.items():
-                # Qty of this stock on this day = Sum of buys - Sum of sells before or on this day
-                qty = sum(
-                    Decimal(str(tx["quantity"])) if tx["transaction_type"] == "buy" else -Decimal(str(tx["quantity"]))
-                    for tx in sorted_txs 
-                    if tx["symbol"] == s and tx["transaction_date"] <= dt_str
-                )
-                
-                if qty > 0:
-                    try:
-                        # Find closest price (as market might be closed on tx date)
-                        price = Decimal(str(ser.asof(dt) if hasattr(ser, 'asof') else ser.iloc[0]))
-                        total_value += qty * price
-                    except Exception:
-                        continue
-            
-            history.append({
-                "date": dt_str,
-                "value": round(float(total_value), 2)
-            })
+        prices = pd.DataFrame(closes).sort_index()
+        prices = prices[prices.notna().any(axis=1)]
 
-        return history
+        # 4. Align by the dates present in the market data, filtered to the requested window
+        timeline = prices.index[-days:]
+        # Forward-fill gives the same "closest earlier price" as Series.asof per cell.
+        prices = prices.ffill().reindex(timeline).fillna(0.0)
 
-    def get_holdings(self, portfolio_id: str, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Processes a list of transactions to derive the current state of holdings.
-        Calculates weighted average cost, total quantity, and current unrealized P&L.
-        """
-        holdings_map = {}
-        
-        for tx in transactions:
-            symbol = tx["symbol"]
-            qty = Decimal(str(tx["quantity"]))
-            price = Decimal(str(tx["price"]))
-            tx_type = tx["transaction_type"].lower()
+        # 5. Quantity held per symbol on each date (only long positions carry value)
+        qty = self._quantity_steps(transactions, prices.columns, timeline).clip(lower=0.0)
 
-            if symbol not in holdings_map:
-                holdings_map[symbol] = {
-                    "ticker": symbol,
-                    "qty": Decimal("0"),
-                    "total_cost": Decimal("0"),
-                    "avg_price": Decimal("0"),
-                    "transactions_count": 0
-                }
+        values = np.einsum("ij,ij->i", qty.to_numpy(dtype=float), prices.to_numpy(dtype=float))
+        dates = timeline.strftime("%Y-%m-%d")
 
-            h = holdings_map[symbol]
-            h["transactions_count"] += 1
+        return [
+            {"date": dt_str, "value": round(float(v), 2)}
+            for dt_str, v in zip(dates, values)
+        ]
 
-            if tx_type == "buy":
-                # Average Cost = (Old Total Cost + New Cost) / New Total Qty
-                h["total_cost"] += (qty * price)
-                h["qty"] += qty
-                if h["qty"] > 0:
-                    h["avg_price"] = h["total_cost"] / h["qty"]
-            elif tx_type == "sell":
-                # Selling reduces quantity but theoretically preserves the average cost 
-                # for the remaining shares in a simple FIFO/WAC model.
-                h["qty"] -= qty
-                # We deduct from total cost based on the average price to maintain consistency
-                h["total_cost"] = h["qty"] * h["avg_price"]
-                
-                # Check for short positions (not usually recommended for retail long-term)
-                if h["qty"] < 0:
-                    print(f"Warning: Negative inventory for {symbol}. Short selling detected.")
+    @staticmethod
+    def _quantity_steps(transactions: List[Dict[str, Any]], symbols, timeline: "pd.DatetimeIndex") -> "pd.DataFrame":
+        """
+        Builds the cumulative holding quantity of each symbol as a step series and
+        samples it on `timeline`. A trade counts from its own trade date onwards.
+        """
+        trades = pd.DataFrame({
+            "symbol": [tx["symbol"] for tx in transactions],
+            "date": pd.to_datetime([str(tx["transaction_date"])[:10] for tx in transactions], format="%Y-%m-%d"),
+            "qty": [
+                float(tx["quantity"]) if tx["transaction_type"] == "buy" else -float(tx["quantity"])
+                for tx in transactions
+            ],
+        })
+        steps = (
+            trades.pivot_table(index="date", columns="symbol", values="qty", aggfunc="sum", fill_value=0.0)
+            .reindex(columns=symbols, fill_value=0.0)
+            .sort_index()
+            .cumsum()
+        )
+        # Union with the price calendar so trades on non-trading days still carry forward.
+        return (
+            steps.reindex(steps.index.union(timeline))
+            .ffill()
+            .reindex(timeline)
+            .fillna(0.0)
+        )
 
-        # Filter out closed positions (qty = 0)
-        active_holdings = [h for h in holdings_map.values() if h["qty"] > 0]
-        
-        # Calculate Total Portfolio Value (Cost Basis) for weights
-        total_p_cost = sum(h["total_cost"] for h in active_holdings)
-        
-        # Final Format for Frontend
-        final_holdings = []
-        for h in active_holdings:
-            # Type casting to float for JSON serialization later
-            total_cost_val = Decimal(str(h["total_cost"]))
-            total_p_cost_val = Decimal(str(total_p_cost))
-            
-            weight = (total_cost_val / total_p_cost_val * Decimal("100")) if total_p_cost_val > 0 else Decimal("0")
-            
-            final_holdings.append({
-                "ticker": h["ticker"],
-                "qty": float(h["qty"]),
-                "avg_price": float(h["avg_price"]),
-                "weight": round(float(weight), 2),
-                "total_invested": float(h["total_cost"])
-            })
+    def get_holdings(self, portfolio_id: str, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Processes a list of transactions to derive the current state of holdings.
+        Calculates weighted average cost, total quantity, and current unrealized P&L.
 
-        return sorted(final_holdings, key=lambda x: x["weight"], reverse=True)
+        This is the full replay; stores that maintain a `holdings` projection
+        serve the same result from `list_holdings` without touching the log.
+        """
+        return holdings_ledger.format_holdings(holdings_ledger.replay(transactions).values())
 
     def calculate_unrealized_pnl(self, holdings: List[Dict[str, Any]], current_prices: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -2,16 +2,45 @@ import os
 import datetime
 import logging
 import json
-from typing import Dict, Any, Optional
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
 import time
 
 import google.generativeai as genai
 from groq import Groq
 import re
 from config.settings import conf
+from utils.json_stream import TopLevelJsonStream
+from utils.metrics import LLM_CALL_SECONDS, VERIFICATION_RULES_FIRED, timed
 
 logger = logging.getLogger(__name__)
 
+# ── Verification-pass rules, compiled once ─────────────────────────────────
+_DOLLAR_AMOUNT_RE = re.compile(r'\$\s*([\d,\.]+)')
+_NOT_AVAILABLE_RE = re.compile(r"not available", re.I)
+_W52_NOT_AVAILABLE_RE = re.compile(r"52-week range is not available", re.I)
+_MA_NOT_AVAILABLE_RE = re.compile(r"moving average[s]? (is|are) not available", re.I)
+_NO_DIVIDEND_PHRASES = ("lack of dividend", "no dividend")
+_HIGH_DEBT_PHRASES = ("high debt",)
+_GENERIC_FILLER_PHRASES = ("lack of transparency", "financial reporting", "difficult for investors to assess")
+
+
+def _rewrite_strings_in_place(root, rewrite) -> None:
+    """Applies `rewrite` to every string value in a nested dict/list, mutating containers in place."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            if isinstance(value, str):
+                new = rewrite(value)
+                if new is not value:
+                    node[key] = new
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+
 class AIProviderManager:
     """
     3-Tier AI Provider Cascade:
@@ -22,6 +51,10 @@ class AIProviderManager:
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
     XAI_MODEL = os.getenv("XAI_MODEL", "grok-2-latest")
+    GROQ_JSON_SYSTEM_PROMPT = (
+        "You are an elite institutional-grade financial analysis AI. Your ONLY output must be a single valid JSON object "
+        "matching the exact schema provided — no markdown fences, no explanation text."
+    )
 
     def __init__(self):
         self.gemini_key = conf.gemini_api_key
@@ -36,6 +69,23 @@ class AIProviderManager:
         self.gemini_cooldown_sec = int(os.getenv("GEMINI_COOLDOWN_SEC", "180"))
         self.gemini_cooldown_until = 0.0
         self.gemini_only = os.getenv("GEMINI_ONLY", "false").lower() in ("1", "true", "yes", "on")
+        # Hedged requests: if Gemini hasn't answered within the recent latency
+        # percentile, race the next fallback provider and keep the first answer.
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+        self.hedge_delay_sec = float(os.getenv("LLM_HEDGE_DELAY_SEC", "8"))
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "5"))
+        self._gemini_latencies = deque(maxlen=int(os.getenv("LLM_HEDGE_WINDOW", "50")))
+        self._latency_lock = threading.Lock()
+        # Each report worker can have a primary, a secondary and a losing call from an
+        # earlier hedge in flight at once.
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", str(max(8, 3 * conf.max_workers)))),
+            thread_name_prefix="llm-hedge",
+        )
+        # Streaming: when the caller asks for sections, consume the provider's token
+        # stream and hand over each top-level section as soon as it is complete.
+        self.streaming_enabled = os.getenv("LLM_STREAMING_ENABLED", "true").lower() in ("1", "true", "yes", "on")
         self.providers_ready = {"gemini": False, "groq": False, "xai": False}
         self.gemini_candidates = []
         self.groq_candidates = []
@@ -127,21 +177,26 @@ class AIProviderManager:
     # ─────────────────────────────────────────────────────────────────────────
     # Public interface
     # ─────────────────────────────────────────────────────────────────────────
-    def generate_json(self, prompt: str, market_context: dict = None) -> dict:
+    def generate_json(self, prompt: str, market_context: dict = None,
+                      on_section: Optional[Callable[[str, Any], None]] = None) -> dict:
         """
         Attempts each provider in order:
           Gemini → Groq → xAI → Mock
+
+        With hedging enabled, a slow Gemini call is raced against the Groq/xAI
+        fallback once it exceeds the hedge delay (see `_hedge_delay`).
+
+        With `on_section` (and LLM_STREAMING_ENABLED), Gemini/Groq are streamed
+        instead and every top-level section is verified and passed to
+        `on_section(key, value)` as soon as it is complete. If streaming fails
+        the cascade above runs; the returned report is always the full one.
         """
         data = None
-        if self._gemini_available_now():
-            data = self._try_gemini(prompt)
+        if on_section is not None and self.streaming_enabled:
+            data = self._generate_streaming(prompt, market_context, on_section)
+        if data is None:
+            data = self._generate_cascade(prompt)
 
-        if data is None and not self.gemini_only:
-            data = self._try_groq(prompt)
-            
-        if data is None and not self.gemini_only:
-            data = self._try_xai(prompt, is_json=True)
-            
         if data is None:
             logger.error("All AI providers (Gemini, Groq, xAI) failed — serving mock report.")
             data = self._fallback_generate()
@@ -152,6 +207,94 @@ class AIProviderManager:
         self._inject_real_chart_data(data, market_context)
         return data
 
+    def _generate_cascade(self, prompt: str) -> Optional[dict]:
+        if self._gemini_available_now():
+            if self.hedge_enabled and not self.gemini_only and self._fallback_ready():
+                return self._generate_hedged(prompt)
+            data = self._try_gemini(prompt)
+            if data is None and not self.gemini_only:
+                data = self._try_fallbacks(prompt)
+            return data
+        if not self.gemini_only:
+            return self._try_fallbacks(prompt)
+        return None
+
+    def _fallback_ready(self) -> bool:
+        return self.providers_ready["groq"] or self.providers_ready["xai"]
+
+    def _try_fallbacks(self, prompt: str, cancel: Optional[threading.Event] = None) -> Optional[dict]:
+        """Groq → xAI, stopping early once `cancel` is set by a winning hedge."""
+        data = self._try_groq(prompt, cancel=cancel)
+        if data is None and not (cancel is not None and cancel.is_set()):
+            data = self._try_xai(prompt, is_json=True)
+        return data
+
+    def _hedge_delay(self) -> float:
+        """Configured percentile of recent successful Gemini latencies, or the static delay until warmed up."""
+        with self._latency_lock:
+            samples = sorted(self._gemini_latencies)
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_delay_sec
+        idx = min(len(samples) - 1, max(0, int(round(self.hedge_percentile / 100.0 * len(samples))) - 1))
+        return samples[idx]
+
+    def _record_gemini_latency(self, seconds: float) -> None:
+        with self._latency_lock:
+            self._gemini_latencies.append(seconds)
+
+    def _generate_hedged(self, prompt: str) -> Optional[dict]:
+        """
+        Starts Gemini and, if it has not answered within the hedge delay, starts
+        the fallback cascade in parallel. The first valid JSON wins; the loser is
+        signalled to stop retrying and its result is discarded. In-flight HTTP
+        calls cannot be aborted, so a losing call finishes in the background.
+
+        The hedge delay counts from when Gemini actually starts: time queued
+        behind earlier losers in the pool is not Gemini latency. If the pool
+        does not start it within the delay, the fallbacks run on this thread.
+        """
+        cancel = threading.Event()
+        running = threading.Event()
+        run_started = []
+
+        def primary_call():
+            if cancel.is_set():
+                return None
+            run_started.append(time.monotonic())
+            running.set()
+            return self._try_gemini(prompt, cancel)
+
+        delay = self._hedge_delay()
+        primary = self._hedge_executor.submit(primary_call)
+        try:
+            if not running.wait(delay):
+                logger.warning(f"Hedge pool saturated — Gemini not started within {delay:.1f}s; running fallback providers inline.")
+                data = self._try_fallbacks(prompt, cancel)
+                return data if data is not None else primary.result()
+            done, _ = wait([primary], timeout=max(0.0, delay - (time.monotonic() - run_started[0])))
+            if done:
+                data = primary.result()
+                return data if data is not None else self._try_fallbacks(prompt)
+
+            logger.info(f"⏱️ Gemini slower than hedge delay ({delay:.1f}s) — racing fallback providers.")
+            secondary = self._hedge_executor.submit(self._try_fallbacks, prompt, cancel)
+            pending = {primary, secondary}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logger.warning(f"Hedged provider call raised {type(e).__name__}: {str(e)[:120]}")
+                        data = None
+                    if data is not None:
+                        winner = "Gemini" if future is primary else "fallback"
+                        logger.info(f"🏁 Hedged request won by {winner}.")
+                        return data
+            return None
+        finally:
+            cancel.set()
+
     def _gemini_available_now(self) -> bool:
         """Skip Gemini while cooldown is active after recent 429/timeout failures."""
         if not self.providers_ready["gemini"]:
@@ -163,6 +306,106 @@ class AIProviderManager:
             return False
         return True
 
+    def _generate_streaming(self, prompt: str, market_context: Optional[dict],
+                            on_section: Callable[[str, Any], None]) -> Optional[dict]:
+        """
+        Streams Gemini (then Groq) and returns the full parsed report, or None to
+        fall back to the blocking cascade. Sections are verified on their own
+        before they are handed out so previews already carry the real figures;
+        the complete report is still verified as a whole by `generate_json`.
+        Hedging does not apply: a stream shows progress long before it ends.
+        """
+        def publish(key: str, value: Any) -> None:
+            try:
+                section = self._run_verification_pass({key: value}, market_context, partial=True)
+                on_section(key, section.get(key, value))
+            except Exception as e:
+                logger.warning(f"Streamed section '{key}' could not be published: {e}")
+
+        data = None
+        if self._gemini_available_now():
+            data = self._stream_gemini(prompt, publish)
+        if data is None and not self.gemini_only:
+            data = self._stream_groq(prompt, publish)
+        return data
+
+    @staticmethod
+    def _consume_stream(fragments, on_section: Callable[[str, Any], None]) -> str:
+        """Feeds text fragments to the section parser and returns the full response text."""
+        parser = TopLevelJsonStream()
+        parts = []
+        for fragment in fragments:
+            if not fragment:
+                continue
+            parts.append(fragment)
+            for key, value in parser.feed(fragment):
+                on_section(key, value)
+        return "".join(parts)
+
+    def _gemini_chunk_text(self, chunk: Any) -> str:
+        try:
+            return self._extract_gemini_text(chunk)
+        except ValueError:
+            # Chunks that only carry finish metadata have no text parts.
+            return ""
+
+    def _stream_gemini(self, prompt: str, on_section: Callable[[str, Any], None]) -> Optional[dict]:
+        started = time.time()
+        try:
+            logger.info("🔵 Streaming Gemini...")
+            request_options = {"timeout": self.gemini_timeout_sec} if self.gemini_timeout_sec > 0 else None
+            with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                stream = self.gemini_model.generate_content(
+                    prompt,
+                    generation_config=genai.GenerationConfig(
+                        response_mime_type="application/json",
+                        temperature=0.0,
+                        max_output_tokens=self.gemini_max_output_tokens,
+                    ),
+                    request_options=request_options,
+                    stream=True,
+                )
+                raw = self._consume_stream((self._gemini_chunk_text(chunk) for chunk in stream), on_section)
+            data = self._parse_json_response(raw)
+            self._record_gemini_latency(time.time() - started)
+            logger.info(f"✅ Gemini stream completed in {time.time() - started:.2f}s.")
+            return data
+        except Exception as e:
+            msg = str(e).lower()
+            if "429" in msg or "quota" in msg or "deadline" in msg or "timeout" in msg:
+                self.gemini_cooldown_until = time.time() + self.gemini_cooldown_sec
+            logger.warning(f"Gemini stream failed ({type(e).__name__}): {str(e)[:120]} — trying next provider...")
+            return None
+
+    def _stream_groq(self, prompt: str, on_section: Callable[[str, Any], None]) -> Optional[dict]:
+        if not self.providers_ready["groq"]:
+            return None
+        model_name = (self.groq_candidates or [self.GROQ_MODEL])[0]
+        try:
+            logger.info(f"🟡 Streaming Groq ({model_name})...")
+            # Groq's JSON mode cannot be combined with streaming; the system prompt
+            # asks for bare JSON and the parser skips any fence around it.
+            with timed(LLM_CALL_SECONDS, provider="groq", model=model_name):
+                stream = self.groq_client.chat.completions.create(
+                    model=model_name,
+                    messages=[
+                        {"role": "system", "content": self.GROQ_JSON_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.2,
+                    max_tokens=self.gemini_max_output_tokens,
+                    stream=True,
+                )
+                raw = self._consume_stream(
+                    (chunk.choices[0].delta.content for chunk in stream if chunk.choices), on_section
+                )
+            data = self._parse_json_response(raw)
+            logger.info(f"✅ Groq stream completed ({model_name}).")
+            return data
+        except Exception as e:
+            logger.warning(f"Groq stream failed ({model_name}): {str(e)[:120]} — falling back to blocking calls.")
+            return None
+
     def generate_text(self, system_prompt: str, user_message: str, history: list = None) -> str:
         """
         Generates a plain text response for a chat interface.
@@ -181,7 +424,8 @@ class AIProviderManager:
                 chat = self.gemini_model.start_chat(history=gemini_history)
                 # Combine system prompt with user message for simpler stateless call or use system_instruction if available
                 full_prompt = f"{system_prompt}\n\nUser Question: {user_message}"
-                response = chat.send_message(full_prompt)
+                with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                    response = chat.send_message(full_prompt)
                 return response.text
             except Exception as e:
                 logger.warning(f"Gemini text gen failed: {e}")
@@ -198,11 +442,12 @@ class AIProviderManager:
                         messages.extend(history[-4:])
                     messages.append({"role": "user", "content": user_message})
                     
-                    response = self.groq_client.chat.completions.create(
-                        model=model_name,
-                        messages=messages,
-                        temperature=0.7,
-                    )
+                    with timed(LLM_CALL_SECONDS, provider="groq", model=model_name):
+                        response = self.groq_client.chat.completions.create(
+                            model=model_name,
+                            messages=messages,
+                            temperature=0.7,
+                        )
                     return response.choices[0].message.content
                 except Exception as e:
                     logger.warning(f"Groq text gen failed ({model_name}): {e}")
@@ -213,9 +458,13 @@ class AIProviderManager:
     # ─────────────────────────────────────────────────────────────────────────
     # Provider implementations
     # ─────────────────────────────────────────────────────────────────────────
-    def _try_gemini(self, prompt: str) -> Optional[dict]:
+    def _try_gemini(self, prompt: str, cancel: Optional[threading.Event] = None) -> Optional[dict]:
         if not self.providers_ready["gemini"]:
             return None
+
+        def cancelled() -> bool:
+            return cancel is not None and cancel.is_set()
+
         started = time.time()
         try:
             logger.info("🔵 Trying Gemini...")
@@ -225,35 +474,50 @@ class AIProviderManager:
                 max_output_tokens=self.gemini_max_output_tokens,
             )
             if self.gemini_timeout_sec > 0:
-                response = self.gemini_model.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                    request_options={"timeout": self.gemini_timeout_sec},
-                )
+                with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                    response = self.gemini_model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options={"timeout": self.gemini_timeout_sec},
+                    )
             else:
-                response = self.gemini_model.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                )
+                with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                    response = self.gemini_model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                    )
 
             data = self._parse_json_response(self._extract_gemini_text(response))
+            self._record_gemini_latency(time.time() - started)
             logger.info(f"✅ Gemini succeeded in {time.time() - started:.2f}s.")
             return data
         except Exception as e:
             msg = str(e).lower()
-            if "429" in msg or "quota" in msg:
+            rate_limited = "429" in msg or "quota" in msg
+            timed_out = "deadline" in msg or "timeout" in msg or "504" in msg
+            if cancelled():
+                # The hedge already answered, but a rate-limited or timing-out Gemini must still
+                # cool down so later requests don't wait out the hedge delay on it.
+                if rate_limited or timed_out:
+                    self.gemini_cooldown_until = time.time() + self.gemini_cooldown_sec
+                logger.info("Gemini failed after a hedged provider already answered — skipping retries.")
+            elif rate_limited:
                 logger.warning("🔴 Gemini Rate Limit (429) hit. Retrying once in 2s...")
                 time.sleep(2)
+                if cancelled():
+                    self.gemini_cooldown_until = time.time() + self.gemini_cooldown_sec
+                    return None
                 try:
-                    retry_response = self.gemini_model.generate_content(
-                        prompt,
-                        generation_config=genai.GenerationConfig(
-                            response_mime_type="application/json",
-                            temperature=0.0,
-                            max_output_tokens=self.gemini_max_output_tokens,
-                        ),
-                        request_options={"timeout": self.gemini_timeout_sec + 5},
-                    )
+                    with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                        retry_response = self.gemini_model.generate_content(
+                            prompt,
+                            generation_config=genai.GenerationConfig(
+                                response_mime_type="application/json",
+                                temperature=0.0,
+                                max_output_tokens=self.gemini_max_output_tokens,
+                            ),
+                            request_options={"timeout": self.gemini_timeout_sec + 5},
+                        )
                     data = self._parse_json_response(self._extract_gemini_text(retry_response))
                     logger.info(f"✅ Gemini recovered from 429 on retry in {time.time() - started:.2f}s.")
                     return data
@@ -270,38 +534,43 @@ class AIProviderManager:
                             max_output_tokens=self.gemini_max_output_tokens,
                         )
                         if self.gemini_timeout_sec > 0:
-                            response = self.gemini_model.generate_content(
-                                prompt,
-                                generation_config=retry_cfg,
-                                request_options={"timeout": self.gemini_timeout_sec},
-                            )
+                            with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                                response = self.gemini_model.generate_content(
+                                    prompt,
+                                    generation_config=retry_cfg,
+                                    request_options={"timeout": self.gemini_timeout_sec},
+                                )
                         else:
-                            response = self.gemini_model.generate_content(
-                                prompt,
-                                generation_config=retry_cfg,
-                            )
+                            with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                                response = self.gemini_model.generate_content(
+                                    prompt,
+                                    generation_config=retry_cfg,
+                                )
                         data = self._parse_json_response(self._extract_gemini_text(response))
                         logger.info(f"✅ Gemini succeeded after runtime model switch in {time.time() - started:.2f}s.")
                         return data
                     except Exception as retry_err:
                         logger.warning(f"Gemini runtime-switch retry failed ({type(retry_err).__name__}): {str(retry_err)[:120]} — trying fallbacks...")
-            elif "deadline" in msg or "timeout" in msg or "504" in msg:
+            elif timed_out:
                 logger.warning("Gemini timeout/deadline error from upstream — trying fallback providers.")
                 self.gemini_cooldown_until = time.time() + self.gemini_cooldown_sec
                 # Permanent reliability path: retry with SAME prompt and increasing timeout.
                 for attempt in range(1, max(self.gemini_max_retries, 1) + 1):
+                    if cancelled():
+                        return None
                     try:
                         retry_timeout = max(self.gemini_timeout_sec + (attempt * 10), 20)
                         logger.warning(f"Gemini timeout recovery attempt {attempt}/{self.gemini_max_retries} (timeout={retry_timeout}s)")
-                        retry_response = self.gemini_model.generate_content(
-                            prompt,
-                            generation_config=genai.GenerationConfig(
-                                response_mime_type="application/json",
-                                temperature=0.0,
-                                max_output_tokens=self.gemini_max_output_tokens,
-                            ),
-                            request_options={"timeout": retry_timeout},
-                        )
+                        with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                            retry_response = self.gemini_model.generate_content(
+                                prompt,
+                                generation_config=genai.GenerationConfig(
+                                    response_mime_type="application/json",
+                                    temperature=0.0,
+                                    max_output_tokens=self.gemini_max_output_tokens,
+                                ),
+                                request_options={"timeout": retry_timeout},
+                            )
                         data = self._parse_json_response(self._extract_gemini_text(retry_response))
                         logger.info(f"✅ Gemini timeout recovery succeeded in {time.time() - started:.2f}s.")
                         return data
@@ -312,16 +581,19 @@ class AIProviderManager:
                 try:
                     boosted_tokens = min(8192, max(self.gemini_max_output_tokens + 1024, int(self.gemini_max_output_tokens * 1.75)))
                     for attempt in range(1, max(self.gemini_max_retries, 1) + 1):
+                        if cancelled():
+                            return None
                         retry_timeout = max(self.gemini_timeout_sec + (attempt * 5), 20)
-                        retry_response = self.gemini_model.generate_content(
-                            prompt,
-                            generation_config=genai.GenerationConfig(
-                                response_mime_type="application/json",
-                                temperature=0.0,
-                                max_output_tokens=boosted_tokens,
-                            ),
-                            request_options={"timeout": retry_timeout},
-                        )
+                        with timed(LLM_CALL_SECONDS, provider="gemini", model=self.GEMINI_MODEL):
+                            retry_response = self.gemini_model.generate_content(
+                                prompt,
+                                generation_config=genai.GenerationConfig(
+                                    response_mime_type="application/json",
+                                    temperature=0.0,
+                                    max_output_tokens=boosted_tokens,
+                                ),
+                                request_options={"timeout": retry_timeout},
+                            )
                         data = self._parse_json_response(self._extract_gemini_text(retry_response))
                         logger.info(f"✅ Gemini JSON recovery succeeded in {time.time() - started:.2f}s (attempt {attempt}).")
                         return data
@@ -406,26 +678,25 @@ class AIProviderManager:
 
         return json.loads(text[start:end])
 
-    def _try_groq(self, prompt: str) -> Optional[dict]:
+    def _try_groq(self, prompt: str, cancel: Optional[threading.Event] = None) -> Optional[dict]:
         if not self.providers_ready["groq"]:
             return None
-        system_msg = (
-            "You are an elite institutional-grade financial analysis AI. Your ONLY output must be a single valid JSON object "
-            "matching the exact schema provided — no markdown fences, no explanation text."
-        )
         for model_name in (self.groq_candidates or [self.GROQ_MODEL]):
+            if cancel is not None and cancel.is_set():
+                return None
             try:
                 logger.info(f"🟡 Trying Groq ({model_name})...")
-                response = self.groq_client.chat.completions.create(
-                    model=model_name,
-                    messages=[
-                        {"role": "system", "content": system_msg},
-                        {"role": "user", "content": prompt}
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.2,
-                    max_tokens=self.gemini_max_output_tokens,
-                )
+                with timed(LLM_CALL_SECONDS, provider="groq", model=model_name):
+                    response = self.groq_client.chat.completions.create(
+                        model=model_name,
+                        messages=[
+                            {"role": "system", "content": self.GROQ_JSON_SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        response_format={"type": "json_object"},
+                        temperature=0.2,
+                        max_tokens=self.gemini_max_output_tokens,
+                    )
                 raw = response.choices[0].message.content
                 data = json.loads(raw)
                 logger.info(f"✅ Groq succeeded ({model_name}).")
@@ -443,14 +714,15 @@ class AIProviderManager:
             if is_json:
                 system_msg += "Your ONLY output must be a single valid JSON object matching the requested schema."
             
-            response = self.xai_client.chat.completions.create(
-                model=self.XAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-            )
+            with timed(LLM_CALL_SECONDS, provider="xai", model=self.XAI_MODEL):
+                response = self.xai_client.chat.completions.create(
+                    model=self.XAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_msg},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.2,
+                )
             raw = response.choices[0].message.content
             
             if is_json:
@@ -475,7 +747,7 @@ class AIProviderManager:
             return None
 
 
-    def _run_verification_pass(self, draft_data: dict, market_context: dict) -> dict:
+    def _run_verification_pass(self, draft_data: dict, market_context: dict, partial: bool = False) -> dict:
         """
         Anti-Hallucination Layer — Deterministic Python Patcher.
 
@@ -484,14 +756,28 @@ class AIProviderManager:
         specific numeric and enum fields that can be independently verified against
         ground-truth yfinance data. ALL AI text/prose fields are left completely
         untouched — preserving the full depth of the draft.
+
+        The draft is patched in place (it is always a freshly parsed LLM response).
+        Every string rewrite runs in a single traversal with precompiled rules. A
+        rule is counted only when it changed a value; the counts are logged and
+        exported as ``investiq_verification_rules_total``, never added to the report.
+
+        With ``partial`` the draft holds only some sections (a streamed preview):
+        every rule is section-local, so the same patches apply, but missing keys
+        are not defaulted and nothing is counted (the final pass counts once).
         """
         if not market_context:
             return draft_data
 
-        import re, copy
         logger.info("Verifying & patching report against yfinance ground truth...")
 
-        data = copy.deepcopy(draft_data)
+        data = draft_data
+        fired: Dict[str, int] = {}
+
+        def hit(rule: str, count: int = 1):
+            if count:
+                fired[rule] = fired.get(rule, 0) + count
+
         fund     = market_context.get("fundamentals", {})
         currency = market_context.get("company_meta", {}).get("currency", fund.get("currency", "INR"))
         symbol   = market_context.get("symbol", "")
@@ -532,33 +818,26 @@ class AIProviderManager:
             {"label": "Dividend Yield", "value": f"{div_pct}%"},
         ]
         if "snapshot" in data:
+            if data["snapshot"].get("keyMetrics") != real_metrics:
+                hit("key_metrics")
             data["snapshot"]["keyMetrics"] = real_metrics
 
         # ── 2. Correct header & profile fields (CEO, Symbol, Timestamp) ──────
         if "header" in data:
+            if data["header"].get("symbol") != symbol:
+                hit("header")
             data["header"]["symbol"] = symbol
             data["header"]["lastUpdated"] = datetime.datetime.now().isoformat()
 
         if "companyProfile" in data:
             real_ceo = market_context.get("company_meta", {}).get("ceo", "N/A")
             if real_ceo != "N/A":
+                if data["companyProfile"].get("ceo") != real_ceo:
+                    hit("ceo")
                 data["companyProfile"]["ceo"] = real_ceo
 
-        # ── 3. Deep string scan: strip rogue '$' and 'USD' from all text fields ─
-        if currency in ("INR",):
-            def scrub_currency(obj):
-                if isinstance(obj, str):
-                    cleaned = re.sub(r'\$\s*([\d,\.]+)', r'\1 INR', obj)
-                    cleaned = cleaned.replace(" USD", f" {currency}")
-                    return cleaned
-                if isinstance(obj, dict):
-                    return {k: scrub_currency(v) for k, v in obj.items()}
-                if isinstance(obj, list):
-                    return [scrub_currency(i) for i in obj]
-                return obj
-            data = scrub_currency(data)
-
-        # ── 4. Logically consistent Momentum label (price vs. moving averages) ──
+        # ── 3. Logically consistent Momentum label (price vs. moving averages) ──
+        price = ma_50 = ma_200 = 0.0
         try:
             price  = float(fund.get("current_price", 0) or 0)
             ma_50  = float(fund.get("50d_avg", 0) or 0)
@@ -574,44 +853,57 @@ class AIProviderManager:
                             logger.info("Patching Momentum: Bullish -> Bearish (price below both MAs)")
                             s["value"] = "Bearish"
                             s["type"]  = "negative"
+                            hit("momentum")
                         elif above_both and s.get("value") == "Bearish":
                             logger.info("Patching Momentum: Bearish -> Bullish (price above both MAs)")
                             s["value"] = "Bullish"
                             s["type"]  = "positive"
+                            hit("momentum")
 
         except Exception as e:
             logger.warning(f"Momentum patch skipped: {e}")
 
-        # ── 4b. Inject MA values into technical signals text & purge N/A hallucinations ──
+        # ── 3b. Inject MA values into technical signals text ─────────────────
         try:
+            ma_text = f"{fmt(ma_50)} (MA50) / {fmt(ma_200)} (MA200)"
             for sig in data.get("technicalSignals", []):
                 # Always fix the "Moving Average" signal description if it's vague/N/A
                 if sig.get("name") == "Moving Average":
                     txt = sig.get("description", "")
-                    if "not available" in txt.lower() or "N/A" in txt or len(txt) < 20:
+                    if _NOT_AVAILABLE_RE.search(txt) or "N/A" in txt or len(txt) < 20:
                         sig["description"] = f"The price of {symbol} ({price} {currency}) is being analysed against its 50-day MA ({fmt(ma_50)}) and 200-day MA ({fmt(ma_200)}). The trend is currently {sig.get('status')} based on position relative to these averages."
+                        hit("ma_signal_description")
+
+                # Scrub EVERY signal description for "not available"
+                desc = sig.get("description")
+                if isinstance(desc, str) and "not available" in desc:
+                    hit("signal_not_available", desc.count("not available"))
+                    sig["description"] = desc.replace("not available", ma_text)
+        except Exception as e:
+            logger.warning(f"Technical signal patch skipped: {e}")
 
-                # Scrub EVERY signal description for "not available" or "N/A"
-                if "description" in sig:
-                    sig["description"] = sig["description"].replace("not available", f"{fmt(ma_50)} (MA50) / {fmt(ma_200)} (MA200)")
-                    sig["description"] = sig["description"].replace("is not available", "is being monitored")
-
-            # ── 4c. Deep narrative scrub for N/A hallucinations ──────────────────
-            def scrub_hallucinations(obj):
-                if isinstance(obj, str):
-                    # Replace "52-week range is not available" with actual numbers
-                    if "52-week range" in obj.lower() and "not available" in obj.lower():
-                        obj = re.sub(r"52-week range is not available", f"52-week range is {fmt(w52_low)} - {fmt(w52_high)} {currency}", obj, flags=re.I)
-                    # Replace "moving average is not available"
-                    if "moving average" in obj.lower() and ("not available" in obj.lower() or "N/A" in obj):
-                        obj = re.sub(r"moving average[s]? (is|are) not available", f"50-day MA is {fmt(ma_50)} and 200-day MA is {fmt(ma_200)}", obj, flags=re.I)
-                    return obj
-                if isinstance(obj, dict):
-                    return {k: scrub_hallucinations(v) for k, v in obj.items()}
-                if isinstance(obj, list):
-                    return [scrub_hallucinations(i) for i in obj]
-                return obj
-            data = scrub_hallucinations(data)
+        # ── 4. Single-pass string scan: rogue '$'/'USD' and N/A hallucinations ──
+        scrub_currency = currency in ("INR",)
+        w52_text = f"52-week range is {fmt(w52_low)} - {fmt(w52_high)} {currency}"
+        ma_pair_text = f"50-day MA is {fmt(ma_50)} and 200-day MA is {fmt(ma_200)}"
+
+        def rewrite(text: str) -> str:
+            if scrub_currency:
+                if "$" in text:
+                    text, n = _DOLLAR_AMOUNT_RE.subn(r"\1 INR", text)
+                    hit("currency_symbol", n)
+                if " USD" in text:
+                    hit("currency_usd", text.count(" USD"))
+                    text = text.replace(" USD", f" {currency}")
+            if _NOT_AVAILABLE_RE.search(text):
+                text, n = _W52_NOT_AVAILABLE_RE.subn(lambda _m: w52_text, text)
+                hit("w52_not_available", n)
+                text, n = _MA_NOT_AVAILABLE_RE.subn(lambda _m: ma_pair_text, text)
+                hit("ma_not_available", n)
+            return text
+
+        try:
+            _rewrite_strings_in_place(data, rewrite)
         except Exception as e:
             logger.warning(f"Narrative patch skipped: {e}")
 
@@ -623,21 +915,30 @@ class AIProviderManager:
                 if meta.get("sector"): data["companyProfile"]["sector"] = meta["sector"]
                 if meta.get("industry"): data["companyProfile"]["industry"] = meta["industry"]
 
-            if "riskSignals" in data:
-                # ── 5a. Remove risk contradictions (Dividends/Debt) ─────────────
+            if isinstance(data.get("riskSignals"), list):
+                # (rule, phrases) — a risk matching any phrase contradicts verified data.
+                drop_rules = []
+                # ── 5a. Risk contradictions (Dividends/Debt) ────────────────────
                 if div_raw and div_raw > 0:
-                    data["riskSignals"] = [r for r in data["riskSignals"] if not any(x in (r.get("text", "") if isinstance(r, dict) else str(r)).lower() for x in ["lack of dividend", "no dividend"])]
-                
+                    drop_rules.append(("risk_no_dividend", _NO_DIVIDEND_PHRASES))
                 de_ratio = fund.get("debt_to_equity")
                 if de_ratio is not None and float(de_ratio) < 20: # Higher threshold for safety
-                    data["riskSignals"] = [r for r in data["riskSignals"] if "high debt" not in (r.get("text", "") if isinstance(r, dict) else str(r)).lower()]
-
-                # ── 5b. Purge generic 'filler' risks for blue-chips ─────────────
-                # If it's a large cap (> 500B INR), certain generic risks are likely hallucinations
+                    drop_rules.append(("risk_high_debt", _HIGH_DEBT_PHRASES))
+                # ── 5b. Generic 'filler' risks for blue-chips (> 500B INR) ─────
                 mcap_inr = fund.get("market_cap_billions", 0)
                 if mcap_inr and float(mcap_inr) > 500:
-                    generic_fillers = ["lack of transparency", "financial reporting", "difficult for investors to assess"]
-                    data["riskSignals"] = [r for r in data["riskSignals"] if not any(f in (r.get("text", "") if isinstance(r, dict) else str(r)).lower() for f in generic_fillers)]
+                    drop_rules.append(("risk_generic_filler", _GENERIC_FILLER_PHRASES))
+
+                if drop_rules:
+                    kept = []
+                    for r in data["riskSignals"]:
+                        text = (r.get("text", "") if isinstance(r, dict) else str(r)).lower()
+                        rule = next((name for name, phrases in drop_rules if any(p in text for p in phrases)), None)
+                        if rule is None:
+                            kept.append(r)
+                        else:
+                            hit(rule)
+                    data["riskSignals"][:] = kept
         except Exception as e:
             logger.warning(f"Logic consistency patch failed: {e}")
 
@@ -648,11 +949,16 @@ class AIProviderManager:
                 vol_pct = float(str(vol_raw).replace("%", ""))
                 level = "High" if vol_pct > 40 else ("Medium" if vol_pct > 20 else "Low")
                 if "volatility" in data:
-                    data["volatility"]["value"] = round(vol_pct, 1)
-                    data["volatility"]["level"] = level
+                    verified = {"value": round(vol_pct, 1), "level": level}
+                    if any(data["volatility"].get(k) != v for k, v in verified.items()):
+                        hit("volatility")
+                    data["volatility"].update(verified)
         except Exception as e:
             logger.warning(f"Volatility patch skipped: {e}")
 
+        if partial:
+            return data
+
         # ── 7. Schema Integrity: Ensure all required top-level keys exist ────────
         required_keys = {
             "header": {},
@@ -675,8 +981,11 @@ class AIProviderManager:
             if key not in data or data[key] is None:
                 logger.warning(f"Schema Integrity: Missing/null key '{key}' in LLM response. Patching with default.")
                 data[key] = default
+                hit(f"schema_default:{key}")
 
-        logger.info("Verification patch complete — all narrative preserved, facts & logic corrected.")
+        for rule, count in fired.items():
+            VERIFICATION_RULES_FIRED.labels(rule=rule).inc(count)
+        logger.info(f"Verification patch complete — rules fired: {fired or 'none'}")
         return data
 
 
@@ -0,0 +1,212 @@
+"""
+Bulk import of broker tradebooks / contract notes from CSV.
+
+Rows are parsed one at a time off the upload stream, normalised to the
+AddTransaction payload, validated by PortfolioService.add_transaction and
+written with one store.insert_transactions_batch call (multi-row inserts of
+TRANSACTION_IMPORT_BATCH_SIZE rows), so a 5,000-trade history costs a
+handful of inserts instead of one round trip per trade.
+"""
+import csv
+import io
+import logging
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("TRANSACTION_IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.getenv("TRANSACTION_IMPORT_MAX_ROWS", "50000"))
+# Only the first few row errors are echoed back; the count covers all of them.
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+# canonical field -> accepted (normalised) header names across common broker exports
+HEADER_ALIASES = {
+    "symbol": ("symbol", "tradingsymbol", "trading_symbol", "scrip", "scrip_name", "ticker", "stock", "instrument"),
+    "transaction_type": ("transaction_type", "trade_type", "type", "side", "buy_sell", "action"),
+    "quantity": ("quantity", "qty", "shares", "units", "traded_qty"),
+    "price": ("price", "trade_price", "rate", "avg_price", "average_price", "traded_price", "net_rate"),
+    "transaction_date": ("transaction_date", "trade_date", "date", "order_execution_time", "execution_time", "trade_time"),
+    "brokerage": ("brokerage", "charges", "fees", "commission"),
+    "asset_segment": ("asset_segment", "segment", "asset_class"),
+    "trade_id": ("trade_id", "trade_no", "trade_number"),
+    "notes": ("notes", "remarks", "comment"),
+}
+REQUIRED_COLUMNS = ("symbol", "transaction_type", "quantity", "price")
+
+_TYPE_ALIASES = {"b": "buy", "buy": "buy", "purchase": "buy", "s": "sell", "sell": "sell", "sale": "sell"}
+_SEGMENT_ALIASES = {"eq": "equity", "equity": "equity", "nse": "equity", "bse": "equity", "cash": "equity"}
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%b-%Y", "%d %b %Y")
+_TRADE_ID_NOTE = re.compile(r"\btrade_id=(\S+)")
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole is unusable (no header / missing required columns)."""
+
+
+def _normalise_header(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", (name or "").strip().lower()).strip("_")
+
+
+def _map_headers(fieldnames: Iterable[str]) -> Dict[str, str]:
+    """Returns {canonical_field: header_in_file}."""
+    by_norm = {_normalise_header(h): h for h in fieldnames if h}
+    mapping = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in by_norm:
+                mapping[field] = by_norm[alias]
+                break
+    missing = [f for f in REQUIRED_COLUMNS if f not in mapping]
+    if missing:
+        raise ImportFormatError(f"CSV is missing required column(s): {', '.join(missing)}")
+    return mapping
+
+
+def _parse_date(raw: str) -> str:
+    value = (raw or "").strip()
+    if not value:
+        return datetime.now().date().isoformat()
+    try:
+        return datetime.fromisoformat(value.replace("Z", "")).date().isoformat()
+    except ValueError:
+        pass
+    # "05-01-2024 09:15:02" style timestamps: the date part alone, then the whole value ("05 Jan 2024").
+    for candidate in (value.split()[0], value):
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date().isoformat()
+            except ValueError:
+                continue
+    raise ValueError(f"Unrecognised date: {raw!r}")
+
+
+def _parse_number(raw: str) -> float:
+    return float(str(raw).replace(",", "").strip())
+
+
+def to_payload(row: Dict[str, Any], mapping: Dict[str, str]) -> Dict[str, Any]:
+    """One CSV row -> the dict PortfolioService.add_transaction expects."""
+    get = lambda field: (row.get(mapping[field]) or "").strip() if field in mapping else ""
+
+    tx_type = _TYPE_ALIASES.get(get("transaction_type").lower())
+    if tx_type is None:
+        raise ValueError(f"Unknown transaction type: {get('transaction_type')!r}")
+    symbol = get("symbol").upper()
+    if not symbol:
+        raise ValueError("Missing symbol")
+
+    segment = get("asset_segment").lower()
+    payload = {
+        "symbol": symbol,
+        "transaction_type": tx_type,
+        "quantity": _parse_number(get("quantity")),
+        "price": _parse_number(get("price")),
+        "asset_segment": _SEGMENT_ALIASES.get(segment, segment or "equity"),
+        "transaction_date": _parse_date(get("transaction_date")),
+        "brokerage": _parse_number(get("brokerage")) if get("brokerage") else 0.0,
+    }
+    notes = get("notes")
+    trade_id = get("trade_id")
+    if trade_id:
+        notes = f"{notes} trade_id={trade_id}".strip()
+    payload["notes"] = notes
+    return payload
+
+
+def dedupe_key(tx: Dict[str, Any]) -> Tuple:
+    """Identity of a trade: economics plus the broker trade id when one was imported."""
+    match = _TRADE_ID_NOTE.search(str(tx.get("notes") or ""))
+    return (
+        str(tx["symbol"]).upper(),
+        str(tx["transaction_type"]).lower(),
+        round(float(tx["quantity"]), 6),
+        round(float(tx["price"]), 4),
+        str(tx.get("transaction_date") or "")[:10],
+        match.group(1) if match else "",
+    )
+
+
+def is_duplicate(key: Tuple, occurrence: int, existing: Counter) -> bool:
+    """
+    A broker trade id is unique, so any repeat of one is a duplicate. Without
+    one, identical fills are legitimate: the keys are counted as a multiset and
+    only the occurrences beyond those already stored are new.
+    """
+    if key[-1]:
+        return existing[key] > 0 or occurrence > 1
+    return occurrence <= existing[key]
+
+
+def iter_csv_rows(stream) -> Tuple[Dict[str, str], Iterator[Tuple[int, Dict[str, str]]]]:
+    """
+    Wraps a binary upload stream in a streaming DictReader. Returns the header
+    mapping and an iterator of (line_number, row).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise ImportFormatError("CSV file is empty")
+    mapping = _map_headers(reader.fieldnames)
+
+    def rows():
+        for row in reader:
+            if not any((v or "").strip() for v in row.values() if isinstance(v, str)):
+                continue
+            yield reader.line_num, row
+
+    return mapping, rows()
+
+
+def import_transactions(stream, portfolio_service, store, portfolio_id: str, user_id: str,
+                        batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False) -> Dict[str, Any]:
+    mapping, rows = iter_csv_rows(stream)
+    existing = Counter(dedupe_key(tx) for tx in store.list_transactions(portfolio_id))
+    in_file: Counter = Counter()
+
+    duplicates, error_count, total = 0, 0, 0
+    truncated = False
+    errors: List[Dict[str, Any]] = []
+    accepted: List[Dict[str, Any]] = []
+
+    for line, row in rows:
+        if total >= IMPORT_MAX_ROWS:
+            truncated = True
+            break
+        total += 1
+        try:
+            tx = portfolio_service.add_transaction(portfolio_id, user_id, to_payload(row, mapping))
+        except (ValueError, TypeError) as e:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": str(e)})
+            continue
+
+        key = dedupe_key(tx)
+        in_file[key] += 1
+        if is_duplicate(key, in_file[key], existing):
+            duplicates += 1
+            continue
+        accepted.append(tx)
+
+    # One store call: it chunks the multi-row inserts and refreshes each touched holding once.
+    if accepted and not dry_run:
+        store.insert_transactions_batch(portfolio_id, user_id, accepted, chunk_size=batch_size)
+    imported = len(accepted)
+
+    logger.info(
+        f"Transaction import for {portfolio_id}: {imported} imported, {duplicates} duplicates, "
+        f"{error_count} invalid of {total} rows{' (dry run)' if dry_run else ''}"
+    )
+    return {
+        "rows": total,
+        "imported": imported,
+        "duplicates": duplicates,
+        "invalid": error_count,
+        "errors": errors,
+        "truncated": truncated,
+        "dry_run": dry_run,
+    }
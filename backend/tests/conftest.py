@@ -7,6 +7,8 @@ os.environ["FLASK_ENV"] = "testing"
 os.environ["SUPABASE_URL"] = "http://localhost:8000"
 os.environ["SUPABASE_KEY"] = "mock_key_for_testing"
 os.environ["GEMINI_API_KEY"] = "mock_gemini_key"
+# Per-process buckets, so limits never leak between test runs via data/rate_limit.sqlite3
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
 
 @pytest.fixture
 def test_app():
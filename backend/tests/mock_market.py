@@ -0,0 +1,27 @@
+import pandas as pd
+
+from services.market_providers import MarketDataProvider
+
+
+class OfflineProvider(MarketDataProvider):
+    """
+    Market-data provider for tests: every call answers like an empty yfinance
+    response. Fakes subclass it and override only the calls they exercise.
+    """
+
+    name = "offline"
+
+    def _download(self, tickers, **kwargs):
+        return pd.DataFrame()
+
+    def _history(self, symbol, **kwargs):
+        return pd.DataFrame()
+
+    def _info(self, symbol):
+        return {}
+
+    def _news(self, symbol):
+        return []
+
+    def _fast_quote(self, symbol):
+        raise AttributeError("fast_info unavailable")
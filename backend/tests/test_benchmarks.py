@@ -0,0 +1,25 @@
+from benchmarks import run, synthetic
+
+
+def test_synthetic_log_never_goes_short():
+    symbols = synthetic.make_symbols(8)
+    prices = synthetic.make_price_frame(symbols, 120)
+    held = {}
+    for tx in synthetic.make_transactions(symbols, 300, 120, prices):
+        held[tx["symbol"]] = held.get(tx["symbol"], 0) + (tx["quantity"] if tx["transaction_type"] == "buy" else -tx["quantity"])
+        assert held[tx["symbol"]] >= 0
+
+
+def test_tiny_scenario_and_compare():
+    result = run.run_scenario(*run.SCENARIOS["tiny"], repeat=1, seed=3)
+    assert set(result["results"]) >= {"get_holdings", "get_performance_history", "calculate_xirr_batch"}
+
+    current = {"scenarios": {"tiny": result}}
+    slower = {"scenarios": {"tiny": {"results": {
+        name: {**res, "median_ms": res["median_ms"] * 10 + 10} for name, res in result["results"].items()
+    }}}}
+    faster = {"scenarios": {"tiny": {"results": {
+        name: {**res, "median_ms": max(res["median_ms"] / 10, 1e-6)} for name, res in result["results"].items()
+    }}}}
+    assert run.compare(current, slower, tolerance=0.25) is True
+    assert run.compare(current, faster, tolerance=0.25, min_delta_ms=0.0) is False
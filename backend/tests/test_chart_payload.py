@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.chart_payload import columns_to_rows, ohlcv_columns, rows_to_columns
+
+
+def _frame():
+    idx = pd.date_range("2024-03-01", periods=3, freq="D")
+    return pd.DataFrame({
+        "Open": [10.004, 11.0, 12.0],
+        "High": [10.5, 11.5, 12.5],
+        "Low": [9.5, 10.5, 11.5],
+        "Close": [10.126, 11.2, 12.3],
+        "Volume": [100.0, np.nan, 300.0],
+    }, index=idx)
+
+
+def test_ohlcv_columns_rounds_and_fills_volume():
+    cols = ohlcv_columns(_frame(), "%Y-%m-%d")
+    assert cols["dates"] == ["2024-03-01", "2024-03-02", "2024-03-03"]
+    assert cols["open"][0] == 10.0
+    assert cols["close"][0] == 10.13
+    assert cols["volume"] == [100, 0, 300]
+
+
+def test_rows_and_columns_round_trip():
+    cols = ohlcv_columns(_frame(), "%b %d, %Y", fields=("close",))
+    rows = columns_to_rows(cols, {"date": "dates", "price": "close"})
+    assert rows[0] == {"date": "Mar 01, 2024", "price": 10.13}
+    assert rows_to_columns(rows) == cols
@@ -0,0 +1,40 @@
+from db.sqlite_store import SqliteStore
+from services.portfolio_service import PortfolioService
+
+
+def _tx(symbol, tx_type, qty, price, date):
+    return {"symbol": symbol, "asset_segment": "equity", "transaction_type": tx_type,
+            "quantity": qty, "price": price, "transaction_date": date}
+
+
+def test_projection_matches_full_replay(tmp_path):
+    store = SqliteStore(str(tmp_path / "h.sqlite3"))
+    service = PortfolioService()
+    ident = store.get_or_create_default_portfolio()
+    pid, uid = ident.portfolio_id, ident.user_id
+
+    for tx in [
+        _tx("TCS", "buy", 10, 3000.5, "2024-01-02"),
+        _tx("INFY", "buy", 5, 1500, "2024-01-03"),
+        _tx("TCS", "sell", 4, 3200, "2024-02-01"),
+        _tx("TCS", "buy", 3, 3100.25, "2024-03-01"),
+        # Back-dated trade: forces a recompute of the TCS position.
+        _tx("TCS", "buy", 2, 2900, "2024-01-15"),
+        _tx("WIPRO", "buy", 7, 450, "2024-01-05"),
+    ]:
+        store.insert_transaction(pid, uid, tx)
+
+    replayed = service.get_holdings(pid, store.list_transactions(pid))
+    assert store.list_holdings(pid) == replayed
+
+    store.delete_transactions_by_symbol(pid, "WIPRO")
+    assert [h["ticker"] for h in store.list_holdings(pid)] == [
+        h["ticker"] for h in service.get_holdings(pid, store.list_transactions(pid))
+    ]
+
+    with store._connect() as conn:
+        conn.execute("DELETE FROM holdings")
+        conn.commit()
+    assert store.list_holdings(pid) == []
+    store.rebuild_holdings()
+    assert store.list_holdings(pid) == service.get_holdings(pid, store.list_transactions(pid))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from mock_market import OfflineProvider
+from services.market_data import MarketDataService
+
+
+class _IndexProvider(OfflineProvider):
+    name = "fake"
+
+    def __init__(self, broken):
+        self.broken = broken
+        self.downloads = 0
+        self.fast_quotes = []
+
+    def _download(self, tickers, **kwargs):
+        self.downloads += 1
+        idx = pd.date_range("2024-01-01", periods=3, freq="D")
+        frames = {}
+        for i, t in enumerate(tickers):
+            close = [np.nan] * 3 if t == self.broken else [100.0 + i, np.nan, 110.0 + i]
+            frames[t] = pd.DataFrame({"Open": close, "Close": close}, index=idx)
+        return pd.concat(frames, axis=1)
+
+    def _fast_quote(self, symbol):
+        self.fast_quotes.append(symbol)
+        return 50.0, 40.0
+
+
+def test_indices_come_from_one_download_with_per_index_fallback():
+    service = MarketDataService()
+    service.provider = _IndexProvider(broken="^NSEBANK")
+
+    rows = service.get_indices()
+
+    assert service.provider.downloads == 1
+    assert service.provider.fast_quotes == ["^NSEBANK"]
+    assert [r["name"] for r in rows] == list(service.indices_tickers)
+
+    nifty = rows[0]
+    # The NaN bar in the middle is skipped: previous close is the last valid one.
+    assert (nifty["price"], nifty["change"], nifty["percentChange"]) == (110.0, 10.0, 10.0)
+    bank = next(r for r in rows if r["symbol"] == "^NSEBANK")
+    assert (bank["price"], bank["change"], bank["percentChange"]) == (50.0, 10.0, 25.0)
+    assert not any(r.get("error") for r in rows)
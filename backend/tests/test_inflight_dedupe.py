@@ -0,0 +1,84 @@
+from reports import orchestrator as orch_module
+from reports.dependencies import MOCK_REPORTS_DB, MockDbClient, report_di
+from reports.orchestrator import ReportGenerationOrchestrator
+
+
+class _FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_json(self, prompt, market_context=None, on_section=None):
+        self.calls += 1
+        return {"summary": "ok"}
+
+
+def _patch_pipeline(monkeypatch, llm, db=None):
+    submitted = []
+    monkeypatch.setattr(ReportGenerationOrchestrator, "_inflight", {})
+    monkeypatch.setattr(report_di, "_db_client", db or MockDbClient())
+    monkeypatch.setattr(report_di, "get_llm_manager", lambda: llm)
+    monkeypatch.setattr(orch_module.cache_engine, "get_cached_report", lambda symbol, prefs: None)
+    monkeypatch.setattr(orch_module.cache_engine, "store_report", lambda symbol, prefs, data: None)
+    monkeypatch.setattr(
+        orch_module.financial_ingestion_engine, "fetch_market_context", lambda symbol: {"current_price": 100.0}
+    )
+    monkeypatch.setattr(
+        orch_module.worker_pool, "submit_job",
+        lambda job_id, target_func, args, kwargs, priority=10: submitted.append((target_func, kwargs)),
+    )
+    return submitted
+
+
+def test_identical_requests_share_one_pipeline(monkeypatch):
+    llm = _FakeLLM()
+    submitted = _patch_pipeline(monkeypatch, llm)
+
+    prefs = {"technical": True}
+    leader = ReportGenerationOrchestrator.initiate_report("RELIANCE", "u1", prefs)
+    followers = [ReportGenerationOrchestrator.initiate_report("RELIANCE", f"u{i}", prefs) for i in range(2, 5)]
+    other = ReportGenerationOrchestrator.initiate_report("TCS", "u1", prefs)
+
+    assert len(submitted) == 2
+    assert len({leader, other, *followers}) == 5
+
+    target_func, kwargs = submitted[0]
+    target_func(**kwargs)
+
+    assert llm.calls == 1
+    for job_id in [leader, *followers]:
+        assert MOCK_REPORTS_DB[job_id]["status"] == "completed"
+        assert MOCK_REPORTS_DB[job_id]["report_data"]["summary"] == "ok"
+    assert MOCK_REPORTS_DB[other]["status"] == "pending"
+
+    # Once the leader finished, a new identical request starts a fresh pipeline.
+    ReportGenerationOrchestrator.initiate_report("RELIANCE", "u9", prefs)
+    assert len(submitted) == 3
+
+
+class _LockProbeDb(MockDbClient):
+    """Records whether the class-wide in-flight lock is held during each insert."""
+
+    def __init__(self):
+        self.lock_held = []
+
+    def table(self, table_name):
+        table = super().table(table_name)
+        insert = table.insert
+
+        def probe(payload):
+            self.lock_held.append(ReportGenerationOrchestrator._inflight_lock.locked())
+            return insert(payload)
+
+        table.insert = probe
+        return table
+
+
+def test_follower_insert_does_not_hold_the_global_lock(monkeypatch):
+    db = _LockProbeDb()
+    _patch_pipeline(monkeypatch, _FakeLLM(), db)
+
+    prefs = {"technical": True}
+    ReportGenerationOrchestrator.initiate_report("RELIANCE", "u1", prefs)
+    ReportGenerationOrchestrator.initiate_report("RELIANCE", "u2", prefs)
+
+    assert db.lock_held == [False, False]
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from db.sqlite_store import SqliteStore
+from routes import portfolio_routes
+
+
+def test_missing_profiles_fetched_concurrently_and_bulk_written(tmp_path, monkeypatch):
+    store = SqliteStore(str(tmp_path / "e.sqlite3"))
+    store.set_cached_instrument("CACHED", {"name": "Cached Co", "beta": 0.8})
+    store.set_cached_instrument("NOBETA", {"name": "Old Row"})
+    monkeypatch.setattr(portfolio_routes, "store", store)
+
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_profile(symbol):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"symbol": symbol, "name": f"{symbol} Ltd", "beta": 1.1}
+
+    monkeypatch.setattr(portfolio_routes.portfolio_service.market_data, "get_instrument_profile", fake_profile)
+    writes = []
+    bulk = store.set_cached_instruments_batch
+
+    def record_batch(payloads):
+        writes.append(dict(payloads))
+        bulk(payloads)
+
+    monkeypatch.setattr(store, "set_cached_instruments_batch", record_batch)
+
+    symbols = ["CACHED", "NOBETA"] + [f"NEW{i}" for i in range(6)]
+    metas = portfolio_routes._enrich_instruments(symbols + ["CACHED"])
+
+    assert set(metas) == set(symbols)
+    assert metas["CACHED"]["name"] == "Cached Co"
+    assert metas["NOBETA"]["name"] == "NOBETA Ltd"
+    assert peak[0] > 1
+    # One bulk write carrying exactly the fetched profiles.
+    assert len(writes) == 1
+    assert writes[0] == {s: {"symbol": s, "name": f"{s} Ltd", "beta": 1.1} for s in symbols if s != "CACHED"}
+    assert store.get_cached_instrument("NEW3")["beta"] == 1.1
+
+    row = portfolio_routes._holding_row({"ticker": "NEW3", "qty": 2.0, "avg_price": 10.0}, metas["NEW3"])
+    assert row["name"] == "NEW3 Ltd" and row["avgPrice"] == 10.0 and row["sector"] == "Unknown"
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.provider_manager import AIProviderManager
+
+
+def _manager(hedge_delay=0.05):
+    llm = AIProviderManager()
+    llm.providers_ready = {"gemini": True, "groq": True, "xai": False}
+    llm.hedge_delay_sec = hedge_delay
+    return llm
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    llm = _manager()
+    gemini_cancelled = threading.Event()
+
+    def slow_gemini(prompt, cancel=None):
+        cancel.wait(2)
+        if cancel.is_set():
+            gemini_cancelled.set()
+        return None
+
+    llm._try_gemini = slow_gemini
+    llm._try_groq = lambda prompt, cancel=None: {"source": "groq"}
+
+    started = time.time()
+    assert llm._generate_hedged("prompt") == {"source": "groq"}
+    assert time.time() - started < 1
+    assert gemini_cancelled.wait(1)
+
+
+def test_fast_primary_never_starts_secondary():
+    llm = _manager(hedge_delay=1)
+    groq_calls = []
+    llm._try_gemini = lambda prompt, cancel=None: {"source": "gemini"}
+    llm._try_groq = lambda prompt, cancel=None: groq_calls.append(prompt)
+
+    assert llm._generate_hedged("prompt") == {"source": "gemini"}
+    assert groq_calls == []
+
+
+def test_hedge_delay_tracks_latency_percentile():
+    llm = _manager(hedge_delay=8)
+    llm.hedge_percentile = 95
+    assert llm._hedge_delay() == 8
+    for seconds in range(1, 21):
+        llm._record_gemini_latency(float(seconds))
+    assert llm._hedge_delay() == 19.0
+
+
+def test_cancelled_rate_limited_gemini_still_cools_down():
+    llm = _manager()
+    cancel = threading.Event()
+    cancel.set()
+
+    class _RateLimited:
+        def generate_content(self, *args, **kwargs):
+            raise RuntimeError("429 quota exceeded")
+
+    llm.gemini_model = _RateLimited()
+    assert llm._try_gemini("prompt", cancel) is None
+    assert not llm._gemini_available_now()
+
+
+def test_hedge_delay_counts_from_primary_start_not_queue_time():
+    llm = _manager(hedge_delay=0.3)
+    llm._hedge_executor = ThreadPoolExecutor(max_workers=1)
+    blocker = threading.Event()
+    llm._hedge_executor.submit(blocker.wait, 2)  # a loser from an earlier hedge
+    groq_calls = []
+    llm._try_gemini = lambda prompt, cancel=None: {"source": "gemini"}
+    llm._try_groq = lambda prompt, cancel=None: groq_calls.append(prompt) or {"source": "groq"}
+
+    # Gemini never gets a slot within the delay: the fallback runs inline instead of queueing.
+    assert llm._generate_hedged("prompt") == {"source": "groq"}
+    blocker.set()
+
+    # Once the pool is free, a Gemini that starts late is not hedged on its queue time.
+    groq_calls.clear()
+    blocker2 = threading.Event()
+    llm._hedge_executor.submit(blocker2.wait, 2)
+    threading.Timer(0.2, blocker2.set).start()
+    llm._try_gemini = lambda prompt, cancel=None: time.sleep(0.2) or {"source": "gemini"}
+    assert llm._generate_hedged("prompt") == {"source": "gemini"}
+    assert groq_calls == []
@@ -0,0 +1,87 @@
+import json
+
+from services.provider_manager import AIProviderManager
+from utils.json_stream import TopLevelJsonStream
+
+REPORT = {
+    "header": {"company": "Tata {Consultancy}", "note": "quote \" and brace ] inside"},
+    "snapshot": {"description": "IT services", "keyMetrics": [{"label": "x", "value": "y"}]},
+    "technicalSignals": [{"name": "RSI", "description": "ok, fine"}],
+    "outlook": {"shortTerm": "up", "longTerm": "\\u2191 up"},
+}
+
+
+def _chunks(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_sections_are_emitted_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(REPORT, indent=2) + "\n```"
+    parser = TopLevelJsonStream()
+    emitted, fed = [], 0
+    for chunk in _chunks(text):
+        fed += len(chunk)
+        for key, value in parser.feed(chunk):
+            emitted.append((key, value, fed))
+
+    assert [(k, v) for k, v, _ in emitted] == list(REPORT.items())
+    assert parser.complete
+    # The header is available long before the rest of the document has been fed.
+    assert emitted[0][2] < text.index('"snapshot"') + 5
+
+
+def test_undecodable_member_is_skipped():
+    parser = TopLevelJsonStream()
+    assert parser.feed('{"a": 1, "b": nope, "c": [2]}') == [("a", 1), ("c", [2])]
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamingModel:
+    def __init__(self, text, fail=False):
+        self.text, self.fail = text, fail
+        self.calls = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail:
+            raise RuntimeError("stream reset")
+        return (_Chunk(c) for c in _chunks(self.text, 7))
+
+
+def _manager(model):
+    llm = AIProviderManager()
+    llm.providers_ready = {"gemini": True, "groq": False, "xai": False}
+    llm.gemini_only = True
+    llm.gemini_model = model
+    return llm
+
+
+def test_generate_json_streams_verified_sections():
+    model = _StreamingModel(json.dumps(REPORT))
+    llm = _manager(model)
+    context = {"symbol": "TCS.NS", "fundamentals": {"pe_ratio": 25}, "company_meta": {"currency": "INR"}}
+    sections = []
+
+    report = llm.generate_json("prompt", market_context=context, on_section=lambda k, v: sections.append((k, v)))
+
+    assert model.calls[0]["stream"] is True
+    assert [k for k, _ in sections] == list(REPORT)
+    # Previews already carry the verified figures, but no schema defaults or audit.
+    assert dict(sections)["header"]["symbol"] == "TCS.NS"
+    assert dict(sections)["snapshot"]["keyMetrics"][1] == {"label": "P/E Ratio", "value": "25.0x"}
+    assert report["outlook"] == REPORT["outlook"] and "verificationAudit" not in report
+    assert report["snapshot"]["keyMetrics"][1] == {"label": "P/E Ratio", "value": "25.0x"}
+
+
+def test_failed_stream_falls_back_to_blocking_call():
+    llm = _manager(_StreamingModel("", fail=True))
+    llm._try_gemini = lambda prompt, cancel=None: {"header": {"company": "blocking"}}
+    sections = []
+
+    report = llm.generate_json("prompt", on_section=lambda k, v: sections.append(k))
+
+    assert sections == [] and report["header"]["company"] == "blocking"
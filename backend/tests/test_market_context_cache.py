@@ -0,0 +1,60 @@
+import pandas as pd
+
+from reports.ingestion import financial_adapter
+from reports.ingestion.financial_adapter import FinancialDataAdapter, MarketContextCache
+
+
+class _FakeProvider:
+    name = "fake"
+    calls = []
+
+    def info(self, symbol):
+        self.calls.append("info")
+        return {"currentPrice": 100.0, "previousClose": 98.0, "longName": "Fake Co"}
+
+    def news(self, symbol):
+        self.calls.append("news")
+        return []
+
+    def history(self, symbol, period, interval, auto_adjust=True):
+        self.calls.append(interval)
+        idx = pd.date_range("2024-01-01", periods=10, freq="D" if interval == "1d" else "5min")
+        close = [101.0 + i for i in range(10)]
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000}, index=idx)
+
+
+def test_only_stale_components_are_refetched(monkeypatch):
+    cache = MarketContextCache(ttls={"info": 3600, "history": 3600, "intraday": 0, "news": 3600})
+    monkeypatch.setattr(financial_adapter, "market_context_cache", cache)
+    _FakeProvider.calls = []
+    adapter = FinancialDataAdapter(provider=_FakeProvider())
+
+    first = adapter.fetch_market_context("AAPL")
+    assert sorted(_FakeProvider.calls) == ["1d", "5m", "info", "news"]
+    assert first["current_price"] == 100.0
+
+    _FakeProvider.calls = []
+    second = adapter.fetch_market_context("AAPL")
+    assert _FakeProvider.calls == ["5m"]
+    # With cached fundamentals the live price comes from the refreshed intraday bars.
+    assert second["current_price"] == 110.0
+    assert second["chart_data"] == first["chart_data"]
+
+
+def test_failed_news_fetch_is_not_cached(monkeypatch):
+    cache = MarketContextCache(ttls={"info": 3600, "history": 3600, "intraday": 3600, "news": 3600})
+    monkeypatch.setattr(financial_adapter, "market_context_cache", cache)
+
+    class _FlakyNews(_FakeProvider):
+        def news(self, symbol):
+            self.calls.append("news")
+            raise TypeError("yfinance internal error")
+
+    _FakeProvider.calls = []
+    first = FinancialDataAdapter(provider=_FlakyNews()).fetch_market_context("AAPL")
+    assert first["news"] == []
+
+    # The failure was not remembered as "no news": the next request retries it.
+    _FakeProvider.calls = []
+    FinancialDataAdapter(provider=_FakeProvider()).fetch_market_context("AAPL")
+    assert _FakeProvider.calls == ["news"]
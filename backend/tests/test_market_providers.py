@@ -0,0 +1,94 @@
+import time
+
+import pandas as pd
+import pytest
+
+from mock_market import OfflineProvider
+from services.market_data import MarketDataService
+from services.market_providers import (
+    RecordingProvider,
+    ReplayProvider,
+    build_market_provider,
+)
+
+
+class _FakeLive(OfflineProvider):
+    name = "fake"
+
+    def _download(self, tickers, **kwargs):
+        idx = pd.date_range("2024-01-01", periods=3, freq="D")
+        return pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=idx)
+
+    def _info(self, symbol):
+        return {"longName": f"{symbol} Ltd", "sector": "Energy", "marketCap": 5e12}
+
+    def _news(self, symbol):
+        return [{"title": "headline"}]
+
+
+def test_record_then_replay_offline(tmp_path):
+    recorder = RecordingProvider(_FakeLive(), str(tmp_path))
+    recorded = recorder.download(["TCS.NS", "INFY.NS"], period="7d", interval="1d")
+    recorder.info("TCS.NS")
+    with pytest.raises(AttributeError):
+        recorder.fast_quote("TCS.NS")
+
+    replay = ReplayProvider(str(tmp_path))
+    pd.testing.assert_frame_equal(replay.download(["INFY.NS", "TCS.NS"], period="7d", interval="1d"), recorded)
+    # Only presentational flags differ: served from the loose fixture.
+    pd.testing.assert_frame_equal(
+        replay.download(["TCS.NS", "INFY.NS"], period="7d", interval="1d", progress=False), recorded
+    )
+    # A different window is a different response, never the recorded 7d one.
+    assert replay.download(["TCS.NS", "INFY.NS"], period="1y", interval="1d").empty
+    assert replay.download(["TCS.NS", "INFY.NS"], start="2024-01-02", interval="1d").empty
+    # Same window, but a different column layout or price adjustment.
+    assert replay.download(["TCS.NS", "INFY.NS"], period="7d", interval="1d", group_by="ticker").empty
+    assert replay.download(["TCS.NS", "INFY.NS"], period="7d", interval="1d", auto_adjust=False).empty
+    assert replay.info("TCS.NS")["longName"] == "TCS.NS Ltd"
+
+    # Unrecorded calls look like empty yfinance responses.
+    assert replay.download("WIPRO.NS", period="7d", interval="1d").empty
+    assert replay.news("WIPRO.NS") == []
+    with pytest.raises(LookupError):
+        replay.fast_quote("TCS.NS")
+
+
+def test_replay_latency_and_error_injection(tmp_path):
+    slow = ReplayProvider(str(tmp_path), latency_ms=30)
+    started = time.perf_counter()
+    slow.info("X")
+    assert time.perf_counter() - started >= 0.03
+
+    flaky = ReplayProvider(str(tmp_path), error_rate=0.5, seed=42)
+    outcomes = []
+    for _ in range(40):
+        try:
+            flaky.news("X")
+            outcomes.append(True)
+        except ConnectionError:
+            outcomes.append(False)
+    assert 5 < outcomes.count(False) < 35
+    again = ReplayProvider(str(tmp_path), error_rate=0.5, seed=42)
+    replayed = []
+    for _ in range(40):
+        try:
+            again.news("X")
+            replayed.append(True)
+        except ConnectionError:
+            replayed.append(False)
+    assert replayed == outcomes
+
+
+def test_market_data_service_runs_on_replay(tmp_path, monkeypatch):
+    RecordingProvider(_FakeLive(), str(tmp_path)).info("RELIANCE.NS")
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "replay")
+    monkeypatch.setenv("MARKET_REPLAY_DIR", str(tmp_path))
+    service = MarketDataService()
+    service.provider = build_market_provider()
+    assert service.provider.name == "replay"
+
+    profile = service.get_instrument_profile("RELIANCE")
+    assert profile["name"] == "RELIANCE.NS Ltd"
+    # No fixture: fast_info and history both miss, so the quote degrades gracefully.
+    assert service.get_quote("TCS")["price"] == 0.0
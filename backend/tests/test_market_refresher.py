@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from db.market_snapshot_store import MarketSnapshotStore
+from routes import market_routes
+from services import market_refresher
+from services.market_refresher import IST, MarketDataRefresher, is_market_open, refresh_interval
+
+
+class _FakeService:
+    def __init__(self):
+        self.calls = []
+        self.fail_movers = False
+
+    def get_indices(self):
+        self.calls.append("indices")
+        return [{"name": "NIFTY 50", "symbol": "^NSEI", "price": 100, "change": 1, "percentChange": 1.0}]
+
+    def get_market_mood(self):
+        self.calls.append("mood")
+        return {"composite_score": 60.0, "zone": "Greed", "metrics": {"rsi": {"value": 60}}}
+
+    def get_news(self):
+        self.calls.append("news")
+        return [{"title": "t", "timestamp": 1}]
+
+    def get_top_movers(self, category):
+        self.calls.append(category)
+        if self.fail_movers:
+            return {"gainers": [], "losers": [], "fiftyTwoWeekHigh": [], "fiftyTwoWeekLow": []}
+        return {"gainers": [{"symbol": category}], "losers": [], "fiftyTwoWeekHigh": [], "fiftyTwoWeekLow": []}
+
+
+def test_market_hours_are_ist_weekdays():
+    assert is_market_open(datetime(2024, 6, 3, 10, 0, tzinfo=IST))      # Monday
+    assert not is_market_open(datetime(2024, 6, 3, 15, 45, tzinfo=IST))
+    assert not is_market_open(datetime(2024, 6, 8, 11, 0, tzinfo=IST))  # Saturday
+    assert refresh_interval("indices", datetime(2024, 6, 3, 10, 0, tzinfo=IST)) == 60
+    assert refresh_interval("indices", datetime(2024, 6, 8, 11, 0, tzinfo=IST)) >= 60
+
+
+def test_refresh_due_skips_fresh_and_keeps_good_snapshots(tmp_path):
+    service = _FakeService()
+    store = MarketSnapshotStore(str(tmp_path / "snap.sqlite3"))
+    refresher = MarketDataRefresher(service, store=store, lock_path=str(tmp_path / "r.lock"))
+
+    assert len(refresher.refresh_due()) == 6
+    assert store.get("movers:mid_cap")[0]["gainers"] == [{"symbol": "mid_cap"}]
+
+    service.calls = []
+    assert refresher.refresh_due() == []
+    assert service.calls == []
+
+    # A failed upstream fetch must not overwrite the last good snapshot.
+    service.fail_movers = True
+    assert not refresher.refresh("movers:large_cap", lambda: service.get_top_movers("large_cap"))
+    assert store.get("movers:large_cap")[0]["gainers"] == [{"symbol": "large_cap"}]
+
+
+def test_on_demand_compute_never_publishes_a_failed_payload(tmp_path, monkeypatch):
+    service = _FakeService()
+    service.fail_movers = True
+    store = MarketSnapshotStore(str(tmp_path / "snap.sqlite3"))
+    monkeypatch.setattr(market_routes, "_snapshot_store", store)
+    monkeypatch.setattr(market_routes, "market_data_service", service)
+    app = Flask(__name__)
+    app.register_blueprint(market_routes.market_bp)
+    client = app.test_client()
+
+    # Cold start during an outage: the fallback is served but not stored as fresh.
+    assert client.get("/api/market/movers").get_json()["gainers"] == []
+    assert store.get("movers:large_cap") is None
+
+    service.fail_movers = False
+    assert client.get("/api/market/movers").get_json()["gainers"] == [{"symbol": "large_cap"}]
+    assert store.get("movers:large_cap")[0]["gainers"] == [{"symbol": "large_cap"}]
+
+
+@pytest.mark.skipif(market_refresher.fcntl is None, reason="flock unavailable")
+def test_only_one_process_is_leader(tmp_path):
+    store = MarketSnapshotStore(str(tmp_path / "snap.sqlite3"))
+    lock = str(tmp_path / "r.lock")
+    first = MarketDataRefresher(_FakeService(), store=store, lock_path=lock)
+    second = MarketDataRefresher(_FakeService(), store=store, lock_path=lock)
+
+    assert first.try_acquire_leadership()
+    assert not second.try_acquire_leadership()
+    first.release_leadership()
+    assert second.try_acquire_leadership()
+    second.release_leadership()
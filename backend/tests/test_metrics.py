@@ -0,0 +1,44 @@
+import pytest
+from flask import Flask
+
+from utils import metrics
+
+
+def _sample(name, labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_latency_and_scrape_endpoint():
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route("/api/things/<thing_id>")
+    def thing(thing_id):
+        return {"id": thing_id}
+
+    labels = {"method": "GET", "route": "/api/things/<thing_id>", "status": "200"}
+    before = _sample("investiq_http_request_seconds_count", labels)
+    client = app.test_client()
+    client.get("/api/things/1")
+    client.get("/api/things/2")
+    assert _sample("investiq_http_request_seconds_count", labels) == before + 2
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.content_type.startswith("text/plain")
+    assert b'investiq_http_request_seconds_bucket{le="0.005",method="GET",route="/api/things/<thing_id>"' in res.data
+
+
+def test_timed_labels_failures_and_cache_counter():
+    labels = {"call": "news", "outcome": "error"}
+    before = _sample("investiq_yfinance_call_seconds_count", labels)
+    with pytest.raises(RuntimeError):
+        with metrics.timed(metrics.YFINANCE_CALL_SECONDS, call="news"):
+            raise RuntimeError("upstream down")
+    assert _sample("investiq_yfinance_call_seconds_count", labels) == before + 1
+
+    hits = _sample("investiq_cache_requests_total", {"cache": "unit", "result": "hit"})
+    metrics.count_cache("unit", True)
+    metrics.count_cache("unit", False)
+    assert _sample("investiq_cache_requests_total", {"cache": "unit", "result": "hit"}) == hits + 1
+    assert _sample("investiq_cache_requests_total", {"cache": "unit", "result": "miss"}) >= 1
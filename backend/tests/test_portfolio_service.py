@@ -7,6 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.portfolio_service import PortfolioService
 from decimal import Decimal
+import pandas as pd
 
 class TestPortfolioService(unittest.TestCase):
     def setUp(self):
@@ -62,5 +63,33 @@ class TestPortfolioService(unittest.TestCase):
         # Avg price should remain 2250 (WAC principle)
         self.assertEqual(rel["avg_price"], 2250.0)
 
+    def test_performance_history_uses_trade_dates(self):
+        dates = pd.bdate_range("2024-01-01", periods=5)
+        columns = pd.MultiIndex.from_product([["RELIANCE.NS", "TCS.NS"], ["Close"]])
+        frame = pd.DataFrame(
+            [[100.0, 10.0], [101.0, None], [102.0, 12.0], [103.0, 13.0], [104.0, 14.0]],
+            index=dates,
+            columns=columns,
+        )
+
+        class StubMarketData:
+            def get_history(self, symbols, period="1y"):
+                return frame
+
+            def normalize_symbol(self, symbol):
+                return f"{symbol}.NS"
+
+        self.service.market_data = StubMarketData()
+        txs = [
+            {"symbol": "RELIANCE", "quantity": 2, "transaction_type": "buy", "transaction_date": "2024-01-02"},
+            {"symbol": "TCS", "quantity": 10, "transaction_type": "buy", "transaction_date": "2024-01-01T09:30:00"},
+            {"symbol": "RELIANCE", "quantity": 1, "transaction_type": "sell", "transaction_date": "2024-01-04"},
+        ]
+        history = self.service.get_performance_history("port-123", txs, days=5)
+
+        self.assertEqual([h["date"] for h in history], [d.strftime("%Y-%m-%d") for d in dates])
+        # Day 2 carries TCS forward at its last close (10) since the bar is missing.
+        self.assertEqual([h["value"] for h in history], [100.0, 302.0, 324.0, 233.0, 244.0])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from db.price_history_store import PriceHistoryStore
+from mock_market import OfflineProvider
+from services import market_data as market_data_module
+from services.market_data import MarketDataService
+
+TODAY = datetime.now(timezone.utc).date()
+DATES = [(TODAY - timedelta(days=n)).isoformat() for n in range(9, -1, -1)]
+
+
+class _HistoryProvider(OfflineProvider):
+    name = "fake"
+
+    def __init__(self):
+        self.closes = {d: 100.0 + i for i, d in enumerate(DATES)}
+        self.calls = []
+
+    def _download(self, tickers, **kwargs):
+        self.calls.append("delta" if "start" in kwargs else "full")
+        start = str(kwargs.get("start", "0000-00-00"))
+        dates = [d for d in DATES if d >= start]
+        idx = pd.DatetimeIndex(pd.to_datetime(dates))
+        close = [self.closes[d] for d in dates]
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=idx)
+        return pd.concat({t: frame for t in tickers}, axis=1)
+
+
+def _service(tmp_path, monkeypatch):
+    store = PriceHistoryStore(str(tmp_path / "history.sqlite3"))
+    service = MarketDataService()
+    service.provider = _HistoryProvider()
+    monkeypatch.setattr(service, "_get_history_store", lambda: store)
+    # Every call after the first counts as stale and goes through the delta path.
+    monkeypatch.setattr(market_data_module, "HISTORY_REFRESH_SEC", -1)
+    return service, store
+
+
+def _closes(frame):
+    return frame["TCS.NS"]["Close"].tolist()
+
+
+def test_full_load_then_delta_append_ignores_intraday_moves(tmp_path, monkeypatch):
+    service, store = _service(tmp_path, monkeypatch)
+
+    assert _closes(service.get_history(["TCS"])) == [100.0 + i for i in range(10)]
+    assert service.provider.calls == ["full"]
+    # Today's and yesterday's bars may be live sessions: coverage stops before them.
+    assert store.get_coverage(["TCS.NS"])["TCS.NS"]["last_date"] == DATES[-3]
+
+    # A 5% intraday move on today's partial bar is a delta, not a restatement.
+    service.provider.closes[DATES[-1]] *= 1.05
+    frame = service.get_history(["TCS"])
+    assert service.provider.calls == ["full", "delta"]
+    assert _closes(frame)[-1] == pytest.approx(109.0 * 1.05)
+
+
+def test_restated_settled_bar_triggers_full_reload(tmp_path, monkeypatch):
+    service, _ = _service(tmp_path, monkeypatch)
+    service.get_history(["TCS"])
+
+    # A 1:2 split back-adjusts every old bar.
+    service.provider.closes = {d: c / 2 for d, c in service.provider.closes.items()}
+    frame = service.get_history(["TCS"])
+    assert service.provider.calls == ["full", "delta", "full"]
+    assert _closes(frame)[0] == 50.0
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from services import market_data
+from services.market_data import MarketDataService, QuoteCache
+
+
+def _fake_quote(price):
+    return {"price": price, "high": price, "low": price, "sparkline": [price], "change": 0.0, "percentChange": 0.0}
+
+
+def test_concurrent_requests_share_one_download(monkeypatch):
+    """Overlapping symbol sets requested in parallel should trigger a single upstream fetch per symbol."""
+    monkeypatch.setattr(market_data, "quote_cache", QuoteCache(ttl_seconds=60))
+    calls = []
+
+    def fake_download(self, tickers):
+        calls.append(sorted(tickers))
+        time.sleep(0.2)
+        return {t: _fake_quote(100.0) for t in tickers}
+
+    monkeypatch.setattr(MarketDataService, "_download_quotes", fake_download)
+    service = MarketDataService()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.get_batch_quotes(["RELIANCE", "TCS"])))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [["RELIANCE.NS", "TCS.NS"]]
+    assert all(r["RELIANCE"]["price"] == 100.0 for r in results)
+
+
+def test_only_stale_symbols_are_fetched(monkeypatch):
+    monkeypatch.setattr(market_data, "quote_cache", QuoteCache(ttl_seconds=60))
+    calls = []
+
+    def fake_download(self, tickers):
+        calls.append(sorted(tickers))
+        return {t: _fake_quote(50.0) for t in tickers}
+
+    monkeypatch.setattr(MarketDataService, "_download_quotes", fake_download)
+    service = MarketDataService()
+
+    service.get_batch_quotes(["INFY"])
+    service.get_batch_quotes(["INFY", "WIPRO"])
+
+    assert calls == [["INFY.NS"], ["WIPRO.NS"]]
+
+
+def test_failed_symbols_are_not_cached(monkeypatch):
+    monkeypatch.setattr(market_data, "quote_cache", QuoteCache(ttl_seconds=60))
+    calls = []
+
+    def fake_download(self, tickers):
+        calls.append(sorted(tickers))
+        return {}
+
+    monkeypatch.setattr(MarketDataService, "_download_quotes", fake_download)
+    service = MarketDataService()
+
+    first = service.get_batch_quotes(["XYZ"])
+    service.get_batch_quotes(["XYZ"])
+
+    assert first["XYZ"]["price"] == 0.0
+    assert len(calls) == 2
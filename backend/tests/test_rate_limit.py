@@ -0,0 +1,70 @@
+import threading
+
+from flask import Flask
+
+from utils.rate_limit import MemoryBucketBackend, RateLimiter, SqliteBucketBackend, rate_limit
+
+
+def test_memory_backend_limits_and_evicts_idle_keys():
+    backend = MemoryBucketBackend(max_keys=2)
+    limiter = RateLimiter(capacity=2, refill_rate_per_sec=0.001, backend=backend, scope="t")
+
+    assert limiter.consume("a") and limiter.consume("a")
+    allowed, retry_after = limiter.check("a")
+    assert not allowed and retry_after > 0
+
+    limiter.consume("b")
+    limiter.consume("c")
+    assert len(backend) == 2
+    # "a" was least recently used and got evicted, so it starts with a full bucket again.
+    assert limiter.consume("a")
+
+
+def test_sqlite_backend_is_shared_and_atomic(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first = RateLimiter(capacity=20, refill_rate_per_sec=0.001, backend=SqliteBucketBackend(path), scope="t")
+    # A second backend on the same file stands in for another gunicorn worker.
+    second = RateLimiter(capacity=20, refill_rate_per_sec=0.001, backend=SqliteBucketBackend(path), scope="t")
+
+    results = []
+    lock = threading.Lock()
+
+    def hammer(limiter):
+        for _ in range(10):
+            ok = limiter.consume("1.2.3.4")
+            with lock:
+                results.append(ok)
+
+    threads = [threading.Thread(target=hammer, args=(lim,)) for lim in (first, second, first, second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 20
+
+
+def test_backend_errors_fail_open():
+    class Broken:
+        def consume(self, *args, **kwargs):
+            raise RuntimeError("down")
+
+    assert RateLimiter(capacity=1, refill_rate_per_sec=1, backend=Broken()).consume("x")
+
+
+def test_decorator_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_TEST_ROUTE", "2/60")
+    app = Flask(__name__)
+
+    @app.route("/ping")
+    @rate_limit(capacity=100, scope="test_route")
+    def ping():
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 200
+    resp = client.get("/ping")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.get_json()["retry_after"] >= 1
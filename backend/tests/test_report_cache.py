@@ -0,0 +1,48 @@
+import os
+import time
+
+from reports.cache.backends import MemoryLRUBackend, SqliteCacheBackend
+from reports.cache.report_cache import ReportCacheManager
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = ReportCacheManager(ttl_seconds=0, tiers=[MemoryLRUBackend(), SqliteCacheBackend(str(tmp_path / "c.db"))])
+    cache.store_report("TCS", {"technical": True}, {"score": 1})
+    time.sleep(0.01)
+    assert cache.get_cached_report("TCS", {"technical": True}) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_tier_is_shared_and_promoted(tmp_path):
+    path = str(tmp_path / "c.db")
+    writer = ReportCacheManager(ttl_seconds=60, tiers=[MemoryLRUBackend(), SqliteCacheBackend(path)])
+    writer.store_report("INFY", {}, {"score": 7})
+
+    # A second worker process only shares the SQLite file.
+    memory = MemoryLRUBackend()
+    reader = ReportCacheManager(ttl_seconds=60, tiers=[memory, SqliteCacheBackend(path)])
+    assert reader.get_cached_report("INFY", {}) == {"score": 7}
+    assert reader.get_cached_report("INFY", {}) == {"score": 7}
+    assert memory.stats()["hits"] == 1
+    assert reader.stats()["hits"] == 2
+
+
+def test_memory_tier_evicts_least_recently_used():
+    memory = MemoryLRUBackend(max_entries=2)
+    expires = time.time() + 60
+    memory.set("a", {"v": 1}, expires)
+    memory.set("b", {"v": 2}, expires)
+    memory.get("a")
+    memory.set("c", {"v": 3}, expires)
+    assert memory.get("b") is None
+    assert memory.get("a") is not None
+    assert memory.stats()["evictions"] == 1
+
+
+def test_sqlite_tier_enforces_size_bound(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "c.db"), max_bytes=600)
+    expires = time.time() + 60
+    for i in range(10):
+        backend.set(f"k{i}", {"blob": os.urandom(200).hex()}, expires)
+    assert backend.stats()["evictions"] > 0
+    assert backend.get("k9") is not None
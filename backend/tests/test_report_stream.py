@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+
+from reports import api as api_module
+from reports import orchestrator as orch_module
+from reports.dependencies import MockDbClient, report_di
+from reports.events import JobEventBus
+from reports.orchestrator import ReportGenerationOrchestrator
+
+
+class _FakeLLM:
+    def __init__(self, sections=()):
+        self.sections = sections
+
+    def generate_json(self, prompt, market_context=None, on_section=None):
+        for key, value in self.sections:
+            on_section(key, value)
+        return {"summary": "ok"}
+
+
+def _events(body: str):
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+def test_bus_primes_late_subscribers_with_last_event():
+    bus = JobEventBus(max_jobs=2)
+    bus.publish("a", {"status": "processing:fetching_data"})
+    q = bus.subscribe("a")
+    assert q.get_nowait()["status"] == "processing:fetching_data"
+    bus.publish("a", {"status": "completed", "report_data": {"big": "payload"}})
+    assert q.get_nowait()["report_data"] == {"big": "payload"}
+    # Only the status fields are retained for late subscribers.
+    assert bus.last_event("a") == {"status": "completed"}
+    bus.unsubscribe("a", q)
+    bus.publish("b", {})
+    bus.publish("c", {})
+    assert bus.last_event("a") is None and bus.subscriber_count() == 0
+
+
+def _run_job(test_client, monkeypatch, llm):
+    submitted = []
+    monkeypatch.setattr(ReportGenerationOrchestrator, "_inflight", {})
+    monkeypatch.setattr(report_di, "_db_client", MockDbClient())
+    monkeypatch.setattr(report_di, "get_llm_manager", lambda: llm)
+    monkeypatch.setattr(orch_module.cache_engine, "get_cached_report", lambda symbol, prefs: None)
+    monkeypatch.setattr(orch_module.cache_engine, "store_report", lambda symbol, prefs, data: None)
+    monkeypatch.setattr(orch_module.financial_ingestion_engine, "fetch_market_context", lambda symbol: {"current_price": 1.0})
+    monkeypatch.setattr(
+        orch_module.worker_pool, "submit_job",
+        lambda job_id, target_func, args, kwargs, priority=10: submitted.append((target_func, kwargs)),
+    )
+    # Only the bus may deliver the transitions in this test.
+    monkeypatch.setattr(api_module, "STREAM_POLL_SEC", 60.0)
+
+    job_id = ReportGenerationOrchestrator.initiate_report("RELIANCE", "u1", {"technical": True})
+    target_func, kwargs = submitted[0]
+    worker = threading.Timer(0.2, lambda: target_func(**kwargs))
+    worker.start()
+
+    response = test_client.get(f"/api/v2/reports/stream/{job_id}")
+    worker.join()
+    return response
+
+
+def test_stream_pushes_each_stage_then_final_payload(test_client, monkeypatch):
+    response = _run_job(test_client, monkeypatch, _FakeLLM())
+    assert response.mimetype == "text/event-stream"
+    events = _events(response.get_data(as_text=True))
+    statuses = [data["status"] for _, data in events]
+    assert statuses == [
+        "pending", "processing:fetching_data", "processing:analyzing_context",
+        "processing:generating_report", "processing:finalizing", "completed",
+    ]
+    assert events[-1][0] == "completed"
+    assert events[-1][1]["report_data"]["summary"] == "ok"
+    assert "report_data" not in events[1][1]
+
+
+def test_stream_delivers_sections_before_completion(test_client, monkeypatch):
+    llm = _FakeLLM(sections=[("header", {"company": "Reliance"}), ("snapshot", {"description": "d"})])
+    events = _events(_run_job(test_client, monkeypatch, llm).get_data(as_text=True))
+
+    names = [name for name, _ in events]
+    assert names.index("section") > names.index("status")
+    assert [(d["section"], d["data"]) for name, d in events if name == "section"] == [
+        ("header", {"company": "Reliance"}), ("snapshot", {"description": "d"}),
+    ]
+    assert names[-1] == "completed" and events[-1][1]["report_data"]["summary"] == "ok"
+
+
+def test_sections_stay_out_of_report_data_and_row_writes_are_throttled(monkeypatch):
+    db = MockDbClient()
+    monkeypatch.setattr(report_di, "_db_client", db)
+    monkeypatch.setattr(orch_module, "PARTIAL_FLUSH_SEC", 60.0)
+    monkeypatch.setattr(ReportGenerationOrchestrator, "_inflight", {})
+    db.table("reports").insert({"id": "job", "status": "processing:generating_report"}).execute()
+    updates = []
+    monkeypatch.setattr(ReportGenerationOrchestrator, "_update_rows",
+                        staticmethod(lambda targets, fields: updates.append(dict(fields))))
+
+    class _FailingLLM(_FakeLLM):
+        def generate_json(self, prompt, market_context=None, on_section=None):
+            super().generate_json(prompt, market_context, on_section)
+            raise RuntimeError("stream died")
+
+    monkeypatch.setattr(report_di, "get_llm_manager", lambda: _FailingLLM(sections=[("header", {}), ("snapshot", {}), ("outlook", {})]))
+    monkeypatch.setattr(orch_module.financial_ingestion_engine, "fetch_market_context", lambda symbol: {})
+    try:
+        ReportGenerationOrchestrator._background_process("job", "RELIANCE", {})
+    except RuntimeError:
+        pass
+
+    # One replay write for three sections, none touching report_data; failure clears it.
+    partial_writes = [u for u in updates if "partial_report" in u and "status" not in u]
+    assert partial_writes == [{"partial_report": {"header": {}}}]
+    assert not any("report_data" in u for u in updates)
+    assert updates[-1] == {"status": "failed", "error": "stream died", "partial_report": None}
+
+
+class _NoPartialColumnDb(MockDbClient):
+    """A reports table deployed before the partial_report column existed."""
+
+    def table(self, table_name):
+        table = super().table(table_name)
+        update, select = table.update, table.select
+
+        def checked_update(payload):
+            if "partial_report" in payload:
+                raise RuntimeError("column reports.partial_report does not exist")
+            return update(payload)
+
+        def checked_select(cols):
+            if "partial_report" in cols:
+                raise RuntimeError("column reports.partial_report does not exist")
+            return select(cols)
+
+        table.update, table.select = checked_update, checked_select
+        return table
+
+
+def test_unstreamed_jobs_work_without_the_partial_report_column(test_client, monkeypatch):
+    db = _NoPartialColumnDb()
+    monkeypatch.setattr(report_di, "_db_client", db)
+    monkeypatch.setattr(ReportGenerationOrchestrator, "_inflight", {})
+    monkeypatch.setattr(report_di, "get_llm_manager", lambda: _FakeLLM())
+    monkeypatch.setattr(orch_module.cache_engine, "store_report", lambda symbol, prefs, data: None)
+    monkeypatch.setattr(orch_module.financial_ingestion_engine, "fetch_market_context", lambda symbol: {})
+    db.table("reports").insert({"id": "old-schema", "status": "pending"}).execute()
+
+    ReportGenerationOrchestrator._background_process("old-schema", "RELIANCE", {})
+
+    events = _events(test_client.get("/api/v2/reports/stream/old-schema").get_data(as_text=True))
+    assert [name for name, _ in events] == ["completed"]
+    assert events[0][1]["report_data"]["summary"] == "ok"
+
+
+def test_stream_replays_sections_already_in_the_row(test_client, monkeypatch):
+    db = MockDbClient()
+    monkeypatch.setattr(report_di, "_db_client", db)
+    monkeypatch.setattr(api_module, "STREAM_POLL_SEC", 0.05)
+    db.table("reports").insert({
+        "id": "late-job", "status": "processing:generating_report", "partial_report": {"header": {"company": "X"}},
+    }).execute()
+
+    def finish():
+        time.sleep(0.1)
+        db.table("reports").update({"partial_report": {"header": {"company": "X"}, "outlook": {}}}).eq("id", "late-job").execute()
+        time.sleep(0.1)
+        db.table("reports").update({"status": "failed", "error": "boom"}).eq("id", "late-job").execute()
+
+    threading.Thread(target=finish).start()
+    events = _events(test_client.get("/api/v2/reports/stream/late-job").get_data(as_text=True))
+    assert [d["section"] for name, d in events if name == "section"] == ["header", "outlook"]
+    assert events[-1][0] == "failed"
+
+
+def test_stream_falls_back_to_db_for_jobs_in_other_processes(test_client, monkeypatch):
+    db = MockDbClient()
+    monkeypatch.setattr(report_di, "_db_client", db)
+    monkeypatch.setattr(api_module, "STREAM_POLL_SEC", 0.05)
+    db.table("reports").insert({"id": "remote-job", "status": "processing:generating_report"}).execute()
+
+    def finish():
+        time.sleep(0.2)
+        db.table("reports").update({"status": "failed", "error": "boom"}).eq("id", "remote-job").execute()
+
+    threading.Thread(target=finish).start()
+    events = _events(test_client.get("/api/v2/reports/stream/remote-job").get_data(as_text=True))
+    assert events[0][1]["status"] == "processing:generating_report"
+    assert events[-1] == ("failed", {"job_id": "remote-job", "status": "failed", "error": "boom"})
+
+
+def test_stream_is_a_bounded_window_resumed_with_last_event_id(test_client, monkeypatch):
+    db = MockDbClient()
+    monkeypatch.setattr(report_di, "_db_client", db)
+    monkeypatch.setattr(api_module, "STREAM_WINDOW_SEC", 0.2)
+    monkeypatch.setattr(api_module, "STREAM_POLL_SEC", 0.05)
+    db.table("reports").insert({"id": "slow-job", "status": "processing:fetching_data"}).execute()
+
+    body = test_client.get("/api/v2/reports/stream/slow-job").get_data(as_text=True)
+    assert body.startswith(f"retry: {api_module.STREAM_RETRY_MS}\n\n")
+    assert "id: processing:fetching_data\n" in body
+    assert [name for name, _ in _events(body)] == ["status"]
+
+    # Reconnect with nothing new: no repeated status frame.
+    resumed = test_client.get("/api/v2/reports/stream/slow-job", headers={"Last-Event-ID": "processing:fetching_data"})
+    assert _events(resumed.get_data(as_text=True)) == []
+
+
+def test_stream_unknown_job_is_404(test_client, monkeypatch):
+    monkeypatch.setattr(report_di, "_db_client", MockDbClient())
+    assert test_client.get("/api/v2/reports/stream/missing").status_code == 404
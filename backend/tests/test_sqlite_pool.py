@@ -0,0 +1,36 @@
+import threading
+
+from db.sqlite_store import SqliteStore
+
+
+def test_connections_are_per_thread_and_wal(tmp_path):
+    store = SqliteStore(str(tmp_path / "pool.sqlite3"))
+    conn = store._connect()
+    assert store._connect() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(store._connect()))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+
+
+def test_concurrent_writers_share_the_file(tmp_path):
+    store = SqliteStore(str(tmp_path / "pool.sqlite3"))
+    ident = store.get_or_create_default_portfolio()
+
+    def write(n):
+        for i in range(25):
+            store.insert_transaction(ident.portfolio_id, ident.user_id, {
+                "symbol": f"SYM{n}", "asset_segment": "equity", "transaction_type": "buy",
+                "quantity": 1, "price": 10 + i, "transaction_date": "2024-01-01",
+            })
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store.list_transactions(ident.portfolio_id)) == 100
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+from utils.swr_cache import SWRCache, swr_cached
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SWRCache(name="test_swr")
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", loader, fresh_for=60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = SWRCache(name="test_swr")
+    cache.set("k", "old")
+    cache._entries["k"] = ("old", time.monotonic() - 10)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "new"
+
+    assert cache.get("k", loader, fresh_for=5, hard_ttl=60) == "old"
+    assert started.wait(2)
+    assert cache.get("k", loader, fresh_for=5, hard_ttl=60) == "old"
+    release.set()
+    for _ in range(100):
+        if cache.get("k", loader, fresh_for=5, hard_ttl=60) == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("k", loader, fresh_for=5, hard_ttl=60) == "new"
+    assert len(calls) == 1
+
+
+def test_expired_past_hard_ttl_blocks_for_fresh_value():
+    cache = SWRCache(name="test_swr")
+    cache._entries["k"] = ("ancient", time.monotonic() - 1000)
+    assert cache.get("k", lambda: "fresh", fresh_for=5, hard_ttl=60) == "fresh"
+
+
+def test_route_decorator_caches_per_query_and_skips_errors():
+    app = Flask(__name__)
+    cache = SWRCache(name="test_swr_route")
+    hits = {"ok": 0, "boom": 0}
+
+    @app.route("/data")
+    @swr_cached(fresh_for=60, query_string=True, cache=cache)
+    def data():
+        hits["ok"] += 1
+        return jsonify({"q": request.args.get("q")})
+
+    @app.route("/boom")
+    @swr_cached(fresh_for=60, cache=cache)
+    def boom():
+        hits["boom"] += 1
+        return jsonify({"error": "down"}), 500
+
+    client = app.test_client()
+    assert client.get("/data?q=1").get_json() == {"q": "1"}
+    assert client.get("/data?q=1").get_json() == {"q": "1"}
+    assert client.get("/data?q=2").get_json() == {"q": "2"}
+    assert hits["ok"] == 2
+
+    assert client.get("/boom").status_code == 500
+    assert client.get("/boom").status_code == 500
+    assert hits["boom"] == 2
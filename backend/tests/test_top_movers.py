@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from mock_market import OfflineProvider
+from services.market_data import MarketDataService
+
+TICKERS = [f"T{i:02d}.NS" for i in range(14)] + ["EDGE.NS", "FLAT.NS", "MISSING.NS"]
+
+
+def _fixture_frame():
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2024-01-01", periods=30, freq="D")
+    frames = {}
+    for t in TICKERS[:14]:
+        close = 100 + rng.normal(0, 3, len(idx)).cumsum()
+        frame = pd.DataFrame({
+            "Open": close + rng.normal(0, 0.5, len(idx)),
+            "High": close + 1.0,
+            "Low": close - 1.0,
+            "Close": close,
+        }, index=idx)
+        # Holes in single fields drop the whole bar for that symbol.
+        frame.iloc[rng.integers(0, len(idx), 3), rng.integers(0, 4)] = np.nan
+        frames[t] = frame
+    # 97.996 is just outside 2% of a 100.0 high, but rounds to 98.00, which is not.
+    close = [90.0] * 28 + [100.0, 97.996]
+    frames["EDGE.NS"] = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=idx)
+    # +0.003% shows as 0.00%: neither a gainer nor a loser.
+    close = [100.0] * 29 + [100.003]
+    frames["FLAT.NS"] = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=idx)
+    return pd.concat(frames, axis=1)
+
+
+class _FrameProvider(OfflineProvider):
+    name = "fake"
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def _download(self, tickers, **kwargs):
+        return self.frame
+
+
+def _per_ticker_movers(batch_data, tickers):
+    """The per-symbol loop get_top_movers used before it was vectorized."""
+    processed = []
+    for symbol in tickers:
+        if symbol not in batch_data.columns.levels[0]:
+            continue
+        stats = batch_data[symbol].dropna()
+        if stats.empty:
+            continue
+        price = float(stats['Close'].iloc[-1])
+        prev = float(stats['Close'].iloc[-2]) if len(stats) > 1 else float(stats['Open'].iloc[-1])
+        change = price - prev
+        high, low = float(stats['High'].max()), float(stats['Low'].min())
+        processed.append({
+            'symbol': symbol,
+            'name': symbol.replace('.NS', ''),
+            'price': round(price, 2),
+            'change': round(change, 2),
+            'percentChange': round(change / prev * 100, 2),
+            'fiftyTwoWeekHigh': round(high, 2),
+            'fiftyTwoWeekLow': round(low, 2),
+            'is52WHigh': price >= high * 0.98,
+            'is52WLow': price <= low * 1.02,
+        })
+    gainers = sorted((x for x in processed if x['percentChange'] > 0), key=lambda x: x['percentChange'], reverse=True)
+    losers = sorted((x for x in processed if x['percentChange'] < 0), key=lambda x: x['percentChange'])
+    high_52w = sorted(processed, key=lambda x: (x['fiftyTwoWeekHigh'] - x['price']) / x['fiftyTwoWeekHigh'])
+    low_52w = sorted(processed, key=lambda x: (x['price'] - x['fiftyTwoWeekLow']) / x['fiftyTwoWeekLow'])
+    return {'gainers': gainers[:10], 'losers': losers[:10], 'fiftyTwoWeekHigh': high_52w[:10], 'fiftyTwoWeekLow': low_52w[:10]}
+
+
+def _service(frame):
+    service = MarketDataService()
+    service.provider = _FrameProvider(frame)
+    service.largecap_tickers = TICKERS
+    service.logo_resolver.resolve_ticker_to_domain = lambda symbol: None
+    return service
+
+
+def test_vectorized_movers_match_per_ticker_loop():
+    frame = _fixture_frame()
+
+    movers = {
+        key: [{k: v for k, v in row.items() if k != 'logoUrl'} for row in rows]
+        for key, rows in _service(frame).get_top_movers().items()
+    }
+
+    assert movers == _per_ticker_movers(frame, TICKERS)
+    assert len(movers['fiftyTwoWeekHigh']) == len(movers['fiftyTwoWeekLow']) == 10
+
+
+def test_52w_flags_use_unrounded_prices():
+    movers = _service(_fixture_frame()).get_top_movers()
+
+    edge = next(r for r in movers['losers'] if r['symbol'] == 'EDGE.NS')
+    assert (edge['price'], edge['fiftyTwoWeekHigh']) == (98.0, 100.0)
+    assert edge['is52WHigh'] is False
+
+
+def test_moves_that_round_to_zero_are_neither_gainers_nor_losers():
+    movers = _service(_fixture_frame()).get_top_movers()
+
+    assert all(r['symbol'] != 'FLAT.NS' for r in movers['gainers'] + movers['losers'])
+    # Still ranked in the 52W lists, which don't depend on the sign of the move.
+    assert movers['fiftyTwoWeekHigh'][0]['symbol'] == 'FLAT.NS'
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from flask import Flask
+
+from db.sqlite_store import SqliteStore
+from routes import portfolio_routes
+from services.portfolio_service import PortfolioService
+from services.transaction_import import ImportFormatError, import_transactions
+
+# Leading BOM, as Excel-exported broker CSVs usually have.
+TRADEBOOK = "\ufeff" + """trade_date,tradingsymbol,exchange,segment,trade_type,quantity,price,trade_id
+2024-01-02,TCS,NSE,EQ,buy,10,"3,000.50",T1
+05-01-2024,INFY,NSE,EQ,BUY,5,1500,T2
+2024-02-01T09:15:02,TCS,NSE,EQ,sell,4,3200,T3
+2024-02-02,TCS,NSE,EQ,hold,1,1,T4
+2024-02-03,WIPRO,NSE,EQ,buy,-3,450,T5
+2024-02-01T09:15:02,TCS,NSE,EQ,sell,4,3200,T3
+"""
+
+
+def _import(store, text, **kwargs):
+    ident = store.get_or_create_default_portfolio()
+    return import_transactions(
+        io.BytesIO(text.encode("utf-8")), PortfolioService(), store, ident.portfolio_id, ident.user_id, **kwargs
+    ), ident
+
+
+def test_import_validates_dedupes_and_updates_holdings(tmp_path):
+    store = SqliteStore(str(tmp_path / "import.sqlite3"))
+
+    summary, ident = _import(store, TRADEBOOK, batch_size=2)
+    assert (summary["rows"], summary["imported"], summary["duplicates"], summary["invalid"]) == (6, 3, 1, 2)
+    assert [e["line"] for e in summary["errors"]] == [5, 6]
+
+    txs = store.list_transactions(ident.portfolio_id)
+    assert [(t["symbol"], t["transaction_date"], t["price"]) for t in txs] == [
+        ("TCS", "2024-01-02", 3000.5), ("INFY", "2024-01-05", 1500.0), ("TCS", "2024-02-01", 3200.0),
+    ]
+    assert store.list_holdings(ident.portfolio_id) == PortfolioService.get_holdings(None, ident.portfolio_id, txs)
+
+    # Re-importing the same statement is a no-op.
+    again, _ = _import(store, TRADEBOOK)
+    assert again["imported"] == 0 and again["duplicates"] == 4
+
+
+def test_dry_run_and_missing_columns(tmp_path):
+    store = SqliteStore(str(tmp_path / "import.sqlite3"))
+    summary, ident = _import(store, TRADEBOOK, dry_run=True)
+    assert summary["imported"] == 3
+    assert store.list_transactions(ident.portfolio_id) == []
+
+    with pytest.raises(ImportFormatError):
+        _import(store, "date,symbol,qty\n2024-01-01,TCS,1\n")
+
+
+def test_identical_fills_without_trade_id_are_a_multiset(tmp_path):
+    store = SqliteStore(str(tmp_path / "import.sqlite3"))
+    fill = "2024-03-01,TCS,buy,5,3500\n"
+    two_fills = "date,symbol,type,qty,price\n" + fill * 2
+
+    summary, ident = _import(store, two_fills)
+    assert (summary["imported"], summary["duplicates"]) == (2, 0)
+
+    # Re-importing only skips what is already stored; a third identical fill is new.
+    again, _ = _import(store, two_fills + fill)
+    assert (again["imported"], again["duplicates"]) == (1, 2)
+    assert store.list_holdings(ident.portfolio_id)[0]["qty"] == 15
+
+
+def test_import_endpoint_accepts_multipart_and_csv_body(tmp_path, monkeypatch):
+    monkeypatch.setattr(portfolio_routes, "store", SqliteStore(str(tmp_path / "import.sqlite3")))
+    app = Flask(__name__)
+    app.register_blueprint(portfolio_routes.portfolio_bp)
+    client = app.test_client()
+    url = "/api/portfolio/transactions/import"
+
+    res = client.post(url, data={"file": (io.BytesIO(TRADEBOOK.encode("utf-8")), "tradebook.csv")},
+                      content_type="multipart/form-data")
+    assert res.status_code == 200 and res.get_json()["imported"] == 3
+
+    res = client.post(f"{url}?dry_run=1", data=TRADEBOOK.encode("utf-8"), content_type="text/csv")
+    assert res.status_code == 200 and res.get_json()["duplicates"] == 4 and res.get_json()["dry_run"]
+
+    assert client.post(url, json={"rows": []}).status_code == 400
+    assert client.post(url, data=b"date,symbol\n2024-01-01,TCS\n", content_type="text/csv").status_code == 400
+    assert client.post(url, data=b"\xff\xfe\x00bad", content_type="text/csv").status_code == 400
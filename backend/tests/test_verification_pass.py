@@ -0,0 +1,73 @@
+from services.provider_manager import AIProviderManager
+from utils import metrics
+
+CONTEXT = {
+    "symbol": "TCS.NS",
+    "fundamentals": {
+        "dividend_yield": 0.012, "pe_ratio": 25.3, "market_cap_billions": 900,
+        "current_price": 100, "50d_avg": 120, "200d_avg": 130, "debt_to_equity": 5,
+    },
+    "company_meta": {"currency": "INR", "ceo": "K. Krithivasan", "sector": "IT"},
+    "fifty_two_week_high": 150,
+    "fifty_two_week_low": 90,
+    "volatility": "35%",
+}
+
+
+RULES = [
+    "currency_symbol", "currency_usd", "w52_not_available", "ma_not_available", "risk_no_dividend",
+    "risk_high_debt", "momentum", "key_metrics", "header", "ceo", "volatility", "schema_default:outlook",
+]
+
+
+def _fired():
+    counts = {}
+    for rule in RULES:
+        counts[rule] = metrics.REGISTRY.get_sample_value("investiq_verification_rules_total", {"rule": rule}) or 0.0
+    return counts
+
+
+def test_patches_in_place_in_one_pass_and_counts_changed_rules():
+    draft = {
+        "header": {"company": "Revenue of $ 1,200.5 and 30 USD"},
+        "snapshot": {"keyMetrics": [], "description": "The 52-week range is NOT available."},
+        "executiveSummary": {"status": [{"label": "Momentum", "value": "Bullish", "type": "positive"}],
+                             "text": "Moving averages are not available."},
+        "technicalSignals": [{"name": "RSI", "description": "Divergence data not available for this window"}],
+        "riskSignals": [{"text": "No dividend history"}, "High debt load", {"text": "Competition"}],
+        "peerComparison": [["$3 per share"]],
+    }
+    peers = draft["peerComparison"]
+
+    before = _fired()
+    report = AIProviderManager()._run_verification_pass(draft, CONTEXT)
+    fired = {rule: n - before[rule] for rule, n in _fired().items()}
+
+    assert report is draft and report["peerComparison"] is peers
+    assert report["header"]["company"] == "Revenue of 1,200.5 INR and 30 INR"
+    assert report["snapshot"]["description"] == "The 52-week range is 90.0 - 150.0 INR."
+    assert report["executiveSummary"]["text"] == "50-day MA is 120.0 and 200-day MA is 130.0."
+    assert report["executiveSummary"]["status"][0]["value"] == "Bearish"
+    assert report["technicalSignals"][0]["description"].startswith("Divergence data 120.0 (MA50)")
+    assert report["riskSignals"] == [{"text": "Competition"}]
+    assert peers == [["3 INR per share"]]
+
+    assert "verificationAudit" not in report
+    assert fired["currency_symbol"] == 2 and fired["currency_usd"] == 1
+    assert fired["w52_not_available"] == 1 and fired["ma_not_available"] == 1
+    assert fired["risk_no_dividend"] == 1 and fired["risk_high_debt"] == 1
+    assert fired["momentum"] == 1 and fired["key_metrics"] == 1 and fired["header"] == 1
+    assert fired["schema_default:outlook"] == 1
+
+
+def test_already_correct_fields_are_not_counted():
+    manager = AIProviderManager()
+    draft = {"header": {}, "snapshot": {}, "companyProfile": {}, "volatility": {}}
+    manager._run_verification_pass(draft, CONTEXT)
+
+    before = _fired()
+    manager._run_verification_pass(draft, CONTEXT)
+    fired = {rule: n - before[rule] for rule, n in _fired().items()}
+
+    # A second pass over an already-verified report changes nothing.
+    assert not any(fired.values())
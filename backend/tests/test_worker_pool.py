@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from reports.exceptions import WorkerQueueFullError
+from reports.queue.worker import LightweightWorkerPool
+
+
+def test_pool_is_bounded_and_reports_queue_position():
+    pool = LightweightWorkerPool(max_concurrency=1, max_queue_depth=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_job():
+        started.set()
+        release.wait(5)
+
+    pool.submit_job("running", blocking_job, (), {})
+    assert started.wait(2)
+    pool.submit_job("low", lambda: None, (), {}, priority=20)
+    pool.submit_job("high", lambda: None, (), {}, priority=1)
+
+    assert pool.get_queue_position("high") == 1
+    assert pool.get_queue_position("low") == 2
+    with pytest.raises(WorkerQueueFullError) as exc:
+        pool.submit_job("rejected", lambda: None, (), {})
+    assert exc.value.status_code == 503
+    assert len(pool.active_threads) == 1
+
+    release.set()
+    pool.shutdown(wait=True)
+    assert pool.job_registry["low"] == "completed"
+    assert pool.get_queue_position("low") is None
+
+
+def test_finished_jobs_are_pruned_from_registry():
+    pool = LightweightWorkerPool(max_concurrency=2, max_queue_depth=50, registry_max_entries=5)
+    for i in range(20):
+        pool.submit_job(f"job-{i}", lambda: None, (), {})
+    pool.shutdown(wait=True)
+    assert len(pool.job_registry) <= 5
+    assert "job-19" in pool.job_registry
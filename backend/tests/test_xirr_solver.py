@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from services.portfolio_intelligence import PortfolioIntelligence
+
+
+def _buy(days_ago, amount):
+    return {"date": (datetime.now() - timedelta(days=days_ago)).isoformat(), "amount": amount, "type": "buy"}
+
+
+def test_one_year_gain_is_exact():
+    res = PortfolioIntelligence().calculate_xirr([_buy(365, 10000)], 11000)
+    assert res == {"value": 10.0, "type": "annualized", "days": 365}
+
+
+def test_bisection_converges_where_newton_diverges():
+    # Doubling in 30 days: Newton from 10% overshoots, the bracketed search must still find it.
+    res = PortfolioIntelligence().calculate_xirr([_buy(30, 10000)], 20000)
+    assert res["type"] == "annualized"
+    assert abs(res["value"] / 100 - (2 ** (365 / 30) - 1)) / (2 ** (365 / 30)) < 1e-4
+
+
+def test_batch_matches_single_solves():
+    intel = PortfolioIntelligence()
+    flows = {
+        "TCS": [_buy(400, 10000), _buy(200, 5000)],
+        "INFY": [_buy(90, 8000), {"date": (datetime.now() - timedelta(days=30)).isoformat(), "amount": 3000, "type": "sell"}],
+        "NEW": [_buy(0, 1000)],
+        "EMPTY": [],
+    }
+    values = {"TCS": 17000, "INFY": 6000, "NEW": 1100, "EMPTY": 0}
+    batch = intel.calculate_xirr_batch(flows, values)
+    for key in flows:
+        assert batch[key] == intel.calculate_xirr(flows[key], values[key])
+    assert batch["NEW"]["type"] == "absolute"
+
+
+def test_no_sign_change_falls_back_to_absolute():
+    res = PortfolioIntelligence().calculate_xirr([_buy(100, 10000)], 0)
+    assert res["type"] == "absolute" and res["solver_failed"] is True
+    assert res["value"] == -100.0
@@ -0,0 +1,54 @@
+"""
+Vectorized OHLCV → chart payload conversion.
+
+Chart endpoints historically returned arrays of per-bar objects. The helpers
+here build those rows straight from DataFrame columns (no iterrows), and can
+also emit a compact columnar shape — parallel `dates`/`open`/`high`/`low`/
+`close`/`volume` arrays — which is several times smaller once serialized.
+"""
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+COLUMNAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+# Row key → columnar key for the report chart rows ({"date", "price", ...}).
+_ROW_TO_COLUMN = {"date": "dates", "price": "close"}
+
+
+def ohlcv_columns(df: pd.DataFrame, date_format: str, fields=COLUMNAR_FIELDS) -> Dict[str, list]:
+    """
+    Returns {"dates": [...], "<field>": [...]} for a yfinance-style OHLCV frame.
+    Prices are rounded to 2 decimals; missing volume becomes 0.
+    """
+    if df is None or df.empty:
+        return {"dates": [], **{f: [] for f in fields}}
+
+    index = pd.DatetimeIndex(df.index)
+    columns: Dict[str, list] = {"dates": index.strftime(date_format).tolist()}
+    for field in fields:
+        source = df[field.capitalize()]
+        if field == "volume":
+            columns[field] = source.fillna(0).astype("int64").tolist()
+        else:
+            columns[field] = source.astype(float).round(2).tolist()
+    return columns
+
+
+def columns_to_rows(columns: Dict[str, list], key_map: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Zips parallel arrays into row dicts; `key_map` maps row key → column name."""
+    keys = list(key_map)
+    series = [columns[key_map[k]] for k in keys]
+    return [dict(zip(keys, values)) for values in zip(*series)]
+
+
+def rows_to_columns(rows: List[Dict[str, Any]], key_map: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+    """
+    Inverse of `columns_to_rows` for already-built chart rows. Keys missing from
+    `key_map` keep their name, except `date`/`price` which become `dates`/`close`.
+    """
+    if not rows:
+        return {"dates": []}
+    mapping = dict(_ROW_TO_COLUMN, **(key_map or {}))
+    keys = list(rows[0].keys())
+    return {mapping.get(k, k): [row.get(k) for row in rows] for k in keys}
@@ -0,0 +1,89 @@
+"""
+Incremental parser for a JSON object that arrives as a token stream.
+
+LLM providers stream a report as text fragments of arbitrary size. The parser
+tracks just enough lexical state (inside a string / escape / nesting depth)
+to notice when a top-level member such as `"snapshot": {...}` is complete and
+decodes that member on its own, so each section can be used while the rest
+of the object is still being generated. Text before the opening brace (a
+markdown fence, a preamble) and after the closing brace is ignored.
+"""
+import json
+import logging
+from typing import Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TopLevelJsonStream:
+    """
+    Feed fragments with `feed()`; each call returns the (key, value) pairs of
+    the top-level members completed by that fragment, in document order.
+    A member that does not decode on its own is skipped — the caller still
+    parses the full text at the end, which stays authoritative.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._member_start = -1  # -1 until the opening brace has been seen
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        if self.complete or not fragment:
+            return []
+        self._text += fragment
+        if self._member_start < 0:
+            brace = self._text.find("{")
+            if brace < 0:
+                self._text = ""
+                return []
+            self._text = self._text[brace + 1:]
+            self._pos = self._member_start = 0
+            self._depth = 1
+
+        members: List[Tuple[str, Any]] = []
+        text, i = self._text, self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._member_start:i], members)
+                    self.complete = True
+                    self._text = ""
+                    return members
+            elif ch == "," and self._depth == 1:
+                self._emit(text[self._member_start:i], members)
+                self._member_start = i + 1
+            i += 1
+
+        # Drop what has already been emitted; keep the member still in progress.
+        self._text = text[self._member_start:]
+        self._pos = i - self._member_start
+        self._member_start = 0
+        return members
+
+    @staticmethod
+    def _emit(member: str, out: List[Tuple[str, Any]]) -> None:
+        member = member.strip()
+        if not member:
+            return
+        try:
+            out.extend(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError as e:
+            logger.debug(f"Skipping undecodable streamed member ({e}): {member[:80]!r}")
@@ -0,0 +1,120 @@
+"""
+Prometheus instrumentation shared by the API, the report pipeline and the
+market-data layer, exposed at GET /metrics.
+
+Under gunicorn every worker is a separate process, so metrics are written in
+prometheus_client's multiprocess mode whenever PROMETHEUS_MULTIPROC_DIR is set
+(gunicorn_config.py sets it up); the /metrics handler then aggregates all
+workers' files. Without it (flask dev server, tests) the default in-process
+registry is used.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds; covers sub-ms cache hits up to multi-minute LLM generations.
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+REPORT_STAGE_SECONDS = Histogram(
+    "investiq_report_stage_seconds",
+    "Report pipeline stage duration",
+    ["stage", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "investiq_llm_call_seconds",
+    "LLM provider call duration",
+    ["provider", "model", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+YFINANCE_CALL_SECONDS = Histogram(
+    "investiq_yfinance_call_seconds",
+    "yfinance call duration by call type (download/info/history/news)",
+    ["call", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "investiq_http_request_seconds",
+    "Flask request duration by route template",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "investiq_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+VERIFICATION_RULES_FIRED = Counter(
+    "investiq_verification_rules_total",
+    "Report fields corrected by the verification pass, by rule",
+    ["rule"],
+)
+REPORT_QUEUE_DEPTH = Gauge(
+    "investiq_report_queue_depth",
+    "Report jobs waiting for a worker thread",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """Observes the block's wall time; `outcome` is "error" if it raises."""
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_metrics():
+    """Returns (body, content_type) for the scrape endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app) -> None:
+    """Times every request by route template and registers GET /metrics."""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = getattr(g, "_metrics_started", None)
+        if started is not None:
+            # The rule template (not the raw path) keeps label cardinality bounded.
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(
+                method=request.method, route=route, status=str(response.status_code)
+            ).observe(time.perf_counter() - started)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        body, content_type = render_metrics()
+        return Response(body, content_type=content_type)
@@ -1,59 +1,277 @@
+import os
+import re
 import time
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 from functools import wraps
+from typing import Optional, Tuple
 from flask import request, jsonify
 
+from db.sqlite_pool import get_pool
+
 logger = logging.getLogger(__name__)
 
+# Idle buckets are dropped once they would have refilled completely anyway.
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+RATE_LIMIT_PRUNE_EVERY = int(os.getenv("RATE_LIMIT_PRUNE_EVERY", "500"))
+
+
+def _default_limit_path() -> str:
+    base_dir = os.path.dirname(os.path.dirname(__file__))  # backend/
+    data_dir = os.path.join(base_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "rate_limit.sqlite3")
+
+
+def _take(tokens_left: float, last_refill: float, now: float, capacity: float,
+          refill_rate: float, tokens: float) -> Tuple[bool, float, float]:
+    """Token-bucket step. Returns (allowed, new_token_count, retry_after_seconds)."""
+    available = min(capacity, tokens_left + max(0.0, now - last_refill) * refill_rate)
+    if available >= tokens:
+        return True, available - tokens, 0.0
+    retry_after = (tokens - available) / refill_rate if refill_rate > 0 else 60.0
+    return False, available, retry_after
+
+
+class MemoryBucketBackend:
+    """
+    Per-process buckets in a lock-guarded LRU. Bounded by RATE_LIMIT_MAX_KEYS,
+    so one entry per client IP can no longer grow without limit.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, refill_rate: float, tokens: float = 1) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens_left, last_refill = self._buckets.get(key, (capacity, now))
+            allowed, remaining, retry_after = _take(tokens_left, last_refill, now, capacity, refill_rate, tokens)
+            self._buckets[key] = (remaining, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SqliteBucketBackend:
+    """
+    Buckets in a host-local SQLite file shared by every gunicorn worker.
+    Each consume is one BEGIN IMMEDIATE transaction, so read-modify-write is
+    atomic across threads and processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("RATE_LIMIT_SQLITE_PATH") or _default_limit_path()
+        self._pool = get_pool(self.db_path)
+        self._calls = 0
+        self._calls_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    bucket_key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    last_refill REAL NOT NULL,
+                    idle_expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_idle ON rate_limit_buckets(idle_expires_at)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._pool.connection()
+
+    def consume(self, key: str, capacity: float, refill_rate: float, tokens: float = 1) -> Tuple[bool, float]:
+        now = time.time()
+        idle_expires_at = now + (capacity / refill_rate if refill_rate > 0 else 3600.0)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, last_refill FROM rate_limit_buckets WHERE bucket_key = ?", (key,)
+            ).fetchone()
+            tokens_left, last_refill = (row[0], row[1]) if row else (capacity, now)
+            allowed, remaining, retry_after = _take(tokens_left, last_refill, now, capacity, refill_rate, tokens)
+            conn.execute(
+                """
+                INSERT INTO rate_limit_buckets (bucket_key, tokens, last_refill, idle_expires_at)
+                VALUES (?,?,?,?)
+                ON CONFLICT(bucket_key) DO UPDATE SET
+                    tokens=excluded.tokens, last_refill=excluded.last_refill,
+                    idle_expires_at=excluded.idle_expires_at
+                """,
+                (key, remaining, now, idle_expires_at),
+            )
+            if self._should_prune():
+                conn.execute("DELETE FROM rate_limit_buckets WHERE idle_expires_at < ?", (now,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return allowed, retry_after
+
+    def _should_prune(self) -> bool:
+        with self._calls_lock:
+            self._calls += 1
+            return self._calls % RATE_LIMIT_PRUNE_EVERY == 0
+
+
+class RedisBucketBackend:
+    """
+    Redis-compatible backend for limits shared across hosts. The bucket update
+    runs as one Lua script (atomic on the server); idle keys expire via PEXPIRE.
+    """
+
+    name = "redis"
+
+    _SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local requested = tonumber(ARGV[4])
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= requested then
+        tokens = tokens - requested
+        allowed = 1
+    elseif rate > 0 then
+        retry_after = (requested - tokens) / rate
+    else
+        retry_after = 60
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    local ttl = 3600000
+    if rate > 0 then ttl = math.ceil(capacity / rate * 1000) end
+    redis.call('PEXPIRE', KEYS[1], ttl)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for RATE_LIMIT_BACKEND=redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    def consume(self, key: str, capacity: float, refill_rate: float, tokens: float = 1) -> Tuple[bool, float]:
+        allowed, retry_after = self._script(
+            keys=[f"ratelimit:{key}"], args=[capacity, refill_rate, time.time(), tokens]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+def build_backend(kind: Optional[str] = None):
+    kind = (kind or os.getenv("RATE_LIMIT_BACKEND", "sqlite")).strip().lower()
+    try:
+        if kind == "redis":
+            return RedisBucketBackend(os.getenv("RATE_LIMIT_REDIS_URL") or os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        if kind == "sqlite":
+            return SqliteBucketBackend()
+    except Exception as e:
+        logger.warning(f"Rate limit backend '{kind}' unavailable ({e}); using per-process memory buckets.")
+        return MemoryBucketBackend()
+    if kind != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{kind}', using memory.")
+    return MemoryBucketBackend()
+
+
 class RateLimiter:
     """
-    In-memory Token Bucket rate limiting algorithm.
-    For true production, this would be backed by Redis `INCR` and `EXPIRE`.
-    This serves as our fallback resilient rate limit enforcement.
+    Token Bucket rate limiting over a pluggable bucket backend
+    (RATE_LIMIT_BACKEND = sqlite | memory | redis).
+    The SQLite default shares limits across gunicorn workers on one host;
+    redis shares them across nodes. If the backend errors the request is
+    allowed through (fail open) rather than taking the endpoint down.
     """
-    def __init__(self, capacity: int, refill_rate_per_sec: float):
+    def __init__(self, capacity: int, refill_rate_per_sec: float, backend=None, scope: str = "global"):
         self.capacity = capacity
         self.refill_rate = refill_rate_per_sec
-        self.buckets = {}  # Map of IP/UserToken -> dict(tokens, last_refill)
-        
-    def _refill(self, key: str):
-        now = time.time()
-        if key not in self.buckets:
-            self.buckets[key] = {'tokens': self.capacity, 'last_refill': now}
-            return
-            
-        bucket = self.buckets[key]
-        time_passed = now - bucket['last_refill']
-        tokens_to_add = time_passed * self.refill_rate
-        
-        bucket['tokens'] = min(self.capacity, bucket['tokens'] + tokens_to_add)
-        bucket['last_refill'] = now
+        self.scope = scope
+        self.backend = backend if backend is not None else _shared_backend()
+
+    def check(self, key: str, tokens: int = 1) -> Tuple[bool, float]:
+        """Returns (allowed, retry_after_seconds)."""
+        try:
+            return self.backend.consume(f"{self.scope}:{key}", self.capacity, self.refill_rate, tokens)
+        except Exception as e:
+            logger.warning(f"Rate limit backend error for {self.scope}; allowing request. {e}")
+            return True, 0.0
 
     def consume(self, key: str, tokens: int = 1) -> bool:
-        self._refill(key)
-        bucket = self.buckets[key]
-        
-        if bucket['tokens'] >= tokens:
-            bucket['tokens'] -= tokens
-            return True
-        return False
+        return self.check(key, tokens)[0]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _shared_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend()
+    return _backend
+
+
+def _route_limit(scope: str, capacity: int, per_seconds: float) -> Tuple[int, float]:
+    """Per-route override: RATE_LIMIT_<SCOPE>="<capacity>/<seconds>", e.g. RATE_LIMIT_REPORTS_GENERATE=5/60."""
+    raw = os.getenv(f"RATE_LIMIT_{re.sub(r'[^A-Za-z0-9]+', '_', scope).upper()}")
+    if raw:
+        try:
+            cap, _, secs = raw.partition("/")
+            return int(cap), float(secs or per_seconds)
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate limit override for {scope}: {raw!r}")
+    return capacity, per_seconds
+
 
 # Global ratelimiter instance (e.g. 10 requests per minute)
 global_limiter = RateLimiter(capacity=10, refill_rate_per_sec=10/60.0)
 
-def rate_limit(limit_type="ip"):
+def rate_limit(limit_type="ip", capacity: Optional[int] = None, per_seconds: float = 60.0, scope: Optional[str] = None):
+    """
+    Without arguments every decorated route shares `global_limiter`. Passing
+    `capacity` (requests per `per_seconds`) gives the route its own bucket,
+    overridable through RATE_LIMIT_<SCOPE>.
+    """
     def decorator(f):
+        limiter = global_limiter
+        if capacity is not None:
+            route_scope = scope or f.__name__
+            cap, secs = _route_limit(route_scope, capacity, per_seconds)
+            limiter = RateLimiter(capacity=cap, refill_rate_per_sec=cap / secs, scope=route_scope)
+
         @wraps(f)
         def wrapped(*args, **kwargs):
             key = request.remote_addr if limit_type == "ip" else request.headers.get("Authorization", "anonymous")
-            
-            if not global_limiter.consume(key):
-                logger.warning(f"Rate limit exceeded for {key}")
-                return jsonify({
+
+            allowed, retry_after = limiter.check(key)
+            if not allowed:
+                retry_after = max(1, int(retry_after + 0.999))
+                logger.warning(f"Rate limit exceeded for {key} on {limiter.scope}")
+                response = jsonify({
                     "error": "Rate limit exceeded. Please try again later.",
-                    "retry_after": 60 
-                }), 429
-                
+                    "retry_after": retry_after
+                })
+                response.headers["Retry-After"] = str(retry_after)
+                return response, 429
+
             return f(*args, **kwargs)
         return wrapped
     return decorator
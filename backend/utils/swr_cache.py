@@ -0,0 +1,186 @@
+"""
+Stale-while-revalidate caching with per-key single-flight.
+
+An entry is *fresh* for `fresh_for` seconds and served as-is. After that it
+is *stale*: it is still returned immediately while one background refresh
+recomputes it. Past `hard_ttl` it is too old to serve and the caller blocks
+on the recompute — but only one caller per key does the work; concurrent
+callers wait for that result instead of stampeding upstream.
+
+`swr_cached` applies this to Flask views; `SWRCache.get` works for any
+callable.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response, copy_current_request_context, make_response, request
+
+from utils.metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+SWR_MAX_ENTRIES = int(os.getenv("SWR_MAX_ENTRIES", "2048"))
+SWR_REFRESH_WORKERS = int(os.getenv("SWR_REFRESH_WORKERS", "4"))
+SWR_WAIT_SEC = float(os.getenv("SWR_WAIT_SEC", "30"))
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SWRCache:
+    """Per-process LRU of (value, fetched_at) with single-flight recomputation."""
+
+    def __init__(self, name: str = "swr", max_entries: int = SWR_MAX_ENTRIES,
+                 refresh_workers: int = SWR_REFRESH_WORKERS, wait_timeout: float = SWR_WAIT_SEC):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.wait_timeout = wait_timeout
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, refresh_workers), thread_name_prefix=f"{name}-refresh")
+
+    def get(self, key: str, loader: Callable[[], Any], fresh_for: float, hard_ttl: Optional[float] = None,
+            should_cache: Callable[[Any], bool] = lambda value: True) -> Any:
+        hard_ttl = max(fresh_for, hard_ttl if hard_ttl is not None else fresh_for * 10)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        age = now - entry[1] if entry is not None else None
+
+        if age is not None and age < fresh_for:
+            count_cache(self.name, True)
+            return entry[0]
+        if age is not None and age < hard_ttl:
+            count_cache(self.name, True)
+            self.refresh_async(key, loader, should_cache)
+            return entry[0]
+
+        count_cache(self.name, False)
+        return self.single_flight(key, loader, should_cache)
+
+    def single_flight(self, key: str, loader: Callable[[], Any],
+                      should_cache: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Runs `loader` for `key` unless another thread already is, in which case waits for its result."""
+        flight, leader = self._claim(key)
+        if leader:
+            return self._run(key, flight, loader, should_cache)
+        if not flight.done.wait(self.wait_timeout):
+            logger.warning(f"{self.name}: timed out waiting for in-flight {key}; computing directly")
+            return loader()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def refresh_async(self, key: str, loader: Callable[[], Any],
+                      should_cache: Callable[[Any], bool] = lambda value: True) -> bool:
+        """Schedules a background recompute of `key`; no-op (False) if one is already running."""
+        flight, leader = self._claim(key)
+        if not leader:
+            return False
+
+        def _refresh():
+            try:
+                self._run(key, flight, loader, should_cache)
+            except Exception as e:
+                logger.warning(f"{self.name}: background refresh of {key} failed, keeping stale value: {e}")
+
+        try:
+            self._executor.submit(_refresh)
+        except RuntimeError:
+            # Executor shut down (interpreter exit); release waiters.
+            self._finish(key, flight)
+            return False
+        return True
+
+    def _claim(self, key: str) -> Tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._inflight[key] = _Flight()
+            return flight, True
+
+    def _run(self, key: str, flight: _Flight, loader: Callable[[], Any], should_cache) -> Any:
+        try:
+            flight.value = loader()
+            if should_cache(flight.value):
+                self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._finish(key, flight)
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        flight.done.set()
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every route decorated with swr_cached.
+route_cache = SWRCache(name="swr_route")
+
+
+def swr_cached(fresh_for: float, hard_ttl: Optional[float] = None, query_string: bool = False,
+               cache: Optional[SWRCache] = None, cacheable_status: Callable[[int], bool] = lambda s: s < 500):
+    """
+    Flask view decorator. Responses are cached per path (plus the query string
+    when `query_string=True`); 5xx responses are never cached. Background
+    refreshes run the view in a copy of the triggering request's context.
+    """
+    swr = cache or route_cache
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            key = f"{view.__module__}.{view.__name__}:{request.full_path if query_string else request.path}"
+
+            @copy_current_request_context
+            def load():
+                response = make_response(view(*args, **kwargs))
+                # Store the parts, not the Response object, so hits never share mutable state.
+                return response.get_data(), response.status_code, response.mimetype
+
+            body, status, mimetype = swr.get(
+                key, load, fresh_for, hard_ttl, should_cache=lambda value: cacheable_status(value[1])
+            )
+            return Response(body, status=status, mimetype=mimetype)
+
+        return wrapped
+
+    return decorator
@@ -12,6 +12,8 @@ const IntelligenceReportPage = () => {
     const [selectedStock, setSelectedStock] = useState(null);
     const [isGenerating, setIsGenerating] = useState(false);
     const [reportData, setReportData] = useState(null);
+    // Sections streamed in while the report is still being generated.
+    const [partialReport, setPartialReport] = useState(null);
     const [credits, setCredits] = useState(5);
     const [history, setHistory] = useState([]);
     const [error, setError] = useState(null);
@@ -25,11 +27,13 @@ const IntelligenceReportPage = () => {
     const [activeJobId, setActiveJobId] = useState(null);
 
     const pollIntervalRef = useRef(null);
+    const eventSourceRef = useRef(null);
 
     useEffect(() => {
         fetchHistory();
         return () => {
             if (pollIntervalRef.current) clearInterval(pollIntervalRef.current);
+            if (eventSourceRef.current) eventSourceRef.current.close();
         };
     }, []);
 
@@ -73,13 +77,59 @@ const IntelligenceReportPage = () => {
             setLoadingStage('Processing Multi-Agent Synthesis...');
             setCredits(prev => prev - 1);
             setActiveJobId(jobId);
-            startPolling(jobId);
+            startTracking(jobId);
         } catch (err) {
             setError(err.message);
             setIsGenerating(false);
         }
     };
 
+    const stageLabel = (status) => {
+        // Update user-facing text based on database status string
+        if (status && status.startsWith('processing:')) {
+            const stage = status.split(':')[1];
+            const stageMap = {
+                'fetching_data': 'Retrieving Real-Time Market Flux...',
+                'analyzing_context': 'Enriching AI Analytical Context...',
+                'generating_report': 'Synthesizing Institutional Analysis...',
+                'finalizing': 'Finalizing Output Report Format...'
+            };
+            return stageMap[stage] || 'Analyzing Market Data...';
+        }
+        return 'Initiating Analysis Pipeline...';
+    };
+
+    const startTracking = (jobId) => {
+        // Prefer the push stream; fall back to interval polling if it is unavailable or drops.
+        let finished = false;
+        const source = api.streamReportStatus(jobId, {
+            onStatus: (data) => setLoadingStage(stageLabel(data.status)),
+            onSection: (data) => setPartialReport(prev => ({ ...(prev || {}), [data.section]: data.data })),
+            onCompleted: (data) => {
+                finished = true;
+                setPartialReport(null);
+                setReportData(data.report_data);
+                setIsGenerating(false);
+                fetchHistory();
+            },
+            onFailed: (data) => {
+                finished = true;
+                setPartialReport(null);
+                setError(data.error || 'Generation failed. Please try again later.');
+                setIsGenerating(false);
+            },
+            onError: () => {
+                eventSourceRef.current = null;
+                if (!finished) startPolling(jobId);
+            }
+        });
+        if (source) {
+            eventSourceRef.current = source;
+        } else {
+            startPolling(jobId);
+        }
+    };
+
     const startPolling = (jobId) => {
         let attempts = 0;
         pollIntervalRef.current = setInterval(async () => {
@@ -96,27 +146,17 @@ const IntelligenceReportPage = () => {
 
                 if (data.status === 'completed') {
                     clearInterval(pollIntervalRef.current);
+                    setPartialReport(null);
                     setReportData(data.report_data);
                     setIsGenerating(false);
                     fetchHistory();
                 } else if (data.status === 'failed') {
                     clearInterval(pollIntervalRef.current);
+                    setPartialReport(null);
                     setError(data.error || 'Generation failed. Please try again later.');
                     setIsGenerating(false);
                 } else {
-                    // Update user-facing text based on database status string
-                    if (data.status && data.status.startsWith('processing:')) {
-                        const stage = data.status.split(':')[1];
-                        const stageMap = {
-                            'fetching_data': 'Retrieving Real-Time Market Flux...',
-                            'analyzing_context': 'Enriching AI Analytical Context...',
-                            'generating_report': 'Synthesizing Institutional Analysis...',
-                            'finalizing': 'Finalizing Output Report Format...'
-                        };
-                        setLoadingStage(stageMap[stage] || 'Analyzing Market Data...');
-                    } else {
-                        setLoadingStage('Initiating Analysis Pipeline...');
-                    }
+                    setLoadingStage(stageLabel(data.status));
                 }
             } catch (err) {
                 console.error("Polling error:", err);
@@ -126,13 +166,15 @@ const IntelligenceReportPage = () => {
 
     const handleBack = () => {
         setReportData(null);
+        setPartialReport(null);
         setSelectedStock(null);
         setError(null);
         setActiveJobId(null);
     };
 
     const loadHistoricalReport = (item) => {
-        if (item.report_data) {
+        // Only finished jobs have a complete report; pending or failed items never open.
+        if (item.status === 'completed' && item.report_data) {
             setReportData(item.report_data);
             setActiveJobId(item.id);
         }
@@ -159,6 +201,11 @@ const IntelligenceReportPage = () => {
         return <ReportView data={reportData} onBack={handleBack} jobId={activeJobId} />;
     }
 
+    // The header is the first section; from then on the report renders as it streams in.
+    if (isGenerating && partialReport?.header) {
+        return <ReportView data={partialReport} onBack={handleBack} jobId={activeJobId} streaming />;
+    }
+
     return (
         <>
             <div style={{ marginBottom: '2rem', display: 'flex', justifyContent: 'space-between', alignItems: 'flex-end' }}>
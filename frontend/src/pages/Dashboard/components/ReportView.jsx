@@ -82,7 +82,7 @@ const reportStyles = `
   }
 `;
 
-const ReportView = ({ data, onBack, jobId }) => {
+const ReportView = ({ data, onBack, jobId, streaming = false }) => {
     const [activeTab, setActiveTab] = useState('1Y');
     const [isChatOpen, setIsChatOpen] = useState(false);
     const [isCompareOpen, setIsCompareOpen] = useState(false);
@@ -237,6 +237,12 @@ const ReportView = ({ data, onBack, jobId }) => {
                 </div>
             </div>
 
+            {streaming && (
+                <div className="glass-panel" style={{ padding: '0.75rem 1rem', borderRadius: '12px', marginBottom: '1rem', display: 'flex', alignItems: 'center', gap: '0.5rem', fontSize: '0.85rem', color: 'var(--color-secondary)' }}>
+                    <Sparkles size={16} /> Generating remaining sections...
+                </div>
+            )}
+
             {/* 2. SNAPSHOT CARD */}
             <div className="glass-panel" style={{ padding: '1.5rem', borderRadius: '12px', marginBottom: '2rem' }}>
                 <div className="rv-snapshot-grid">
@@ -211,6 +211,39 @@ const api = {
         return await response.json();
     },
 
+    /**
+     * Subscribes to a report job's Server-Sent Events stream.
+     * Returns the EventSource (call .close() to stop), or null when the
+     * browser has no EventSource support and the caller should poll instead.
+     */
+    streamReportStatus: (jobId, { onStatus, onSection, onCompleted, onFailed, onError }) => {
+        if (typeof EventSource === 'undefined') return null;
+        const source = new EventSource(`${API_BASE_URL}/v2/reports/stream/${jobId}`);
+        // The server closes each stream after a short window and the browser reconnects
+        // (sending Last-Event-ID); only give up after repeated failed reconnects.
+        let failures = 0;
+        source.onopen = () => { failures = 0; };
+        const parse = (handler) => (event) => {
+            try {
+                handler && handler(JSON.parse(event.data));
+            } catch (err) {
+                console.error("Malformed report stream event", err);
+            }
+        };
+        source.addEventListener('status', parse(onStatus));
+        source.addEventListener('section', parse(onSection));
+        source.addEventListener('completed', (event) => { source.close(); parse(onCompleted)(event); });
+        source.addEventListener('failed', (event) => { source.close(); parse(onFailed)(event); });
+        source.onerror = () => {
+            failures += 1;
+            if (source.readyState === EventSource.CLOSED || failures > 3) {
+                source.close();
+                onError && onError();
+            }
+        };
+        return source;
+    },
+
     getReportHistory: async (userId) => {
         const url = userId ? `${API_BASE_URL}/v2/reports/history?user_id=${userId}` : `${API_BASE_URL}/v2/reports/history`;
         const response = await fetch(url);